@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+
+from Utils.Storage import SQLiteStore
+from Utils.Utilities import Config
+
+DEFAULT_ACTION_TTL = 7 * 24 * 60 * 60
+
+
+class ActionCache(SQLiteStore):
+    """
+    Persistent cache of the verification status and the security advisories of the GitHub Actions.
+    The entries are keyed by owner/repo, so every version of an action shares the same entry, and they expire
+    after the TTL. The TTL can be set on the [cache] section of config.ini with the action_ttl key, in seconds.
+
+    Attributes:
+        ttl (float): Seconds an entry is considered fresh.
+        memory (dict): Entries already read by the current process.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS actions (
+            owner TEXT NOT NULL,
+            repo TEXT NOT NULL,
+            owner_verified INTEGER NOT NULL,
+            verification_badge INTEGER NOT NULL,
+            vulnerabilities TEXT,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (owner, repo)
+        );
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path=None, ttl=None):
+        if path is None:
+            path = os.path.join(Config.get_config_directory(), 'actions.db')
+        if ttl is None:
+            ttl = float(Config.read_setting('cache', 'action_ttl', DEFAULT_ACTION_TTL))
+        self.ttl = ttl
+        self.memory = {}
+        super().__init__(path)
+
+    @classmethod
+    def shared(cls):
+        """
+        Returns the cache of the current process, creating it on the first call.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def key(owner, repo):
+        # GitHub names are case-insensitive
+        return owner.lower(), repo.lower()
+
+    def get(self, owner, repo):
+        """
+        Returns the cached entry of an action, or None if it is unknown or expired.
+
+            :param owner: The owner of the action.
+            :param repo: The repository of the action.
+
+            :return: A tuple with owner_verified, verification_badge and vulnerabilities.
+        """
+        key = self.key(owner, repo)
+        cached = self.memory.get(key)
+        if cached is None:
+            rows = self.query("SELECT owner_verified, verification_badge, vulnerabilities, fetched_at "
+                              "FROM actions WHERE owner = ? AND repo = ?", key)
+            if not rows:
+                return None
+            owner_verified, verification_badge, vulnerabilities, fetched_at = rows[0]
+            cached = ((bool(owner_verified), bool(verification_badge), json.loads(vulnerabilities)), fetched_at)
+            self.memory[key] = cached
+
+        entry, fetched_at = cached
+        if time.time() - fetched_at > self.ttl:
+            self.memory.pop(key, None)
+            return None
+        return entry
+
+    def put(self, owner, repo, owner_verified, verification_badge, vulnerabilities):
+        """
+        Stores the verification status and the advisories of an action.
+        """
+        key = self.key(owner, repo)
+        fetched_at = time.time()
+        self.execute("INSERT OR REPLACE INTO actions VALUES (?, ?, ?, ?, ?, ?)",
+                     (*key, int(bool(owner_verified)), int(bool(verification_badge)),
+                      json.dumps(vulnerabilities), fetched_at))
+        self.memory[key] = ((bool(owner_verified), bool(verification_badge), vulnerabilities), fetched_at)
+
+    def clear(self):
+        """
+        Removes every entry of the cache.
+        """
+        self.execute("DELETE FROM actions")
+        self.memory.clear()
+
+
+DEFAULT_ISSUE_TTL = 24 * 60 * 60
+
+
+class EntityCache(SQLiteStore):
+    """
+    Persistent cache of the commits and issues fetched to enrich the mined datasets, keyed by owner/repo and the
+    commit SHA or issue number. The commits never change, so they never expire. The issues expire after the TTL,
+    which can be set on the [cache] section of config.ini with the issue_ttl key, in seconds.
+
+    Attributes:
+        issue_ttl (float): Seconds an issue is considered fresh.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS entities (
+            owner TEXT NOT NULL,
+            repo TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (owner, repo, kind, key)
+        );
+    """
+
+    def __init__(self, path=None, issue_ttl=None):
+        if path is None:
+            path = os.path.join(Config.get_config_directory(), 'entities.db')
+        if issue_ttl is None:
+            issue_ttl = float(Config.read_setting('cache', 'issue_ttl', DEFAULT_ISSUE_TTL))
+        self.issue_ttl = issue_ttl
+        super().__init__(path)
+
+    def get_many(self, owner, repo, kind, keys):
+        """
+        Returns the cached entries of a repository.
+
+            :param kind: 'commit' or 'issue'.
+            :param keys: The commit SHAs or issue numbers.
+            :return: Dictionary with the entry of each key that is cached and fresh.
+        """
+        keys = [str(key) for key in keys]
+        oldest = time.time() - self.issue_ttl if kind == 'issue' else 0
+        found = {}
+        # SQLite limits the number of parameters of a statement
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.query(f"SELECT key, data FROM entities WHERE owner = ? AND repo = ? AND kind = ? "
+                              f"AND fetched_at >= ? AND key IN ({', '.join('?' * len(batch))})",
+                              (*ActionCache.key(owner, repo), kind, oldest, *batch))
+            found.update((key, json.loads(data)) for key, data in rows)
+        return found
+
+    def put_many(self, owner, repo, kind, entries):
+        """
+        Stores entries of a repository.
+
+            :param kind: 'commit' or 'issue'.
+            :param entries: Dictionary with the entry of each commit SHA or issue number.
+        """
+        fetched_at = time.time()
+        self.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?)",
+                         [(*ActionCache.key(owner, repo), kind, str(key), json.dumps(entry), fetched_at)
+                          for key, entry in entries.items()])
+
+
+DEFAULT_ACCOUNT_TTL = 30 * 24 * 60 * 60
+
+
+class AccountIndex(SQLiteStore):
+    """
+    Persistent index of the account type (User, Bot, Organization) of the GitHub accounts, keyed by commit email.
+    It is filled with the accounts seen on the fetched commits, so the commits of the known authors and
+    committers need no request. An account without type (an email that is not linked to any account) is also
+    kept. The entries expire after the TTL, which can be set on the [cache] section of config.ini with the
+    account_ttl key, in seconds.
+
+    Attributes:
+        ttl (float): Seconds an entry is considered fresh.
+        memory (dict): Entries already read or written by the current process.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS accounts (
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            type TEXT,
+            seen_at REAL NOT NULL,
+            PRIMARY KEY (kind, name)
+        );
+    """
+
+    def __init__(self, path=None, ttl=None):
+        if path is None:
+            path = os.path.join(Config.get_config_directory(), 'accounts.db')
+        if ttl is None:
+            ttl = float(Config.read_setting('cache', 'account_ttl', DEFAULT_ACCOUNT_TTL))
+        self.ttl = ttl
+        self.memory = {}
+        super().__init__(path)
+
+    def get(self, kind, name):
+        """
+        Returns the account type of an email.
+
+            :param kind: The kind of the name, 'email'.
+            :param name: The email, in any case.
+            :return: A tuple with whether the account is known and its type.
+        """
+        key = (kind, name.lower())
+        if key not in self.memory:
+            rows = self.query("SELECT type, seen_at FROM accounts WHERE kind = ? AND name = ?", key)
+            if not rows:
+                return False, None
+            self.memory[key] = rows[0]
+
+        account_type, seen_at = self.memory[key]
+        if time.time() - seen_at > self.ttl:
+            self.memory.pop(key, None)
+            return False, None
+        return True, account_type
+
+    def put_many(self, accounts):
+        """
+        Stores the type of many accounts.
+
+            :param accounts: List of (kind, name, type) tuples. The entries without name are skipped.
+        """
+        seen_at = time.time()
+        entries = {(kind, name.lower()): (account_type, seen_at) for kind, name, account_type in accounts if name}
+        self.executemany("INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?)",
+                         [(*key, account_type, seen_at) for key, (account_type, seen_at) in entries.items()])
+        self.memory.update(entries)
@@ -0,0 +1,106 @@
+import logging
+
+import requests
+
+from APIs.Cache import AccountIndex, EntityCache
+
+
+class Enricher:
+    """
+    Resolves the commits and issues referenced by the mined rows. They are asked in batches with
+    GitHubAPI.fetch_commits and GitHubAPI.fetch_issues, and kept on the EntityCache, so each commit or issue is
+    fetched once no matter how many workflow files, runs or processes reference it.
+
+    The account types seen on the commits are saved on the AccountIndex, so the commits whose author and
+    committer emails are already known are not fetched at all. The issues bring the types of their accounts
+    with them, so they are not indexed.
+
+    Attributes:
+        api (GitHubAPI): The API used to fetch the missing entries.
+        cache (EntityCache): The persistent cache of the entries.
+        accounts (AccountIndex): The persistent index of the account types.
+        memory (dict): Entries already resolved by the current process. None marks an entry that was not found.
+    """
+
+    def __init__(self, api, cache=None, accounts=None):
+        self.api = api
+        self.cache = cache if cache is not None else EntityCache()
+        self.accounts = accounts if accounts is not None else AccountIndex()
+        self.memory = {}
+
+    def prefetch(self, owner, repo, commits=(), issue_numbers=()):
+        """
+        Resolves many commits and issues of a repository at once, so the next lookups are answered from memory.
+
+            :param commits: List of (SHA, author email, committer email) tuples. The commits with known emails
+                are skipped.
+            :param issue_numbers: List of issue numbers.
+        """
+        shas = [sha for sha, author_email, committer_email in commits
+                if self._account_types(author_email, committer_email) is None]
+        self._resolve(owner, repo, 'commit', shas, self.api.fetch_commits)
+        self._resolve(owner, repo, 'issue', issue_numbers, self.api.fetch_issues)
+
+    def account_types(self, owner, repo, sha, author_email, committer_email):
+        """
+        Returns the account types of the author and the committer of a commit. They come from the account index
+        when both emails are known, and from the commit otherwise.
+
+            :return: A tuple with the author and committer types, or None if the commit could not be fetched.
+        """
+        types = self._account_types(author_email, committer_email)
+        if types is not None:
+            return types
+
+        commit = self.commit(owner, repo, sha)
+        if not commit:
+            return None
+        self.accounts.put_many([('email', author_email, commit[0]['Author Acc']),
+                                ('email', committer_email, commit[0]['Committer Acc'])])
+        return commit[0]['Author Acc'], commit[0]['Committer Acc']
+
+    def commit(self, owner, repo, sha):
+        """
+        Returns the info of a commit on the format of GitHubAPI.fetch_specific_commit.
+        """
+        self._resolve(owner, repo, 'commit', [sha], self.api.fetch_commits)
+        entry = self.memory.get((owner, repo, 'commit', str(sha)))
+        return [entry] if entry else []
+
+    def issue(self, owner, repo, number):
+        """
+        Returns the info of an issue on the format of GitHubAPI.fetch_specific_issues.
+        """
+        self._resolve(owner, repo, 'issue', [number], self.api.fetch_issues)
+        entry = self.memory.get((owner, repo, 'issue', str(number)))
+        return [entry] if entry else []
+
+    def _account_types(self, author_email, committer_email):
+        if not author_email or not committer_email:
+            return None
+        author_known, author_type = self.accounts.get('email', author_email)
+        committer_known, committer_type = self.accounts.get('email', committer_email)
+        if author_known and committer_known:
+            return author_type, committer_type
+        return None
+
+    def _resolve(self, owner, repo, kind, keys, fetch):
+        keys = [key for key in dict.fromkeys(str(key) for key in keys)
+                if (owner, repo, kind, key) not in self.memory]
+        if not keys:
+            return
+
+        cached = self.cache.get_many(owner, repo, kind, keys)
+        missing = [key for key in keys if key not in cached]
+        if missing:
+            try:
+                fetched = {str(key): entry for key, entry in fetch(owner, repo, missing).items()}
+            except requests.RequestException as e:
+                # Nothing is remembered, so the entries are asked again by the next lookup
+                logging.error(f"Error when fetching the {kind}s of {owner}/{repo}. Error: {e}")
+                fetched = None
+            if fetched is not None:
+                self.cache.put_many(owner, repo, kind, fetched)
+                cached.update((key, fetched.get(key)) for key in missing)
+
+        self.memory.update(((owner, repo, kind, key), entry) for key, entry in cached.items())
@@ -3,10 +3,29 @@ import logging
 import json
 from bs4 import BeautifulSoup
 
+from APIs.Transport import Transport
+
+# Number of commits or issues resolved by a single GraphQL query
+GRAPHQL_BATCH_SIZE = 100
+
+COMMIT_FIELDS = "tree { oid } author { name user { login } } committer { name user { login } }"
+
+WORKFLOW_NAMES_FIELDS = 'object(expression: "HEAD:.github/workflows") { ... on Tree { entries { name } } }'
+
+WORKFLOWS_FIELDS = ('object(expression: "HEAD:.github/workflows") { ... on Tree { entries { name path type '
+                    'object { ... on Blob { oid text isBinary isTruncated } } } } }')
+
+ISSUE_FIELDS = ("author { login __typename } authorAssociation createdAt closedAt state body "
+                "labels(first: 100) { nodes { name } } assignees(first: 100) { nodes { login __typename } } "
+                "milestone { title } "
+                "timelineItems(itemTypes: [CLOSED_EVENT], last: 1) { nodes { ... on ClosedEvent { "
+                "actor { login __typename } } } }")
+
 
 class GitHubAPI:
-    def __init__(self, tk):
+    def __init__(self, tk, transport=None):
         self.token = tk
+        self.transport = transport or Transport.shared()
         self.headers = {
             'Authorization': f'token {self.token}',
             'Accept': 'application/vnd.github.v3+json'
@@ -14,12 +33,13 @@ class GitHubAPI:
 
     def get_rate_limit(self):
         url = "https://api.github.com/rate_limit"
-        response = requests.get(url, headers=self.headers)
+        response = self.transport.get(url, headers=self.headers)
         data = response.json()
         if response.status_code == 200:
             limit = data['resources']['core']['limit']
             used = data['resources']['core']['used']
             remaining = data['resources']['core']['remaining']
+            self.transport.seed(self.headers, data['resources'])
             print("\nGitHub API successfully Authenticated!\n"
                   "Here is the rate limit information:\n"
                   f"Rate Limit: {limit}. Used: {used}. Left: {remaining}.\n\n")
@@ -34,7 +54,7 @@ class GitHubAPI:
         """Returns the names of the .yml or .yaml files in the
         .GitHub/workflows folder, or None if there are no file."""
         workflows_url = f"https://api.github.com/repos/{repo_full_name}/contents/.github/workflows"
-        response = requests.get(workflows_url, headers=self.headers)
+        response = self.transport.get(workflows_url, headers=self.headers)
         if response.status_code == 200:
             files = response.json()
             yml_files = [file['name'] for file in files if file['name'].endswith(('.yml', '.yaml'))]
@@ -48,10 +68,19 @@ class GitHubAPI:
         try:
             url = (f'https://api.github.com/search/repositories?'
                    f'q={query}&sort={sort}&order={order}&per_page=100&page={page}')
-            response = requests.get(url, headers=self.headers)
+            response = self.transport.get(url, headers=self.headers)
             response.raise_for_status()
+            items = response.json()['items']
 
-            for repo in response.json()['items']:
+            # The workflow directories of the whole page are listed by a single query
+            try:
+                workflow_names = self.fetch_workflow_names([(repo['owner']['login'], repo['name'])
+                                                            for repo in items])
+            except requests.RequestException as e:
+                logging.error(f"Error when listing the workflows of the page {page}. Error: {e}")
+                workflow_names = {}
+
+            for repo in items:
                 repo_name = repo['full_name']
                 repo_description = repo['description']
                 repo_url = repo['html_url']
@@ -65,7 +94,9 @@ class GitHubAPI:
                 size = repo['size']
                 downloads = repo['has_downloads']
 
-                yml_file_count, yml_files = self.has_workflow_files(repo_name)
+                key = (repo['owner']['login'], repo['name'])
+                yml_file_count, yml_files = (workflow_names[key] if key in workflow_names
+                                             else self.has_workflow_files(repo_name))
                 has_yml = bool(yml_files)
 
                 logging.info(f"Verifying Repository: {repo_name} - URL: {repo_url} - YML File Count: {yml_file_count}")
@@ -100,7 +131,7 @@ class GitHubAPI:
 
         try:
             url = f'https://api.github.com/repos/{owner}/{repo_name}/commits/{commit_sha}'
-            response = requests.get(url, headers=self.headers)
+            response = self.transport.get(url, headers=self.headers)
             response.raise_for_status()
 
             commit = response.json()
@@ -131,7 +162,7 @@ class GitHubAPI:
 
         try:
             url = f'https://api.github.com/repos/{owner}/{repo_name}/issues/{issue_number}'
-            response = requests.get(url, headers=self.headers)
+            response = self.transport.get(url, headers=self.headers)
             response.raise_for_status()
 
             issue = response.json()
@@ -179,19 +210,186 @@ class GitHubAPI:
 
         return filtered_issues
 
-    def fetch_action_verification(self, user_name, action_name):
+    def graphql(self, query, variables=None):
+        """Runs a GraphQL query and returns its data. Errors on single fields (e.g. a missing
+        issue) leave the field as None, and a query without any data raises a RequestException."""
+        response = self.transport.post("https://api.github.com/graphql", headers=self.headers,
+                                       json={"query": query, "variables": variables or {}})
+        response.raise_for_status()
+        answer = response.json()
+        if answer.get('data') is None:
+            messages = "; ".join(error.get('message', '') for error in answer.get('errors', []))
+            raise requests.RequestException(f"GraphQL query failed: {messages}", response=response)
+        return answer['data']
+
+    def fetch_commits(self, owner, repo_name, commit_shas):
+        """Fetch the information of many commits, GRAPHQL_BATCH_SIZE per GraphQL query.
+        Returns a dictionary with the info of each commit found, on the format of fetch_specific_commit."""
+        found = {}
+        commit_shas = list(dict.fromkeys(commit_shas))
+        for start in range(0, len(commit_shas), GRAPHQL_BATCH_SIZE):
+            batch = commit_shas[start:start + GRAPHQL_BATCH_SIZE]
+            fields = "\n".join(f"c{index}: object(oid: $c{index}) {{ ... on Commit {{ {COMMIT_FIELDS} }} }}"
+                                for index in range(len(batch)))
+            arguments = "".join(f", $c{index}: GitObjectID!" for index in range(len(batch)))
+            query = (f"query($owner: String!, $name: String!{arguments}) "
+                     f"{{ repository(owner: $owner, name: $name) {{ {fields} }} }}")
+            variables = {"owner": owner, "name": repo_name, **{f"c{index}": sha for index, sha in enumerate(batch)}}
+
+            repository = self.graphql(query, variables)['repository'] or {}
+            for index, sha in enumerate(batch):
+                commit = repository.get(f"c{index}")
+                if not commit:
+                    logging.error(f"Commit {sha} not found on {owner}/{repo_name}.")
+                    continue
+                found[sha] = {
+                    "Author Acc": self._git_actor_type(commit['author']),
+                    "Committer Acc": self._git_actor_type(commit['committer']),
+                    "Tree": commit['tree']['oid']
+                }
+            logging.info(f"Getting Additional Info From {len(batch)} Commits of {owner}/{repo_name}")
+        return found
+
+    def fetch_issues(self, owner, repo_name, issue_numbers):
+        """Fetch the information of many issues or pull requests, GRAPHQL_BATCH_SIZE per GraphQL query.
+        Returns a dictionary with the info of each issue found, on the format of fetch_specific_issues."""
+        found = {}
+        issue_numbers = list(dict.fromkeys(int(number) for number in issue_numbers))
+        for start in range(0, len(issue_numbers), GRAPHQL_BATCH_SIZE):
+            batch = issue_numbers[start:start + GRAPHQL_BATCH_SIZE]
+            fields = "\n".join(f"i{index}: issueOrPullRequest(number: $i{index}) {{ __typename "
+                                f"... on Issue {{ {ISSUE_FIELDS} }} ... on PullRequest {{ {ISSUE_FIELDS} }} }}"
+                                for index in range(len(batch)))
+            arguments = "".join(f", $i{index}: Int!" for index in range(len(batch)))
+            query = (f"query($owner: String!, $name: String!{arguments}) "
+                     f"{{ repository(owner: $owner, name: $name) {{ {fields} }} }}")
+            variables = {"owner": owner, "name": repo_name,
+                         **{f"i{index}": number for index, number in enumerate(batch)}}
+
+            repository = self.graphql(query, variables)['repository'] or {}
+            for index, number in enumerate(batch):
+                issue = repository.get(f"i{index}")
+                if not issue:
+                    logging.error(f"Issue #{number} not found on {owner}/{repo_name}.")
+                    continue
+                creator, creator_type = self._actor(issue['author'])
+                closed = issue['timelineItems']['nodes']
+                closer, closer_type = self._actor(closed[-1].get('actor') if closed else None)
+                assignees = [self._actor(assignee) for assignee in issue['assignees']['nodes']]
+                found[number] = {
+                    "Creator": creator,
+                    "Creator association": issue['authorAssociation'],
+                    "Creator type": creator_type,
+                    "Created At": issue['createdAt'],
+                    "Closed At": issue['closedAt'],
+                    # The REST API only has the open and closed states
+                    "State": "open" if issue['state'] == "OPEN" else "closed",
+                    "Body": issue['body'] or None,
+                    "Closer": closer,
+                    "Closer type": closer_type,
+                    "Labels": ", ".join(label['name'] for label in issue['labels']['nodes']),
+                    "Reviewers/Assignees": ", ".join(login for login, account_type in assignees),
+                    "Reviewers/Assignees type": ", ".join(account_type for login, account_type in assignees),
+                    "Is Pull Request": issue['__typename'] == "PullRequest",
+                    "Milestone": issue['milestone']['title'] if issue['milestone'] else None,
+                }
+            logging.info(f"Getting Info From {len(batch)} Issues of {owner}/{repo_name}")
+        return found
+
+    def fetch_workflows(self, repositories):
+        """Fetch the workflow files on the default branch of many repositories, with their content, in a
+        single GraphQL query. Returns a dictionary with a list of {"Path", "Oid", "Content"} for each
+        (owner, name) found. The repositories without a workflow directory have an empty list."""
+        found = {}
+        for (owner, name), tree in self._fetch_workflow_trees(repositories, WORKFLOWS_FIELDS).items():
+            files = []
+            for entry in tree:
+                if entry['type'] != 'blob' or not entry['name'].endswith(('.yml', '.yaml')):
+                    continue
+                blob = entry['object']
+                if blob['isBinary']:
+                    continue
+                # Big blobs are truncated by GraphQL, so they are downloaded on their own
+                content = blob['text'] if not blob['isTruncated'] else self.fetch_blob(owner, name, blob['oid'])
+                files.append({"Path": entry['path'], "Oid": blob['oid'], "Content": content})
+            found[(owner, name)] = files
+        return found
+
+    def fetch_workflow_names(self, repositories):
+        """Does the same of has_workflow_files for many repositories, GRAPHQL_BATCH_SIZE per GraphQL query.
+        Returns a dictionary with the (count, names) of the .yml or .yaml files of each (owner, name) found."""
+        repositories = list(dict.fromkeys(repositories))
+        found = {}
+        for start in range(0, len(repositories), GRAPHQL_BATCH_SIZE):
+            batch = repositories[start:start + GRAPHQL_BATCH_SIZE]
+            for repository, tree in self._fetch_workflow_trees(batch, WORKFLOW_NAMES_FIELDS).items():
+                yml_files = [entry['name'] for entry in tree if entry['name'].endswith(('.yml', '.yaml'))]
+                found[repository] = (len(yml_files), yml_files)
+        return found
+
+    def _fetch_workflow_trees(self, repositories, fields):
+        """Returns the entries of the HEAD:.github/workflows tree of each (owner, name) found, asking
+        the given fields of the repositories."""
+        repositories = list(dict.fromkeys(repositories))
+        aliases = "\n".join(f"r{index}: repository(owner: $o{index}, name: $n{index}) {{ {fields} }}"
+                             for index in range(len(repositories)))
+        arguments = ", ".join(f"$o{index}: String!, $n{index}: String!" for index in range(len(repositories)))
+        variables = {}
+        for index, (owner, name) in enumerate(repositories):
+            variables.update({f"o{index}": owner, f"n{index}": name})
+
+        data = self.graphql(f"query({arguments}) {{ {aliases} }}", variables)
+        trees = {}
+        for index, (owner, name) in enumerate(repositories):
+            repository = data.get(f"r{index}")
+            if repository is None:
+                logging.error(f"Repository {owner}/{name} not found.")
+                continue
+            trees[(owner, name)] = (repository['object'] or {}).get('entries', [])
+        return trees
+
+    def fetch_blob(self, owner, repo_name, oid):
+        """Fetch the content of a git blob as text."""
+        url = f'https://api.github.com/repos/{owner}/{repo_name}/git/blobs/{oid}'
+        response = self.transport.get(url, headers={**self.headers, 'Accept': 'application/vnd.github.raw'})
+        response.raise_for_status()
+        return response.content.decode('utf-8', errors='replace')
+
+    @staticmethod
+    def _actor(actor):
+        """Returns the login and the account type of a GraphQL actor, as given by the REST API."""
+        if not actor:
+            return None, None
+        # The REST API names the bots with the [bot] suffix
+        login = f"{actor['login']}[bot]" if actor['__typename'] == "Bot" else actor['login']
+        return login, actor['__typename']
+
+    @staticmethod
+    def _git_actor_type(git_actor):
+        """Returns the account type of the author or committer of a commit, as given by the REST API.
+        GraphQL only links the commits to users, so the GitHub Apps are recognized by their [bot] name."""
+        if not git_actor:
+            return None
+        if git_actor['user']:
+            return "User"
+        if git_actor['name'] and git_actor['name'].endswith("[bot]"):
+            return "Bot"
+        return None
+
+    def fetch_action_verification(self, user_name, action_name, strict=False):
         """
         Fetch information about a specific app based on its name.
+        When strict is True the request errors are raised instead of being reported as an unverified action.
         """
         try:
             # Step 1: Attempt to fetch organization details
             url_org = f'https://api.github.com/orgs/{user_name}'
-            response = requests.get(url_org, headers=self.headers)
+            response = self.transport.get(url_org, headers=self.headers)
 
             if response.status_code == 404:
                 # If organization is not found, attempt to fetch user details
                 url_user = f'https://api.github.com/users/{user_name}'
-                response = requests.get(url_user, headers=self.headers)
+                response = self.transport.get(url_user, headers=self.headers)
                 response.raise_for_status()  # Raise an exception if user is not found
 
             response.raise_for_status()  # Raise an exception for any other HTTP errors
@@ -201,7 +399,7 @@ class GitHubAPI:
 
             # Step 2: Scrape the GitHub Action marketplace page for verification badge
             url_bs = f"https://github.com/marketplace/actions/{action_name}"
-            response_bs = requests.get(url_bs)
+            response_bs = self.transport.get(url_bs)
             if response_bs.status_code == 404:
                 logging.warning(f"GitHub Action marketplace page not found for action: {action_name}")
                 verification_badge = False
@@ -213,6 +411,8 @@ class GitHubAPI:
             return owner_verified, verification_badge
 
         except requests.RequestException:
+            if strict:
+                raise
             # logging.error(f"Error when searching for the {user_name} and {action_name.upper()} actions. Error: {e}")
             return False, False
 
@@ -220,7 +420,7 @@ class GitHubAPI:
         """Fetch the vulnerabilities of a repository."""
 
         url = f'https://api.github.com/repos/{owner}/{name}/security-advisories'
-        response = requests.get(url, headers=self.headers)
+        response = self.transport.get(url, headers=self.headers)
         response.raise_for_status()
 
         if response.status_code == 200:
@@ -0,0 +1,318 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from Utils.Storage import SQLiteStore
+from Utils.Utilities import Config
+
+DEFAULT_POOL_SIZE = 10
+MAX_RATE_LIMIT_RETRIES = 5
+SECONDARY_BACKOFF = 60
+MAX_SECONDARY_BACKOFF = 15 * 60
+
+
+def resource_of(url):
+    """
+    Returns the GitHub rate limit resource charged by a request, or None when the request is not rate limited
+    by the REST/GraphQL quotas (e.g. the github.com pages and the /rate_limit endpoint).
+    """
+    parsed = urlparse(url)
+    if parsed.netloc != 'api.github.com' or parsed.path.startswith('/rate_limit'):
+        return None
+    if parsed.path.startswith('/search/code'):
+        return 'code_search'
+    if parsed.path.startswith('/search/'):
+        return 'search'
+    if parsed.path.startswith('/graphql'):
+        return 'graphql'
+    return 'core'
+
+
+class RateLimiter:
+    """
+    Central token bucket of the GitHub quotas. There is one bucket per token and resource, holding the requests
+    left on the current window. The buckets are fed by the X-RateLimit-* headers of every response, spent locally
+    by every request (so the requests in flight are accounted before their headers arrive) and refilled when the
+    window resets. A bucket can also be paused, which is how Retry-After and the secondary limits are honoured.
+
+    Attributes:
+        clock: Function returning the current epoch time.
+        sleep: Function used to wait.
+        buckets (dict): State of each (token, resource) bucket.
+    """
+
+    def __init__(self, clock=time.time, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def new_bucket():
+        return {'limit': None, 'tokens': None, 'reset': 0.0, 'paused_until': 0.0}
+
+    def transaction(self, key, change):
+        """
+        Applies a change to a bucket atomically.
+
+            :param key: The (token, resource) of the bucket.
+            :param change: Function receiving the bucket and the current time. It may modify the bucket.
+            :return: The value returned by the change.
+        """
+        with self.lock:
+            bucket = self.buckets.setdefault(key, self.new_bucket())
+            return change(bucket, self.clock())
+
+    def acquire(self, key):
+        """
+        Takes a token of the bucket, waiting for the bucket to be refilled or unpaused when needed.
+        Unknown buckets are not limited until their first response arrives.
+        """
+        while True:
+            wait = self.transaction(key, self._take)
+            if wait <= 0:
+                return
+            logging.info(f"Waiting {wait:.0f}s for the GitHub {key[1]} rate limit.")
+            self.sleep(max(wait, 0.05))
+
+    @staticmethod
+    def _take(bucket, now):
+        """
+        Takes a token of the bucket. Returns 0 on success, or the seconds to wait for the next token.
+        """
+        wait = bucket['paused_until'] - now
+        if wait > 0:
+            return wait
+        if bucket['tokens'] is not None and now >= bucket['reset'] > 0:
+            bucket['tokens'] = bucket['limit']
+            bucket['reset'] = 0.0
+        if bucket['tokens'] is None:
+            return 0
+        if bucket['tokens'] >= 1:
+            bucket['tokens'] -= 1
+            return 0
+        return bucket['reset'] - now if bucket['reset'] else 1.0
+
+    def update(self, key, limit, remaining, reset):
+        """
+        Synchronizes a bucket with the rate limit reported by GitHub.
+
+            :param key: The (token, resource) of the bucket.
+            :param limit: The number of requests of a window.
+            :param remaining: The requests left on the current window.
+            :param reset: The epoch time when the window resets.
+        """
+        def synchronize(bucket, now):
+            if bucket['reset'] and reset < bucket['reset']:
+                return  # Late response of an older window
+            tokens = remaining
+            if bucket['reset'] == reset and bucket['tokens'] is not None:
+                # Same window: the local count already spent the requests that are still in flight
+                tokens = min(remaining, bucket['tokens'])
+            bucket.update(limit=limit, tokens=tokens, reset=reset)
+
+        self.transaction(key, synchronize)
+
+    def pause(self, key, seconds):
+        """
+        Stops the requests of a bucket for the given seconds.
+        """
+        def pause_bucket(bucket, now):
+            bucket['paused_until'] = max(bucket['paused_until'], now + seconds)
+
+        self.transaction(key, pause_bucket)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose buckets live on a SQLite database, so every process using the same file spends the same
+    GitHub budget. The tokens are stored as a digest, never in clear text.
+
+    Attributes:
+        store: The SQLiteStore with the buckets.
+    """
+
+    def __init__(self, path=None, clock=time.time, sleep=time.sleep):
+        super().__init__(clock, sleep)
+        if path is None:
+            path = os.path.join(Config.get_config_directory(), 'ratelimit.db')
+        self.store = _BucketStore(path)
+
+    def transaction(self, key, change):
+        token, resource = key
+        token = hashlib.sha256(token.encode()).hexdigest() if token else ''
+        with self.store.transaction() as connection:
+            row = connection.execute("SELECT limit_, tokens, reset, paused_until FROM buckets "
+                                     "WHERE token = ? AND resource = ?", (token, resource)).fetchone()
+            bucket = self.new_bucket()
+            if row:
+                bucket.update(zip(('limit', 'tokens', 'reset', 'paused_until'), row))
+            result = change(bucket, self.clock())
+            connection.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?, ?)",
+                               (token, resource, bucket['limit'], bucket['tokens'], bucket['reset'],
+                                bucket['paused_until']))
+            return result
+
+
+class _BucketStore(SQLiteStore):
+    schema = """
+        CREATE TABLE IF NOT EXISTS buckets (
+            token TEXT NOT NULL,
+            resource TEXT NOT NULL,
+            limit_ INTEGER,
+            tokens INTEGER,
+            reset REAL NOT NULL,
+            paused_until REAL NOT NULL,
+            PRIMARY KEY (token, resource)
+        );
+    """
+
+
+class Transport:
+    """
+    HTTP transport shared by the GitHubAPI objects of a process. It keeps a pool of keep-alive connections, so
+    the TLS handshakes are reused, spends the quota through a RateLimiter, and retries the requests rejected by
+    the primary or secondary rate limits instead of failing them.
+
+    Attributes:
+        session: The requests session holding the connection pool.
+        limiter: The RateLimiter of the GitHub quotas.
+        pool_size (int): Number of connections kept per host. It also bounds the concurrent requests.
+        pid (int): The process that created the transport. Its connections are not used by other processes.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, limiter=None):
+        self.session = requests.Session()
+        self.limiter = limiter or RateLimiter()
+        self.pool_size = 0
+        self.pid = os.getpid()
+        self.resize(pool_size)
+
+    @classmethod
+    def shared(cls):
+        """
+        Returns the transport of the current process, creating it on the first call.
+
+        A forked process gets its own transport, with a new connection pool of the same size, since the sockets
+        of the pool inherited from the parent are still used by the parent.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            elif cls._shared.pid != os.getpid():
+                cls._shared = cls(max(cls._shared.pool_size, DEFAULT_POOL_SIZE))
+            return cls._shared
+
+    @classmethod
+    def share_budget(cls, path=None):
+        """
+        Makes the transport of the current process spend the GitHub budget stored on a SQLite database, shared
+        with every other process using the same file.
+        """
+        transport = cls.shared()
+        if not isinstance(transport.limiter, SharedRateLimiter):
+            transport.limiter = SharedRateLimiter(path)
+        return transport
+
+    def resize(self, pool_size):
+        """
+        Grows the connection pool to serve the given number of workers. The pool never shrinks.
+        """
+        if pool_size <= self.pool_size:
+            return
+        self.pool_size = pool_size
+        retries = Retry(total=3, backoff_factor=1, status_forcelist=(500, 502, 503, 504),
+                        allowed_methods=frozenset(['GET', 'POST']), raise_on_status=False,
+                        respect_retry_after_header=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True,
+                              max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, headers=None, **kwargs):
+        """
+        Sends a request through the pool, waiting for the quota and retrying the rate limited responses.
+
+            :return: The requests Response. Errors other than the rate limits are returned as they are.
+        """
+        resource = resource_of(url)
+        key = ((headers or {}).get('Authorization'), resource)
+        attempt = 0
+
+        while True:
+            if resource:
+                self.limiter.acquire(key)
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            if not resource:
+                return response
+
+            self._record(key, response)
+            wait = self._rate_limit_wait(response, attempt)
+            if wait is None or attempt >= MAX_RATE_LIMIT_RETRIES:
+                return response
+
+            attempt += 1
+            logging.warning(f"GitHub rate limit reached on {url}. Retrying in {wait:.0f}s "
+                            f"(attempt {attempt} of {MAX_RATE_LIMIT_RETRIES}).")
+            self.limiter.pause(key, wait)
+
+    def seed(self, headers, resources):
+        """
+        Fills the buckets of a token with the resources reported by the /rate_limit endpoint.
+
+            :param headers: The headers used on the requests of the token.
+            :param resources: The 'resources' object of the /rate_limit response.
+        """
+        authorization = (headers or {}).get('Authorization')
+        for resource, quota in resources.items():
+            self.limiter.update((authorization, resource), quota['limit'], quota['remaining'], quota['reset'])
+
+    def _record(self, key, response):
+        headers = response.headers
+        try:
+            limit = int(headers['X-RateLimit-Limit'])
+            remaining = int(headers['X-RateLimit-Remaining'])
+            reset = float(headers['X-RateLimit-Reset'])
+        except (KeyError, ValueError):
+            return
+        resource = headers.get('X-RateLimit-Resource', key[1])
+        self.limiter.update((key[0], resource), limit, remaining, reset)
+
+    def _rate_limit_wait(self, response, attempt):
+        """
+        Returns the seconds to wait before retrying a rate limited response, or None if it was not rate limited.
+        """
+        if response.status_code not in (403, 429):
+            return None
+
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            reset = float(response.headers.get('X-RateLimit-Reset', 0))
+            return max(reset - self.limiter.clock(), 1.0)
+
+        if 'secondary rate limit' in response.text.lower():
+            return min(SECONDARY_BACKOFF * 2 ** attempt, MAX_SECONDARY_BACKOFF)
+
+        return None
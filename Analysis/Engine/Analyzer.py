@@ -0,0 +1,335 @@
+import functools
+import glob
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from Analysis.Engine.Walker import Walker
+from Analysis.Parse import ActionParser
+from Analysis.Smells.Categories.Maintenance.CodeReplica.CodeReplicaFct import CodeReplicaFct
+from Analysis.Smells.Categories.Maintenance.ErrorHandling.ErrorHandlingFct import ErrorHandlingFct
+from Analysis.Smells.Categories.Maintenance.Misconfiguration.MisconfigurationFct import MisconfigurationFct
+from Analysis.Smells.Categories.Quality.LongBlocks.LongBlockFct import LongBlockFct
+from Analysis.Smells.Categories.Security.AdminByDefault.AdminByDefaultFct import AdminByDefaultFct
+from Analysis.Smells.Categories.Security.HardCoded.HardCodedFct import HardCodedFct
+from Analysis.Smells.Categories.Security.RemoteTriggers.RemoteTriggersFct import RemoteRunFct
+from Analysis.Smells.Categories.Security.UnsecureProtocol.UnsecureProtocolFct import UnsecureProtocolFct
+
+
+@functools.lru_cache(maxsize=None)
+def detectors_version():
+    """
+    Returns a digest of the sources of the analysis (parser, data structures, engine and detectors).
+    Any change on them gives a new version, so the results saved by an older version are not reused.
+    """
+    analysis_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(analysis_dir, '**', '*.py'), recursive=True)):
+        digest.update(os.path.relpath(path, analysis_dir).replace(os.sep, '/').encode())
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+
+def initialize_detectors(workflow, token, offline=False):
+    """
+    Creates one factory per smell for the given workflow.
+
+    :param workflow: A Workflow object to analyze.
+    :param token: GitHub API token used by the network-backed detectors.
+    :param offline: Leaves out the network-backed detectors, which are not even imported.
+    :return: A dictionary with the detector name and its factory.
+    """
+    detectors = {
+        'CodeReplica': CodeReplicaFct(workflow),
+        'ErrorHandling': ErrorHandlingFct(workflow),
+        'Misconfiguration': MisconfigurationFct(workflow),
+        'LongBlock': LongBlockFct(workflow),
+        'AdminByDefault': AdminByDefaultFct(workflow),
+        'HardCoded': HardCodedFct(workflow),
+        'RemoteRun': RemoteRunFct(workflow),
+        'UnsecureProtocol': UnsecureProtocolFct(workflow),
+    }
+    if not offline:
+        # Imported here, so the offline analysis does not load the GitHub API client
+        from Analysis.Smells.Categories.Security.UntrustedDependencies.UntrustedDependenciesFct import \
+            UntrustedDependenciesFct
+        detectors['UntrustedDependencies'] = UntrustedDependenciesFct(workflow, token)
+    return detectors
+
+
+def detect_all(workflow, detectors):
+    """
+    Runs all the detectors sharing a single traversal of the workflow.
+
+    :param workflow: The Workflow object used to create the detectors.
+    :param detectors: Dictionary with the detector name and its factory.
+    :return: A dictionary with the findings of each detector. The detectors that failed during the traversal
+        are left out, so they can be retried on their own.
+    """
+    walker = Walker()
+    for detector in detectors.values():
+        detector.strategy.register(walker)
+    walker.walk(workflow)
+
+    results = {}
+    for detector_name, detector in detectors.items():
+        if detector.strategy not in walker.errors:
+            detector.findings = detector.strategy.results()
+            results[detector_name] = detector.findings
+    return results
+
+
+def split_finding(finding):
+    """
+    Splits a finding into the lines printed on the reports.
+    """
+    return [line.strip() for line in re.split(r',\s*(?![^{}]*})', finding)]
+
+
+def detect_file(file_path, token, offline=False, local=True, content=None):
+    """
+    Runs the detectors on a GitHub Actions file, see detect_workflow.
+    It is a module level function, so it can be sent to the worker processes.
+
+    :param file_path: Path of the GitHub Actions file.
+    :param content: The content of the file as bytes, when it was already read. It is analyzed instead of the
+        file, so the findings belong to that content even if the file changed since it was read.
+    """
+    if content is None:
+        action = ActionParser.Action(file_path=file_path)
+    else:
+        try:
+            action = ActionParser.Action(file_path=file_path, content=content.decode('utf-8'))
+        except UnicodeDecodeError:
+            return detect_workflow(None, token, offline, local)
+    return detect_workflow(action.prepare_for_analysis(), token, offline, local)
+
+
+def detect_workflow(workflow, token, offline=False, local=True):
+    """
+    Runs the detectors on a workflow, retrying the ones that fail.
+
+    :param workflow: A Workflow object to analyze, or None if the file could not be read or parsed.
+    :param token: GitHub API token.
+    :param offline: Leaves out the network-backed detectors.
+    :param local: Runs the local detectors. Without them, only UntrustedDependencies is run.
+    :return: A tuple with a dictionary of the findings of each detector, a dictionary with the log message of
+        each failure (keyed by None when the detectors could not be initialized) and whether the
+        UntrustedDependencies findings are complete.
+    """
+    if not workflow:
+        # A file that is not a workflow stays so, it is not worth a retry
+        return {}, {None: "The file is empty or is not a valid workflow. Skipping file.\n"}, False
+
+    findings = {}
+    errors = {}
+    detectors = {}
+    attempts = 0
+    while attempts < 3:
+        try:
+            detectors = initialize_detectors(workflow, token, offline)
+            break
+        except Exception as e:
+            print(f"Error initializing detectors: {e}")
+            attempts += 1
+            if attempts < 3:
+                print(f"Retrying in {3 * attempts} seconds...")
+                time.sleep(3 * attempts)
+            else:
+                print(f"Failed to initialize detectors after {attempts} attempts. Skipping file.")
+                errors[None] = f"Failed to initialize detectors after {attempts} attempts. Skipping file.\n"
+
+    if not local:
+        detectors = {name: detector for name, detector in detectors.items() if name == 'UntrustedDependencies'}
+    results = detect_all(workflow, detectors) if detectors else {}
+
+    for detector_name, detector in detectors.items():
+        detection_attempts = 0
+        findings[detector_name] = results.get(detector_name, [])
+        while detector_name not in results and detection_attempts < 3:
+            try:
+                findings[detector_name] = detector.detect()
+                break
+            except Exception as e:
+                print(f"Error detecting with {detector_name}: {e}")
+                detection_attempts += 1
+                if detection_attempts < 3:
+                    print(f"Retrying detection in {3 * detection_attempts} seconds...")
+                    time.sleep(3 * detection_attempts)
+                else:
+                    print(f"Failed to detect with {detector_name} after {detection_attempts} "
+                          f"attempts. Skipping detector.")
+                    errors[detector_name] = (f"Failed to detect with {detector_name} after {detection_attempts} "
+                                             f"attempts.\n")
+                    findings[detector_name] = []
+
+    untrusted = detectors.get('UntrustedDependencies')
+    complete = (untrusted is not None and 'UntrustedDependencies' not in errors
+                and getattr(untrusted.strategy, 'complete', True))
+    return findings, errors, complete
+
+
+def format_log(file_path, findings, errors):
+    """
+    Builds the log content of a GitHub Actions file.
+
+    :param file_path: Path of the GitHub Actions file.
+    :param findings: Dictionary with the findings of each detector.
+    :param errors: Dictionary with the log message of each failure, see detect_file.
+    :return: The log content for the file.
+    """
+    log = [errors[None]] if None in errors else []
+    for detector_name, detector_findings in findings.items():
+        if detector_name in errors:
+            log.append(errors[detector_name])
+        log.append(f"\nFindings for {detector_name} in {file_path}:\n")
+        if detector_findings:
+            for finding in detector_findings:
+                for line in split_finding(finding):
+                    log.append(f"- {line}\n")
+        else:
+            log.append("No findings detected.\n")
+
+    return "".join(log)
+
+
+def analyze_file(file_path, token, offline=False):
+    """
+    Analyzes a GitHub Actions file and builds the content of its log.
+
+    :param file_path: Path of the GitHub Actions file.
+    :param token: GitHub API token.
+    :param offline: Leaves out the network-backed detectors.
+    :return: The log content for the file.
+    """
+    findings, errors, complete = detect_file(file_path, token, offline)
+    return format_log(file_path, findings, errors)
+
+
+class BatchAnalyzer:
+    """
+    Analyzes batches of GitHub Actions files, optionally on a pool of worker processes.
+
+    With a FileCache, the findings of the files that did not change since they were analyzed are replayed from
+    the cache. The cache is only used by the current process, so the workers never share it. The workers analyze
+    the content that was hashed by the cache, so the findings are never saved under the blob ID of another content.
+
+    Attributes:
+        token (str): GitHub API token.
+        jobs (int): Number of worker processes. One means the files are analyzed on the current process.
+        offline (bool): Leaves out the network-backed detectors.
+        cache (FileCache): Cache of the findings, or None to analyze every file.
+    """
+
+    def __init__(self, token, jobs=1, offline=False, cache=None):
+        self.token = token
+        self.jobs = max(1, jobs or 1)
+        self.offline = offline
+        self.cache = cache
+
+    def findings(self, yaml_files):
+        """
+        Runs the detectors on the files and yields their findings in the same order they were given.
+
+        :param yaml_files: List with the paths of the GitHub Actions files.
+        :return: Generator of (file path, findings, errors) tuples, see detect_file.
+        """
+        failures = {}
+        known = []
+        for file_path in yaml_files:
+            try:
+                known.append(self._lookup(file_path))
+            except OSError as e:
+                # The file is missing or unreadable, e.g. it was removed after it was listed
+                failures[file_path] = f"Error reading file {file_path}: {e.strerror or e}. Skipping file.\n"
+                known.append((None, None, None, None))
+        pending = [(file_path, local is None, content)
+                   for file_path, (oid, local, untrusted, content) in zip(yaml_files, known)
+                   if file_path not in failures and self._pending(local, untrusted)]
+        detected = self._detect(pending)
+
+        for file_path, (oid, local, untrusted, content) in zip(yaml_files, known):
+            errors = {}
+            if file_path in failures:
+                findings = {}
+                errors = {None: failures[file_path]}
+            elif self._pending(local, untrusted):
+                findings, errors, complete = next(detected)
+                if self.cache is not None:
+                    self.cache.memo.save(oid, findings, errors, complete)
+                # The local findings come first, as on initialize_detectors
+                findings = {**(local or {}), **findings}
+            else:
+                findings = dict(local)
+                if not self.offline:
+                    findings['UntrustedDependencies'] = untrusted
+            yield file_path, findings, errors
+
+    def analyze(self, yaml_files):
+        """
+        Analyzes the files and yields their logs in the same order they were given.
+
+        :param yaml_files: List with the paths of the GitHub Actions files.
+        :return: Generator of (file path, log content) tuples.
+        """
+        for file_path, findings, errors in self.findings(yaml_files):
+            yield file_path, format_log(file_path, findings, errors)
+
+    def run(self, yaml_files, analysis_dir):
+        """
+        Analyzes the files and writes one log per file on the analysis directory. The logs that did not change are
+        not written again.
+        The logs are written only by the current process, so the workers never share a file.
+
+        :param yaml_files: List with the paths of the GitHub Actions files.
+        :param analysis_dir: Directory where the logs will be written.
+        """
+        for file_path, log in self.analyze(yaml_files):
+            file_root, file_ext = os.path.splitext(os.path.basename(file_path))
+            log_file_path = os.path.join(analysis_dir, f'{file_root}.log')
+            if self._read_log(log_file_path) == log:
+                print(f"Analysis complete for {file_path}.\n"
+                      f"Log {log_file_path} is up to date.\n\n")
+                continue
+            with open(log_file_path, 'w') as log_file:
+                log_file.write(log)
+
+            print(f"Analysis complete for {file_path}.\n"
+                  f"Log written to {log_file_path}.\n\n")
+
+    def _lookup(self, file_path):
+        if self.cache is None:
+            return None, None, None, None
+        oid, local, untrusted, content = self.cache.lookup(file_path)
+        if self._pending(local, untrusted) and content is None:
+            # The blob ID came from the files table, the file is read so the detectors analyze the content it names
+            oid, local, untrusted, content = self.cache.lookup(file_path, read=True)
+        return oid, local, untrusted, content
+
+    def _pending(self, local, untrusted):
+        return local is None or (not self.offline and untrusted is None)
+
+    def _detect(self, pending):
+        if self.jobs == 1 or len(pending) < 2:
+            for file_path, local, content in pending:
+                yield detect_file(file_path, self.token, self.offline, local, content)
+            return
+
+        workers = min(self.jobs, len(pending))
+        chunksize = max(1, len(pending) // (workers * 4))
+        file_paths, local, contents = zip(*pending)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(detect_file, file_paths, repeat(self.token), repeat(self.offline), local,
+                                    contents, chunksize=chunksize)
+
+    @staticmethod
+    def _read_log(log_file_path):
+        try:
+            with open(log_file_path) as log_file:
+                return log_file.read()
+        except OSError:
+            return None
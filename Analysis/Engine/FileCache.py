@@ -0,0 +1,78 @@
+import os
+import time
+
+from Analysis.Engine.Memo import SmellMemo
+from Miner.BlobStore import blob_id
+from Utils.Storage import SQLiteStore
+from Utils.Utilities import Config
+
+# Files modified less than this many nanoseconds ago are hashed every time, since a new change within the
+# resolution of the file system clock would keep the same modification time
+RACY_WINDOW = 2 * 10 ** 9
+
+
+class FileCache(SQLiteStore):
+    """
+    Persistent cache of the analysis of the files on disk, in the style of the ruff and mypy caches.
+
+    The files are identified by their git blob ID. It is taken from the files table when the path, the modification
+    time and the size did not change, and computed from the content otherwise, so a file that is touched but not
+    changed still hits the cache. The findings of each blob ID are kept on the SmellMemo, keyed by the version of
+    the detectors, so the workflows already analyzed by the miner are reused as well.
+
+    The files table is kept on the cache directory of the GASH home (~/.gash/cache).
+
+    Attributes:
+        memo (SmellMemo): The findings of each blob ID.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            oid TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, directory=None, memo=None):
+        if directory is None:
+            directory = os.path.join(Config.get_config_directory(), 'cache')
+        self.memo = memo if memo is not None else SmellMemo()
+        super().__init__(os.path.join(directory, 'files.db'))
+
+    def blob_id(self, file_path, read=False):
+        """
+        Returns the git blob ID of a file.
+
+            :param read: Computes the blob ID from the content even when the files table still has it.
+            :return: A tuple with the blob ID and the content it was computed from, or None if it was taken from
+                the files table.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        rows = self.query("SELECT mtime_ns, size, oid FROM files WHERE path = ?", (path,))
+        if not read and rows and rows[0][:2] == (stat.st_mtime_ns, stat.st_size):
+            return rows[0][2], None
+
+        with open(path, 'rb') as file:
+            content = file.read()
+        oid = blob_id(content)
+        if time.time_ns() - stat.st_mtime_ns > RACY_WINDOW:
+            self.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                         (path, stat.st_mtime_ns, stat.st_size, oid))
+        return oid, content
+
+    def lookup(self, file_path, read=False):
+        """
+        Returns the cached findings of a file.
+
+            :param read: Reads the content of the file, see blob_id. The files that are analyzed again must be
+                read, so their findings are saved under the blob ID of the content that was analyzed.
+            :return: A tuple with the blob ID of the file, the findings of the local detectors, the
+                UntrustedDependencies findings and the content of the file, or None if it was not read. The
+                findings are None when they are unknown or expired.
+        """
+        oid, content = self.blob_id(file_path, read)
+        findings, untrusted = self.memo.get(oid)
+        return oid, findings, untrusted, content
@@ -0,0 +1,127 @@
+import hashlib
+import json
+
+from Analysis.Engine import Analyzer
+from Analysis.Engine.Walker import Walker
+
+# Detectors whose job callbacks only depend on the job and only add to (or replace) the lists of their strategy.
+# The others are run on the whole workflow every time.
+JOB_LOCAL_DETECTORS = ('CodeReplica', 'ErrorHandling', 'Misconfiguration', 'LongBlock', 'AdminByDefault',
+                       'HardCoded', 'RemoteRun', 'UnsecureProtocol')
+
+
+def job_digest(job_name, job):
+    """
+    Returns a digest of the name and the content of a job.
+    The keys are kept in their order, since the findings follow it, so a job with reordered keys is a new job.
+    """
+    content = json.dumps([job_name, job], default=lambda value: vars(value)
+                         if hasattr(value, '__dict__') else repr(value))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class IncrementalAnalyzer:
+    """
+    Analyzes the new versions of a workflow, running the detectors only on the jobs that changed.
+
+    The workflow node is visited every time, which keeps the workflow level checks (like the job count of
+    LongBlock) up to date. For every job, the analyzer records what the visit added to the lists of each strategy,
+    keyed by the digest of the job. When a job did not change, the record is replayed instead of visiting the job
+    again, and results() folds the lists as after a full walk. The checks across jobs (like the replicated jobs of
+    CodeReplica) are folded by results(), so they follow the changed jobs as well.
+
+    Attributes:
+        token (str): GitHub API token.
+        offline (bool): Leaves out the network-backed detectors.
+        records (dict): What each job added to each strategy on the last analysis, keyed by (detector, digest).
+        analyzed_jobs (int): Number of jobs visited by the last analysis.
+        reused_jobs (int): Number of jobs replayed by the last analysis.
+    """
+
+    def __init__(self, token=None, offline=True):
+        self.token = token
+        self.offline = offline
+        self.records = {}
+        self.analyzed_jobs = 0
+        self.reused_jobs = 0
+
+    def analyze(self, workflow):
+        """
+        Runs the detectors on a workflow, reusing the records of the jobs of the last analysis.
+
+        :param workflow: A Workflow object.
+        :return: A dictionary with the findings of each detector. The detectors that failed are left out.
+        """
+        detectors = Analyzer.initialize_detectors(workflow, self.token, self.offline)
+        digests = {job_name: job_digest(job_name, job) for job_name, job in workflow.jobs.items()}
+        changed = {job_name for job_name, digest in digests.items()
+                   if any((name, digest) not in self.records for name in detectors if name in JOB_LOCAL_DETECTORS)}
+
+        records = {}
+        results = {}
+        for name, detector in detectors.items():
+            strategy = detector.strategy
+            walker = Walker()
+            strategy.register(walker)
+            detector_records = {}
+            if name not in JOB_LOCAL_DETECTORS:
+                walker.walk(workflow)
+            else:
+                walker.walk_workflow(workflow)
+                for job_name, job in workflow.jobs.items():
+                    key = (name, digests[job_name])
+                    if key in self.records:
+                        self.replay(strategy, self.records[key])
+                        detector_records[key] = self.records[key]
+                        continue
+                    lists = self.lists(strategy)
+                    walker.walk_job(job_name, job)
+                    detector_records[key] = self.record(strategy, lists)
+
+            # The records of a failed detector are incomplete, so its jobs are visited again next time
+            if strategy not in walker.errors:
+                detector.findings = strategy.results()
+                results[name] = detector.findings
+                records.update(detector_records)
+
+        self.records = records
+        self.analyzed_jobs = len(changed)
+        self.reused_jobs = len(digests) - len(changed)
+        return results
+
+    @staticmethod
+    def lists(strategy):
+        """
+        Returns the lists of a strategy and their lengths.
+        """
+        return {name: (value, len(value)) for name, value in vars(strategy).items() if isinstance(value, list)}
+
+    @staticmethod
+    def record(strategy, lists):
+        """
+        Returns what was added to the lists of a strategy since they were taken with lists().
+
+        :return: List of (attribute, replaced, items) tuples. Replaced tells if the list was set to the items,
+            instead of extended with them.
+        """
+        record = []
+        for name, value in vars(strategy).items():
+            if not isinstance(value, list):
+                continue
+            previous, length = lists.get(name, (None, 0))
+            if value is not previous:
+                record.append((name, True, list(value)))
+            elif len(value) > length:
+                record.append((name, False, value[length:]))
+        return record
+
+    @staticmethod
+    def replay(strategy, record):
+        """
+        Applies a record of a job to the lists of a strategy.
+        """
+        for name, replaced, items in record:
+            if replaced:
+                setattr(strategy, name, list(items))
+            else:
+                getattr(strategy, name).extend(items)
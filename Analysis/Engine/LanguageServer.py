@@ -0,0 +1,369 @@
+import json
+import logging
+import re
+import threading
+
+import yaml
+
+from Analysis.Engine.Incremental import IncrementalAnalyzer
+from Analysis.Parse import ActionParser
+
+SEVERITY_ERROR = 1
+SEVERITY_WARNING = 2
+
+# Names of the jobs and steps quoted by the findings, used to place them on the document
+JOB_PATTERNS = (re.compile(r"[Jj]ob '([^']+)'"), re.compile(r"\bjob ([\w.-]+)"))
+STEP_PATTERN = re.compile(r"[Ss]tep '([^']*)'")
+
+
+def utf16_offset(line, character):
+    """
+    Converts a character position of the Language Server Protocol, counted in UTF-16 code units, to an index of
+    the line.
+    """
+    units = 0
+    for index, char in enumerate(line):
+        if units >= character:
+            return index
+        units += 2 if ord(char) > 0xFFFF else 1
+    return len(line)
+
+
+def apply_change(text, change):
+    """
+    Applies a change of a textDocument/didChange notification to a text.
+
+    :param text: The text of the document.
+    :param change: A TextDocumentContentChangeEvent. Without a range, it replaces the whole text.
+    :return: The new text.
+    """
+    if 'range' not in change:
+        return change['text']
+
+    lines = text.split('\n')
+
+    def offset(position):
+        line = min(position['line'], len(lines))
+        start = sum(len(previous) + 1 for previous in lines[:line])
+        return start + (utf16_offset(lines[line], position['character']) if line < len(lines) else 0)
+
+    start = min(offset(change['range']['start']), len(text))
+    end = min(offset(change['range']['end']), len(text))
+    return text[:start] + change['text'] + text[end:]
+
+
+def has_aliases(root):
+    """
+    Checks if a YAML node tree has aliases, which make a node appear more than once.
+    """
+    seen = set()
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        if id(node) in seen:
+            return True
+        seen.add(id(node))
+        if isinstance(node, yaml.MappingNode):
+            for key, value in node.value:
+                nodes.append(key)
+                nodes.append(value)
+        elif isinstance(node, yaml.SequenceNode):
+            nodes.extend(node.value)
+    return False
+
+
+class Locations:
+    """
+    Lines of the jobs and steps of a workflow document, read from the YAML nodes.
+
+    Attributes:
+        lines (list): The lines of the document.
+        jobs (dict): Line of the key of each job.
+        steps (dict): Line of each (job name, step name).
+    """
+
+    def __init__(self, text, root):
+        self.lines = text.split('\n')
+        self.jobs = {}
+        self.steps = {}
+        jobs = self.value(root, 'jobs')
+        if not isinstance(jobs, yaml.MappingNode):
+            return
+        for key, job in jobs.value:
+            self.jobs[key.value] = key.start_mark.line
+            steps = self.value(job, 'steps')
+            if not isinstance(steps, yaml.SequenceNode):
+                continue
+            for step in steps.value:
+                name = self.value(step, 'name')
+                if isinstance(name, yaml.ScalarNode):
+                    self.steps.setdefault((key.value, name.value), step.start_mark.line)
+
+    def locate(self, finding):
+        """
+        Returns the line of the step or the job named by a finding, or the first line of the document.
+        """
+        job_name = next((match.group(1) for pattern in JOB_PATTERNS for match in pattern.finditer(finding)
+                         if match.group(1) in self.jobs), None)
+        step = STEP_PATTERN.search(finding)
+        if job_name is not None and step and (job_name, step.group(1)) in self.steps:
+            return self.steps[(job_name, step.group(1))]
+        if job_name is not None:
+            return self.jobs[job_name]
+        return 0
+
+    def range(self, line):
+        """
+        Returns the range of a line, without its indentation.
+        """
+        text = self.lines[line] if line < len(self.lines) else ''
+        return {"start": {"line": line, "character": len(text) - len(text.lstrip())},
+                "end": {"line": line, "character": len(text)}}
+
+    @staticmethod
+    def value(node, key):
+        """
+        Returns the value node of a key of a mapping node, or None.
+        """
+        if not isinstance(node, yaml.MappingNode):
+            return None
+        return next((value for name, value in node.value if name.value == key), None)
+
+
+class LanguageServer:
+    """
+    Language Server Protocol server publishing the smells of the workflows open on an editor as diagnostics.
+
+    The documents are kept in memory and updated with the incremental changes sent by the editor. They are
+    analyzed again after a pause of the edits (the debounce), each one by its own IncrementalAnalyzer, so only the
+    jobs that changed go through the detectors again. The workflows already parsed are kept by the parse cache.
+
+    Attributes:
+        input: Binary stream of the messages from the editor.
+        output: Binary stream of the messages to the editor.
+        token (str): GitHub API token.
+        offline (bool): Leaves out the network-backed detectors.
+        debounce (float): Seconds without edits before a document is analyzed. With zero, the documents are
+            analyzed when they change.
+        documents (dict): Text and version of each open document.
+        analyzers (dict): The IncrementalAnalyzer of each open document.
+        jobs (dict): The source and the Job object of each job of each open document, as of the last build.
+    """
+
+    def __init__(self, input, output, token=None, offline=True, debounce=0.15):
+        self.input = input
+        self.output = output
+        self.token = token
+        self.offline = offline
+        self.debounce = debounce
+        self.documents = {}
+        self.analyzers = {}
+        self.jobs = {}
+        self.timers = {}
+        self.running = True
+        self._lock = threading.RLock()
+        self._output_lock = threading.Lock()
+
+    def run(self):
+        """
+        Handles the messages until the editor sends exit or closes the input.
+        """
+        while self.running:
+            message = self.read()
+            if message is None:
+                break
+            self.handle(message)
+        for timer in list(self.timers.values()):
+            timer.cancel()
+
+    def read(self):
+        """
+        Reads a message, or returns None when the input is closed.
+        The malformed messages are answered with an error and skipped, so they do not stop the server.
+        """
+        while True:
+            headers = self.read_headers()
+            if headers is None:
+                return None
+            if 'content-length' not in headers:
+                continue
+            try:
+                length = int(headers['content-length'])
+                if length < 0:
+                    raise ValueError(f"Invalid Content-Length: {length}")
+                message = json.loads(self.input.read(length))
+            except ValueError as e:
+                # The request could not be parsed, so its id is unknown
+                self.send({"id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}})
+                continue
+            if not isinstance(message, dict):
+                self.send({"id": None, "error": {"code": -32600, "message": "Invalid request"}})
+                continue
+            return message
+
+    def read_headers(self):
+        """
+        Reads the headers of a message, or returns None when the input is closed.
+        """
+        headers = {}
+        while True:
+            header = self.input.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                return headers
+            name, _, value = header.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    def send(self, message):
+        data = json.dumps({"jsonrpc": "2.0", **message}).encode('utf-8')
+        with self._output_lock:
+            self.output.write(b"Content-Length: %d\r\n\r\n" % len(data) + data)
+            self.output.flush()
+
+    def handle(self, message):
+        """
+        Handles a request or a notification.
+        """
+        method = message.get('method')
+        params = message.get('params') or {}
+        request_id = message.get('id')
+
+        if method == 'initialize':
+            self.send({"id": request_id, "result": {
+                "capabilities": {"textDocumentSync": {"openClose": True, "change": 2}},
+                "serverInfo": {"name": "gash"}}})
+        elif method == 'shutdown':
+            self.send({"id": request_id, "result": None})
+        elif method == 'exit':
+            self.running = False
+        elif method == 'textDocument/didOpen':
+            document = params['textDocument']
+            self.update(document['uri'], document['text'], document.get('version'))
+        elif method == 'textDocument/didChange':
+            uri = params['textDocument']['uri']
+            with self._lock:
+                text = self.documents.get(uri, ('', None))[0]
+                for change in params['contentChanges']:
+                    text = apply_change(text, change)
+            self.update(uri, text, params['textDocument'].get('version'))
+        elif method == 'textDocument/didClose':
+            uri = params['textDocument']['uri']
+            with self._lock:
+                self.documents.pop(uri, None)
+                self.analyzers.pop(uri, None)
+                self.jobs.pop(uri, None)
+                timer = self.timers.pop(uri, None)
+            if timer is not None:
+                timer.cancel()
+            self.send({"method": "textDocument/publishDiagnostics", "params": {"uri": uri, "diagnostics": []}})
+        elif request_id is not None and method is not None:
+            self.send({"id": request_id, "error": {"code": -32601, "message": f"Method not found: {method}"}})
+
+    def update(self, uri, text, version):
+        """
+        Saves the new text of a document and schedules its analysis.
+        """
+        with self._lock:
+            self.documents[uri] = (text, version)
+            timer = self.timers.pop(uri, None)
+            if timer is not None:
+                timer.cancel()
+            if self.debounce <= 0:
+                self.publish(uri)
+                return
+            self.timers[uri] = threading.Timer(self.debounce, self.publish, (uri,))
+            self.timers[uri].daemon = True
+            self.timers[uri].start()
+
+    def publish(self, uri):
+        """
+        Analyzes a document and publishes its diagnostics, unless it changed meanwhile.
+        """
+        with self._lock:
+            if uri not in self.documents:
+                return
+            text, version = self.documents[uri]
+            try:
+                diagnostics = self.diagnostics(uri, text)
+            except Exception as e:
+                logging.exception(f"Error when analyzing {uri}.")
+                diagnostics = [{"range": {"start": {"line": 0, "character": 0}, "end": {"line": 0, "character": 0}},
+                                "severity": SEVERITY_ERROR, "source": "gash", "message": f"Analysis failed: {e}"}]
+            if self.documents.get(uri, (None, None))[1] != version:
+                return
+        self.send({"method": "textDocument/publishDiagnostics",
+                   "params": {"uri": uri, "version": version, "diagnostics": diagnostics}})
+
+    def build(self, uri, text, action, loader, root):
+        """
+        Builds the workflow of a document from its YAML nodes. The jobs with the same source as on the last build
+        are reused instead of built again, unless the document has aliases, which can bring content from outside
+        of the job.
+
+        :return: A Workflow object, or None if the document is empty.
+        """
+        jobs = Locations.value(root, 'jobs')
+        nodes = jobs.value if isinstance(jobs, yaml.MappingNode) else None
+        sources = {}
+        previous = self.jobs.pop(uri, {})
+        if nodes is not None and not ('*' in text and has_aliases(root)):
+            sources = {key.value: text[job.start_mark.index:job.end_mark.index] for key, job in nodes}
+            # With repeated job names the last one wins, so every job is constructed
+            if len(sources) == len(nodes):
+                # Only the new jobs are constructed
+                jobs.value = [(key, job) for key, job in nodes
+                              if previous.get(key.value, (None, None))[0] != sources[key.value]]
+            else:
+                sources = {}
+
+        try:
+            raw_data = loader.construct_document(root)
+        finally:
+            # The nodes of every job are still needed to locate the findings
+            if nodes is not None:
+                jobs.value = nodes
+        if not raw_data:
+            return None
+        workflow = action.populate_workflow(raw_data)
+        if sources:
+            workflow.jobs = {job_name: workflow.jobs[job_name] if job_name in workflow.jobs else previous[job_name][1]
+                             for job_name in sources}
+            self.jobs[uri] = {job_name: (source, workflow.jobs[job_name]) for job_name, source in sources.items()}
+        return workflow
+
+    def diagnostics(self, uri, text):
+        """
+        Returns the diagnostics of a document: its YAML errors, or the findings of the detectors.
+        """
+        # The YAML is composed once, for the lines of the nodes and for the workflow
+        action = ActionParser.Action(content=text)
+        loader = action.loader(text)
+        try:
+            root = loader.get_single_node()
+            key = f"{action.loader.__name__}:{ActionParser.workflow_cache.digest(text)}"
+            workflow = ActionParser.workflow_cache.get(key)
+            if workflow is None and root is not None:
+                workflow = self.build(uri, text, action, loader, root)
+                if workflow is not None:
+                    ActionParser.workflow_cache.put(key, workflow)
+        except yaml.MarkedYAMLError as e:
+            mark = e.problem_mark or e.context_mark
+            line = mark.line if mark else 0
+            return [{"range": Locations(text, None).range(line), "severity": SEVERITY_ERROR, "source": "gash",
+                     "message": f"Invalid YAML: {e.problem or e}"}]
+        finally:
+            loader.dispose()
+        if not workflow:
+            return []
+
+        analyzer = self.analyzers.setdefault(uri, IncrementalAnalyzer(self.token, self.offline))
+        locations = Locations(text, root)
+        diagnostics = []
+        for detector_name, findings in analyzer.analyze(workflow).items():
+            for finding in findings:
+                diagnostics.append({"range": locations.range(locations.locate(finding)),
+                                    "severity": SEVERITY_WARNING, "source": "gash", "code": detector_name,
+                                    "message": finding})
+        return diagnostics
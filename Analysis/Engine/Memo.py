@@ -0,0 +1,97 @@
+import json
+import os
+import time
+
+from Analysis.Engine import Analyzer
+from Utils.Storage import SQLiteStore
+from Utils.Utilities import Config
+
+DEFAULT_UNTRUSTED_TTL = 7 * 24 * 60 * 60
+
+
+class SmellMemo(SQLiteStore):
+    """
+    Persistent memo of the findings of each workflow content, keyed by its git blob ID and the version of the
+    detectors. The same file on many commits, repositories or forks is then analyzed once.
+
+    The findings of the local detectors never expire. The UntrustedDependencies findings depend on the GitHub
+    API, so they are kept apart and expire after the same TTL of the action cache ([cache] action_ttl).
+
+    Attributes:
+        version (str): Version of the detectors, see Analyzer.detectors_version.
+        untrusted_ttl (float): Seconds the UntrustedDependencies findings are reused.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS smells (
+            oid TEXT NOT NULL,
+            version TEXT NOT NULL,
+            findings TEXT,
+            untrusted TEXT,
+            untrusted_at REAL,
+            PRIMARY KEY (oid, version)
+        );
+    """
+
+    def __init__(self, path=None, version=None, untrusted_ttl=None):
+        if path is None:
+            path = os.path.join(Config.get_config_directory(), 'smells.db')
+        if untrusted_ttl is None:
+            untrusted_ttl = float(Config.read_setting('cache', 'action_ttl', DEFAULT_UNTRUSTED_TTL))
+        self.version = version or Analyzer.detectors_version()
+        self.untrusted_ttl = untrusted_ttl
+        super().__init__(path)
+
+    def get(self, oid):
+        """
+        Returns the memo of a blob.
+
+            :param oid: The git blob ID of the workflow content.
+            :return: A tuple with the findings of the local detectors ({detector name: findings}) and the
+                UntrustedDependencies findings. Each one is None when it is unknown or expired.
+        """
+        rows = self.query("SELECT findings, untrusted, untrusted_at FROM smells WHERE oid = ? AND version = ?",
+                          (oid, self.version))
+        if not rows:
+            return None, None
+        findings, untrusted, untrusted_at = rows[0]
+        if untrusted is not None and time.time() - untrusted_at > self.untrusted_ttl:
+            untrusted = None
+        return (json.loads(findings) if findings is not None else None,
+                json.loads(untrusted) if untrusted is not None else None)
+
+    def put(self, oid, findings=None, untrusted=None):
+        """
+        Saves the findings of a blob. The values given as None keep what was saved before.
+
+            :param oid: The git blob ID of the workflow content.
+            :param findings: Dictionary with the findings of each local detector.
+            :param untrusted: The UntrustedDependencies findings.
+        """
+        self.execute(
+            "INSERT INTO smells VALUES (?, ?, ?, ?, ?) ON CONFLICT (oid, version) DO UPDATE SET "
+            "findings = COALESCE(excluded.findings, findings), "
+            "untrusted = COALESCE(excluded.untrusted, untrusted), "
+            "untrusted_at = COALESCE(excluded.untrusted_at, untrusted_at)",
+            (oid, self.version,
+             json.dumps(findings) if findings is not None else None,
+             json.dumps(untrusted) if untrusted is not None else None,
+             time.time() if untrusted is not None else None))
+
+    def save(self, oid, findings, errors, complete):
+        """
+        Saves the findings of a blob given by Analyzer.detect_workflow, leaving out the detectors that failed.
+
+            :param oid: The git blob ID of the workflow content.
+            :param findings: Dictionary with the findings of each detector.
+            :param errors: Dictionary with the failures of the detectors.
+            :param complete: Whether the UntrustedDependencies findings are complete.
+        """
+        local = {name: found for name, found in findings.items() if name != 'UntrustedDependencies'}
+        if not local or errors.keys() & local.keys():
+            local = None
+        untrusted = findings.get('UntrustedDependencies')
+        if not complete or 'UntrustedDependencies' in errors:
+            untrusted = None
+        if local is not None or untrusted is not None:
+            self.put(oid, findings=local, untrusted=untrusted)
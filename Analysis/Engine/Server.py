@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from Analysis.Engine import Analyzer
+from Analysis.Engine.Memo import SmellMemo
+from Analysis.Parse import ActionParser
+from Miner.BlobStore import blob_id
+
+MAX_CONTENT_LENGTH = 10 * 1024 * 1024
+
+
+class AnalysisServer:
+    """
+    Long-running analysis service. The parsed workflows, the compiled secret patterns and the action cache are
+    kept by the process, so every request after the first one is answered without loading or building them again.
+    The findings of each content are also kept on the SmellMemo, like the findings of the mined workflows.
+
+    The service speaks HTTP, on a localhost port or on a Unix socket:
+        - GET /health returns the version of the detectors.
+        - POST /analyze receives the workflow content as the body and returns its findings as JSON. The
+          offline=1 query parameter leaves out the network-backed detectors.
+
+    Attributes:
+        token (str): GitHub API token used by the network-backed detectors.
+        offline (bool): Leaves out the network-backed detectors on every request.
+        memo (SmellMemo): The findings of each content.
+    """
+
+    def __init__(self, token, offline=False, memo=None):
+        self.token = token
+        self.offline = offline
+        self.memo = memo if memo is not None else SmellMemo()
+
+    def analyze(self, content, offline=False):
+        """
+        Analyzes a workflow content.
+
+            :param content: The YAML content of the workflow, as bytes.
+            :param offline: Leaves out the network-backed detectors.
+            :return: A dictionary with the blob ID of the content, the findings of each detector and the error
+                messages, or None if the content is not a valid workflow.
+        """
+        offline = offline or self.offline
+        oid = blob_id(content)
+        local, untrusted = self.memo.get(oid)
+        errors = {}
+        if local is None or (not offline and untrusted is None):
+            try:
+                workflow = ActionParser.Action(content=content.decode('utf-8')).prepare_for_analysis()
+            except UnicodeDecodeError:
+                workflow = None
+            if not workflow:
+                return None
+            found, errors, complete = Analyzer.detect_workflow(workflow, self.token, offline, local is None)
+            self.memo.save(oid, found, errors, complete)
+            findings = {**(local or {}), **found}
+        else:
+            findings = dict(local)
+            if not offline:
+                findings['UntrustedDependencies'] = untrusted
+        return {"oid": oid, "findings": findings, "errors": [error.strip() for error in errors.values()]}
+
+    def serve(self, host='127.0.0.1', port=8765, socket_path=None):
+        """
+        Serves the requests until the process is stopped.
+
+            :param host: The address to listen on.
+            :param port: The port to listen on.
+            :param socket_path: Path of a Unix socket to listen on instead of the port.
+        """
+        with self.server(host, port, socket_path) as server:
+            logging.info(f"Serving the analysis on {socket_path or '%s:%d' % server.server_address[:2]}.")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                if socket_path:
+                    os.remove(socket_path)
+
+    def server(self, host='127.0.0.1', port=8765, socket_path=None):
+        """
+        Builds the HTTP server of the service, without starting it.
+        """
+        handler = type('Handler', (AnalysisHandler,), {'service': self})
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            return UnixHTTPServer(socket_path, handler)
+        return ThreadingHTTPServer((host, port), handler)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    """
+    Handles the HTTP requests of an AnalysisServer, given as the service attribute.
+    """
+
+    service = None
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/health':
+            self.reply(404, {"error": "Not found."})
+            return
+        self.reply(200, {"status": "ok", "version": Analyzer.detectors_version(), "offline": self.service.offline})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/analyze':
+            self.reply(404, {"error": "Not found."})
+            return
+
+        length = self.headers.get('Content-Length', '').strip()
+        if not (length.isascii() and length.isdigit()):
+            # A negative length would read until the client closes the connection
+            self.reply(400, {"error": "A valid Content-Length is required."})
+            return
+        length = int(length)
+        if length > MAX_CONTENT_LENGTH:
+            self.reply(413, {"error": "The workflow is too large."})
+            return
+        content = self.rfile.read(length)
+        offline = parse_qs(url.query).get('offline', ['0'])[-1] not in ('0', 'false', '')
+        try:
+            result = self.service.analyze(content, offline)
+        except Exception as e:
+            logging.exception("Error when analyzing a workflow.")
+            self.reply(500, {"error": str(e)})
+            return
+        if result is None:
+            self.reply(400, {"error": "The content is not a valid workflow."})
+            return
+        self.reply(200, result)
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix sockets have no client address
+        return self.client_address[0] if self.client_address else 'local'
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
@@ -0,0 +1,116 @@
+import logging
+
+
+class Walker:
+    """
+    Visits the Workflow -> Job -> Step tree a single time and calls the callbacks registered by the detectors
+    for every node, so many detectors can share the same traversal.
+
+    Events and callback signatures:
+        workflow: callback(workflow)
+        env: callback(level, key, value, job_name, step). Level is 'workflow', 'job' or 'step'.
+        job: callback(job_name, job)
+        step: callback(job_name, job, step)
+        run: callback(job_name, step)
+
+    The env entries of a node are visited before the node itself, and a job is visited before its steps.
+
+    Attributes:
+        callbacks: Dictionary with the list of (owner, callback) registered for each event.
+        errors: Dictionary with the exception raised by each owner during the last walk.
+    """
+
+    EVENTS = ('workflow', 'env', 'job', 'step', 'run')
+
+    def __init__(self):
+        self.callbacks = {event: [] for event in self.EVENTS}
+        self.errors = {}
+
+    def register(self, owner, event, callback):
+        """
+        Registers a callback for an event.
+
+        :param owner: The object that owns the callback, usually a detector strategy.
+        :param event: One of the Walker.EVENTS.
+        :param callback: The function called when the event happens.
+        """
+        if event not in self.callbacks:
+            raise ValueError(f"Unknown event '{event}'. Use one of {self.EVENTS}.")
+        self.callbacks[event].append((owner, callback))
+
+    def walk(self, workflow):
+        """
+        Walks the workflow tree once. When a callback fails, the remaining callbacks of the same owner are skipped
+        and the error is stored in self.errors, so the other owners can finish their analysis.
+
+        :param workflow: A Workflow object.
+        :return: Dictionary with the errors raised by each owner.
+        """
+        self.errors = {}
+        self.walk_workflow(workflow)
+        for job_name, job in workflow.jobs.items():
+            self.walk_job(job_name, job)
+        return self.errors
+
+    def walk_workflow(self, workflow):
+        """
+        Visits only the workflow node and its env entries, without the jobs. The errors are added to self.errors.
+
+        :param workflow: A Workflow object.
+        """
+        self._emit('workflow', workflow)
+        self._emit_env('workflow', workflow.env, None, None)
+
+    def walk_job(self, job_name, job):
+        """
+        Visits a job and its steps. The errors are added to self.errors.
+
+        :param job_name: The name of the job.
+        :param job: A Job object.
+        """
+        self._emit_env('job', job.env, job_name, None)
+        self._emit('job', job_name, job)
+
+        for step in job.steps:
+            self._emit_env('step', step.env, job_name, step)
+            self._emit('step', job_name, job, step)
+            if step.run:
+                self._emit('run', job_name, step)
+
+    def raise_error(self, owner):
+        """
+        Raises again the error of an owner, if it had one on the last walk.
+        """
+        if owner in self.errors:
+            raise self.errors[owner]
+
+    @classmethod
+    def visit(cls, workflow, owner, callbacks):
+        """
+        Walks a workflow with the callbacks of a single owner.
+
+        :param workflow: A Workflow object.
+        :param owner: The object that owns the callbacks.
+        :param callbacks: List of (event, callback) tuples.
+        """
+        walker = cls()
+        for event, callback in callbacks:
+            walker.register(owner, event, callback)
+        walker.walk(workflow)
+        walker.raise_error(owner)
+
+    def _emit_env(self, level, env, job_name, step):
+        if not self.callbacks['env'] or not isinstance(env, dict):
+            return
+        for key, value in env.items():
+            self._emit('env', level, key, value, job_name, step)
+
+    def _emit(self, event, *args):
+        for owner, callback in self.callbacks[event]:
+            if owner in self.errors:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error(f"Error on {type(owner).__name__} while visiting the {event} node. Error: {e}")
+                self.errors[owner] = e
@@ -0,0 +1,191 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+
+from Analysis.Engine import Analyzer
+from Analysis.Engine.Incremental import IncrementalAnalyzer
+from Analysis.Parse import ActionParser
+
+WORKFLOW_EXTENSIONS = ('.yml', '.yaml')
+
+
+class Inotify:
+    """
+    Minimal wrapper of the Linux inotify API, watching the files written, moved or removed on a directory.
+
+    Attributes:
+        fd (int): The inotify file descriptor.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available.")
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed.")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            self.close()
+            raise OSError(error, f"inotify_add_watch failed for {directory}.")
+
+    def read(self, timeout=None):
+        """
+        Waits for events and returns the names of the files they refer to.
+
+            :param timeout: Seconds to wait, or None to wait forever.
+            :return: A set with the file names, empty if the timeout expired.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        names = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        names.discard('')
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class WorkflowWatcher:
+    """
+    Watches the workflow files of a repository and analyzes them again when they change. Every file keeps an
+    IncrementalAnalyzer, so only the jobs that changed go through the detectors again.
+
+    The changes are read with inotify, or by polling the modification times where inotify is not available.
+
+    Attributes:
+        directory (str): The watched directory, the .github/workflows directory of the repository if it has one.
+        offline (bool): Leaves out the network-backed detectors.
+        interval (float): Seconds between two polls.
+        debounce (float): Seconds waited for more changes after the first one, so a save is analyzed once.
+        poll_only (bool): Polls the files even if inotify is available.
+        analyzers (dict): The IncrementalAnalyzer of each file.
+        mtimes (dict): The (modification time, size) of each file, used by the polling.
+    """
+
+    def __init__(self, directory, token=None, offline=True, interval=1.0, debounce=0.1, poll=False):
+        workflows = os.path.join(directory, '.github', 'workflows')
+        self.directory = workflows if os.path.isdir(workflows) else directory
+        self.token = token
+        self.offline = offline
+        self.interval = interval
+        self.debounce = debounce
+        self.poll_only = poll
+        self.analyzers = {}
+        self.mtimes = {}
+
+    def files(self):
+        """
+        Returns the paths of the workflow files of the directory.
+        """
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.endswith(WORKFLOW_EXTENSIONS))
+
+    def poll(self):
+        """
+        Returns the paths of the files created, modified or removed since the last poll.
+        """
+        mtimes = {}
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            mtimes[path] = (stat.st_mtime_ns, stat.st_size)
+        changed = {path for path in mtimes.keys() | self.mtimes.keys() if mtimes.get(path) != self.mtimes.get(path)}
+        self.mtimes = mtimes
+        return changed
+
+    def analyze(self, path):
+        """
+        Analyzes a workflow file, reusing the findings of the jobs that did not change since the last analysis.
+
+            :return: A dictionary with the findings of each detector, or None if the file was removed or is not a
+                valid workflow.
+        """
+        if not os.path.exists(path):
+            self.analyzers.pop(path, None)
+            return None
+        workflow = ActionParser.Action(file_path=path).prepare_for_analysis()
+        if not workflow:
+            return None
+        analyzer = self.analyzers.setdefault(path, IncrementalAnalyzer(self.token, self.offline))
+        return analyzer.analyze(workflow)
+
+    def report(self, path):
+        """
+        Analyzes a workflow file and prints its findings.
+        """
+        started = time.perf_counter()
+        findings = self.analyze(path)
+        if findings is None:
+            print(f"{path} is not a valid workflow.\n" if os.path.exists(path) else f"{path} was removed.\n")
+            return
+        analyzer = self.analyzers[path]
+        print(Analyzer.format_log(path, findings, {}))
+        print(f"Analyzed {analyzer.analyzed_jobs} changed jobs and reused {analyzer.reused_jobs} in "
+              f"{(time.perf_counter() - started) * 1000:.1f} ms.\n")
+
+    def changes(self):
+        """
+        Yields the sets of paths changed, grouping the changes made within the debounce time.
+        """
+        inotify = None
+        if not self.poll_only:
+            try:
+                inotify = Inotify(self.directory)
+            except OSError as e:
+                logging.info(f"Polling the workflows every {self.interval} seconds. {e}")
+
+        try:
+            while True:
+                if inotify is None:
+                    time.sleep(self.interval)
+                    changed = self.poll()
+                else:
+                    names = inotify.read()
+                    more = inotify.read(self.debounce)
+                    while more:
+                        names |= more
+                        more = inotify.read(self.debounce)
+                    changed = {os.path.join(self.directory, name) for name in names
+                               if name.endswith(WORKFLOW_EXTENSIONS)}
+                if changed:
+                    yield changed
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def run(self):
+        """
+        Analyzes every workflow file, and then every file that changes, until the process is stopped.
+        """
+        self.poll()
+        for path in self.files():
+            self.report(path)
+        print(f"Watching {self.directory} for changes...\n")
+        try:
+            for changed in self.changes():
+                for path in sorted(changed):
+                    self.report(path)
+        except KeyboardInterrupt:
+            pass
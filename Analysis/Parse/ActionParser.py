@@ -1,3 +1,7 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
 import yaml
 from Analysis.DataStruct import Jobs, Steps, Workflow
 
@@ -6,11 +10,101 @@ def no_boolean_constructor(loader, node):
     return loader.construct_scalar(node)
 
 
-yaml.SafeLoader.add_constructor('tag:yaml.org,2002:bool', no_boolean_constructor)
-yaml.SafeLoader.add_constructor('tag:yaml.org,2002:omap', no_boolean_constructor)
-yaml.SafeLoader.add_constructor('tag:yaml.org,2002:pairs', no_boolean_constructor)
-yaml.SafeLoader.add_constructor('tag:yaml.org,2002:set', no_boolean_constructor)
-yaml.SafeLoader.add_constructor('tag:yaml.org,2002:timestamp', no_boolean_constructor)
+def register_scalar_constructors(loader):
+    """
+    Keeps booleans, timestamps, sets and ordered maps as they are written on the YAML, instead of converting them.
+    """
+    loader.add_constructor('tag:yaml.org,2002:bool', no_boolean_constructor)
+    loader.add_constructor('tag:yaml.org,2002:omap', no_boolean_constructor)
+    loader.add_constructor('tag:yaml.org,2002:pairs', no_boolean_constructor)
+    loader.add_constructor('tag:yaml.org,2002:set', no_boolean_constructor)
+    loader.add_constructor('tag:yaml.org,2002:timestamp', no_boolean_constructor)
+
+
+# YAML backends. The libyaml one is only available when PyYAML was built with it.
+backends = {'python': yaml.SafeLoader}
+if getattr(yaml, 'CSafeLoader', None) is not None:
+    backends['libyaml'] = yaml.CSafeLoader
+
+for _loader in backends.values():
+    register_scalar_constructors(_loader)
+
+default_backend = 'libyaml' if 'libyaml' in backends else 'python'
+
+
+def get_loader(backend=None):
+    """
+    Returns the YAML loader of a backend, falling back to the pure Python one when it is not available.
+    """
+    return backends.get(backend or default_backend, yaml.SafeLoader)
+
+
+class WorkflowCache:
+    """
+    A bounded LRU cache for the parsed workflows, keyed by the digest of their YAML content.
+    - maxsize: (int) Maximum number of workflows kept in memory.
+    - hits: (int) Number of lookups answered by the cache.
+    - misses: (int) Number of lookups that needed a parse.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(content):
+        """
+        Returns the digest used as the cache key for a YAML content.
+        """
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=20).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached workflow for a key, or None if it was not parsed yet.
+        """
+        with self._lock:
+            workflow = self._entries.get(key)
+            if workflow is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return workflow
+
+    def put(self, key, workflow):
+        """
+        Stores a workflow, evicting the least recently used one when the cache is full.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = workflow
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all the workflows and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Returns the cache statistics.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+# Shared by every Action of the process
+workflow_cache = WorkflowCache()
 
 
 class Action:
@@ -18,11 +112,15 @@ class Action:
     A class to parse YAML scripts.
     - file_path: (str) Path to the YAML scripts.
     - content: (str) YAML content.
+    - use_cache: (bool) Reuse the Workflow already built for the same content.
+    - backend: (str) YAML backend, 'libyaml' or 'python'. Defaults to the fastest available.
     """
 
-    def __init__(self, file_path=None, content=None):
+    def __init__(self, file_path=None, content=None, use_cache=True, backend=None):
         self.file_path = file_path
         self.content = content
+        self.use_cache = use_cache
+        self.loader = get_loader(backend)
         self.workflow = Workflow.Workflow()
 
     def extract_content(self):
@@ -47,7 +145,7 @@ class Action:
             self.extract_content()
 
         try:
-            return yaml.load(self.content, Loader=yaml.SafeLoader) if self.content else None
+            return yaml.load(self.content, Loader=self.loader) if self.content else None
         except yaml.YAMLError as e:
             print(f"Error parsing YAML: {str(e)}")
             return None
@@ -55,12 +153,26 @@ class Action:
     def prepare_for_analysis(self):
         """
         Converts YAML content to a Workflow object.
+        The same content is parsed only once per process, the next calls return the cached Workflow.
         """
+        if self.content is None:
+            self.extract_content()
+
+        key = None
+        if self.use_cache and self.content:
+            key = f"{self.loader.__name__}:{workflow_cache.digest(self.content)}"
+            workflow = workflow_cache.get(key)
+            if workflow is not None:
+                return workflow
+
         raw_data = self.parse_yaml()
         if not raw_data:
             return None
 
-        return self.populate_workflow(raw_data)
+        workflow = self.populate_workflow(raw_data)
+        if key is not None:
+            workflow_cache.put(key, workflow)
+        return workflow
 
     def populate_workflow(self, raw_data):
         """
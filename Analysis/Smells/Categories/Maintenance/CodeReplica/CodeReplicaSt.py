@@ -1,14 +1,26 @@
+from Analysis.Engine.Walker import Walker
+
+
 class MainCodeReplicaCheck:
     """
     Strategy to check for replicated code snippets and variable values in GitHub Actions workflows.
 
+    The visits only record the values and the job signatures, on the order they were visited, and the replicas
+    are counted by results(). Each job then only adds to the lists, so the Incremental analyzer can reuse what was
+    recorded for the jobs that did not change.
+
     Args:
         threshold: The number of replicas to consider as an issue.
     """
 
     def __init__(self, threshold=2):
         self.threshold = threshold
+        self.values = []
+        self.signatures = []
         self.value_counts = {}
+        self.job_signatures = {}
+        self.value_findings = []
+        self.job_findings = []
         self.findings = []
 
     def check(self, workflow):
@@ -22,8 +34,42 @@ class MainCodeReplicaCheck:
             A list containing the replicated code snippets and variable values.
         """
 
-        self.check_duplicate_values(workflow)
-        self.check_duplicate_jobs(workflow)
+        walker = Walker()
+        self.register(walker)
+        walker.walk(workflow)
+        walker.raise_error(self)
+        return self.results()
+
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
+
+        Args:
+            walker: A Walker object.
+        """
+        self.values = []
+        self.signatures = []
+        walker.register(self, 'env', self.visit_env)
+        walker.register(self, 'step', self.visit_step)
+        walker.register(self, 'job', self.visit_job)
+
+    def results(self):
+        """
+        Count the replicas of the visited workflow and collect the findings, keeping the replicated values before
+        the replicated jobs.
+        """
+        self.value_counts = {}
+        self.value_findings = []
+        for value, context in self.values:
+            self.count_value(value, context)
+
+        self.job_signatures = {}
+        self.job_findings = []
+        for job_name, job_signature in self.signatures:
+            self.count_job(job_name, job_signature)
+
+        self.findings = self.value_findings + self.job_findings
         return self.findings
 
     def check_duplicate_values(self, workflow):
@@ -33,7 +79,7 @@ class MainCodeReplicaCheck:
         Args:
             workflow: A Workflow object.
         """
-        self.value_counts = {}
+        self.values = []
 
         # Check global env values
         # for key, value in workflow.env.items():
@@ -41,22 +87,43 @@ class MainCodeReplicaCheck:
         #                               f"Consider define different names for Globals", findings)
 
         # Check jobs and steps
-        for job_name, job in workflow.jobs.items():
-            for key, value in job.env.items():
-                self.add_to_counts(value, f"Job '{job_name}' env variable '{key}'")
+        Walker.visit(workflow, self, [('env', self.visit_env), ('step', self.visit_step)])
+        self.results()
 
-            for step in job.steps:
-                for key, value in step.env.items():
-                    self.add_to_counts(value, f"Step '{step.name}' env variable '{key}' in job '{job_name}' "
-                                              f"is replicated. Consider use Global Env variables: Ex: Env: '{key}': "
-                                              f"'{value}'")
+    def visit_env(self, level, key, value, job_name, step):
+        """
+        Count the env values of jobs and steps.
+        """
+        if level == 'job':
+            self.add_to_counts(value, f"Job '{job_name}' env variable '{key}'")
 
-                for key, value in step.with_params.items():
-                    self.add_to_counts(value, f"Step '{step.name}' parameter '{key}' in job '{job_name}' "
-                                              f"is replicated. Consider use Defaults params. Ex: Defaults: '{key}': "
-                                              f"'{value}'")
+        elif level == 'step':
+            self.add_to_counts(value, f"Step '{step.name}' env variable '{key}' in job '{job_name}' "
+                                      f"is replicated. Consider use Global Env variables: Ex: Env: '{key}': "
+                                      f"'{value}'")
+
+    def visit_step(self, job_name, job, step):
+        """
+        Count the parameters of a step.
+        """
+        for key, value in step.with_params.items():
+            self.add_to_counts(value, f"Step '{step.name}' parameter '{key}' in job '{job_name}' "
+                                      f"is replicated. Consider use Defaults params. Ex: Defaults: '{key}': "
+                                      f"'{value}'")
 
     def add_to_counts(self, value, context):
+        """
+        Record a value, to be counted by results().
+
+        Args:
+            value: The value to check.
+            context: The context where the value was found.
+        """
+        # Values that cannot be counted fail on the visit
+        hash(value)
+        self.values.append((value, context))
+
+    def count_value(self, value, context):
         """
         Add the value to the count dictionary and check if it exceeds the threshold.
 
@@ -70,9 +137,9 @@ class MainCodeReplicaCheck:
 
         if len(self.value_counts[value]) == self.threshold:
             contexts = ', '.join(self.value_counts[value])
-            self.findings.append(f"Value '{value}' is replicated in contexts: {contexts}. If not an Env consider use "
-                                 f"Matrix to define versions. Ex: 'strategy: matrix: {{'python': ['3.6', '3.7', "
-                                 f"'3.8']}}'")
+            self.value_findings.append(f"Value '{value}' is replicated in contexts: {contexts}. If not an Env "
+                                       f"consider use Matrix to define versions. Ex: 'strategy: matrix: "
+                                       f"{{'python': ['3.6', '3.7', '3.8']}}'")
 
     def check_duplicate_jobs(self, workflow):
         """
@@ -81,15 +148,26 @@ class MainCodeReplicaCheck:
         Args:
             workflow: A Workflow object.
         """
-        job_signatures = {}
-        for job_name, job in workflow.jobs.items():
-            job_signature = self.create_job_signature(job)
-            if job_signature in job_signatures:
-                self.findings.append(f"Job '{job_name}' is replicated with job '{job_signatures[job_signature]}'. "
+        self.signatures = []
+        Walker.visit(workflow, self, [('job', self.visit_job)])
+        self.results()
+
+    def visit_job(self, job_name, job):
+        """
+        Record the signature of a job, to be compared by results().
+        """
+        self.signatures.append((job_name, self.create_job_signature(job)))
+
+    def count_job(self, job_name, job_signature):
+        """
+        Compare the signature of a job with the signatures of the jobs visited before it.
+        """
+        if job_signature in self.job_signatures:
+            self.job_findings.append(f"Job '{job_name}' is replicated with job '{self.job_signatures[job_signature]}'. "
                                      f"Consider use reusable actions. You can find examples in the documentation: "
                                      f"https://docs.github.com/en/actions/using-workflows/reusing-workflows")
-            else:
-                job_signatures[job_signature] = job_name
+        else:
+            self.job_signatures[job_signature] = job_name
 
     @staticmethod
     def create_job_signature(job):
@@ -1,3 +1,6 @@
+from Analysis.Engine.Walker import Walker
+
+
 class MainErrorHandlingCheck:
     """
     Strategy for checking the error handling of the workflow
@@ -5,6 +8,9 @@ class MainErrorHandlingCheck:
     """
 
     def __init__(self):
+        self.continue_on_error_findings = []
+        self.fail_fast_findings = []
+        self.timeout_findings = []
         self.findings = []
 
     def check(self, workflow):
@@ -18,9 +24,35 @@ class MainErrorHandlingCheck:
             A list of findings indicating lack of error handling.
         """
 
-        self.check_continue_on_error(workflow)
-        self.check_fail_fast(workflow)
-        self.check_timeouts(workflow)
+        walker = Walker()
+        self.register(walker)
+        walker.walk(workflow)
+        walker.raise_error(self)
+        return self.results()
+
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
+
+        Args:
+            walker: A Walker object.
+        """
+        self.continue_on_error_findings = []
+        self.fail_fast_findings = []
+        self.timeout_findings = []
+        self.findings = []
+        walker.register(self, 'job', self.visit_job_continue_on_error)
+        walker.register(self, 'step', self.visit_step_continue_on_error)
+        walker.register(self, 'job', self.visit_job_fail_fast)
+        walker.register(self, 'job', self.visit_job_timeout)
+        walker.register(self, 'step', self.visit_step_timeout)
+
+    def results(self):
+        """
+        Collect the findings of the visited workflow in the same order of the checks.
+        """
+        self.findings = self.continue_on_error_findings + self.fail_fast_findings + self.timeout_findings
         return self.findings
 
     def check_continue_on_error(self, workflow):
@@ -34,42 +66,43 @@ class MainErrorHandlingCheck:
             A list of findings indicating lack of error handling.
         """
 
-        for job_name, job in workflow.jobs.items():
-            if job.continue_on_error:
-                self.findings.append(f"Job '{job_name}' has continue-on-error set to true. "
-                                     f"This could be useful in some cases, but it is generally not recommended."
-                                     f"Meaning that the job will continue to run even if a step fails. "
-                                     f"This can lead to unexpected behavior and should be avoided.")
-            else:
-                continue
-
-            for step in job.steps:
-                if step.continue_on_error:
-                    self.findings.append(f"Step '{step.name}' has continue-on-error set to true. "
-                                         f"This could be useful in some cases, but it is generally not recommended."
-                                         f"Meaning that the step will continue to run even if it fails. "
-                                         f"This can lead to unexpected behavior and should be avoided.")
-                else:
-                    continue
-
-        return self.findings
+        Walker.visit(workflow, self, [('job', self.visit_job_continue_on_error),
+                                      ('step', self.visit_step_continue_on_error)])
+        return self.results()
+
+    def visit_job_continue_on_error(self, job_name, job):
+        if job.continue_on_error:
+            self.continue_on_error_findings.append(
+                f"Job '{job_name}' has continue-on-error set to true. "
+                f"This could be useful in some cases, but it is generally not recommended."
+                f"Meaning that the job will continue to run even if a step fails. "
+                f"This can lead to unexpected behavior and should be avoided.")
+
+    def visit_step_continue_on_error(self, job_name, job, step):
+        # Steps are only checked when their job also continues on error
+        if job.continue_on_error and step.continue_on_error:
+            self.continue_on_error_findings.append(
+                f"Step '{step.name}' has continue-on-error set to true. "
+                f"This could be useful in some cases, but it is generally not recommended."
+                f"Meaning that the step will continue to run even if it fails. "
+                f"This can lead to unexpected behavior and should be avoided.")
 
     def check_fail_fast(self, workflow):
         """
         Check if the job has fail-fast set to true.
         """
 
-        for job_name, job in workflow.jobs.items():
-            if 'fail-fast' in job.strategy:
-                failfast = job.strategy['fail-fast']
-                if failfast not in [False, 'false', 'False']:
-                    self.findings.append(f"Job '{job.name}' has fail-fast set to {failfast}. "
-                                         f"This means that the job will continue to run even if a step fails. "
-                                         f"This can lead to unexpected behavior and should be avoided.")
-                else:
-                    continue
+        Walker.visit(workflow, self, [('job', self.visit_job_fail_fast)])
+        return self.results()
 
-        return self.findings
+    def visit_job_fail_fast(self, job_name, job):
+        if 'fail-fast' in job.strategy:
+            failfast = job.strategy['fail-fast']
+            if failfast not in [False, 'false', 'False']:
+                self.fail_fast_findings.append(
+                    f"Job '{job.name}' has fail-fast set to {failfast}. "
+                    f"This means that the job will continue to run even if a step fails. "
+                    f"This can lead to unexpected behavior and should be avoided.")
 
     def check_timeouts(self, workflow):
         """
@@ -79,51 +112,60 @@ class MainErrorHandlingCheck:
             workflow: A Workflow object representing the GitHub Actions workflows.
         """
 
-        for job_name, job in workflow.jobs.items():
-            if job.timeout_minutes is None:
-                self.findings.append(f"Job '{job_name}' does not have a timeout set. "
-                                     f"It is recommended to set a timeout for jobs to prevent them from running "
-                                     f"with the default value of 6 hours and consuming resources unnecessarily.")
-
-            elif job.timeout_minutes is not int:
-                self.findings.append(f"Job '{job_name}' has a different timeout variable value. This could be a string/"
-                                     f"boolean or a input that is passing from the remote triggers. "
-                                     f"Configure the timeout variable to a integer value to avoid unexpected behavior.")
-
-            elif job.timeout_minutes == 1:
-                self.findings.append(f"Job '{job_name}' has a timeout of {job.timeout_minutes} min. "
-                                     f"This is a short time for a job to run. If the timeout have a short value, "
-                                     f"it will lead to cancel the job before it finishes.")
-
-            elif job.timeout_minutes >= 10:
-                self.findings.append(f"Job '{job_name}' has a timeout of {job.timeout_minutes} min. "
-                                     f"This is a long time for a job to run. If a job is taking this long to run, "
-                                     f"it may be a sign that something is wrong. "
-                                     f"It is recommended to investigate why the job is taking so long to run "
-                                     f"and to try to optimize it.")
-
-            for step in job.steps:
-                if step.timeout_minutes is None:
-                    self.findings.append(f"Step '{step.name}' does not have a timeout set. "
-                                         f"It is recommended to set a timeout for steps to prevent them from running "
-                                         f"with the default value of 6 hours and consuming resources unnecessarily.")
-
-                elif step.timeout_minutes is not int:
-                    self.findings.append(f"Step '{step.name}'has a different timeout variable value. "
-                                         f"This could be a string/ boolean or a input that is passing from the remote "
-                                         f"triggers. Configure the timeout variable to a integer value to avoid "
-                                         f"unexpected behavior.")
-
-                elif step.timeout_minutes == 1:
-                    self.findings.append(f"Step '{step.name}' has a timeout of {step.timeout_minutes} min. "
-                                         f"This is a short time for a step to run. If the timeout have a short value, "
-                                         f"it will lead to cancel the step before it finishes.")
-
-                elif step.timeout_minutes >= 10:
-                    self.findings.append(f"Step '{step.name}' has a timeout of {step.timeout_minutes} min. "
-                                         f"This is a long time for a step to run. If a step is taking this long to run, "
-                                         f"it may be a sign that something is wrong. "
-                                         f"It is recommended to investigate why the step is taking so long to run "
-                                         f"and to try to optimize it.")
-
-        return self.findings
+        Walker.visit(workflow, self, [('job', self.visit_job_timeout), ('step', self.visit_step_timeout)])
+        return self.results()
+
+    def visit_job_timeout(self, job_name, job):
+        if job.timeout_minutes is None:
+            self.timeout_findings.append(
+                f"Job '{job_name}' does not have a timeout set. "
+                f"It is recommended to set a timeout for jobs to prevent them from running "
+                f"with the default value of 6 hours and consuming resources unnecessarily.")
+
+        elif job.timeout_minutes is not int:
+            self.timeout_findings.append(
+                f"Job '{job_name}' has a different timeout variable value. This could be a string/"
+                f"boolean or a input that is passing from the remote triggers. "
+                f"Configure the timeout variable to a integer value to avoid unexpected behavior.")
+
+        elif job.timeout_minutes == 1:
+            self.timeout_findings.append(
+                f"Job '{job_name}' has a timeout of {job.timeout_minutes} min. "
+                f"This is a short time for a job to run. If the timeout have a short value, "
+                f"it will lead to cancel the job before it finishes.")
+
+        elif job.timeout_minutes >= 10:
+            self.timeout_findings.append(
+                f"Job '{job_name}' has a timeout of {job.timeout_minutes} min. "
+                f"This is a long time for a job to run. If a job is taking this long to run, "
+                f"it may be a sign that something is wrong. "
+                f"It is recommended to investigate why the job is taking so long to run "
+                f"and to try to optimize it.")
+
+    def visit_step_timeout(self, job_name, job, step):
+        if step.timeout_minutes is None:
+            self.timeout_findings.append(
+                f"Step '{step.name}' does not have a timeout set. "
+                f"It is recommended to set a timeout for steps to prevent them from running "
+                f"with the default value of 6 hours and consuming resources unnecessarily.")
+
+        elif step.timeout_minutes is not int:
+            self.timeout_findings.append(
+                f"Step '{step.name}'has a different timeout variable value. "
+                f"This could be a string/ boolean or a input that is passing from the remote "
+                f"triggers. Configure the timeout variable to a integer value to avoid "
+                f"unexpected behavior.")
+
+        elif step.timeout_minutes == 1:
+            self.timeout_findings.append(
+                f"Step '{step.name}' has a timeout of {step.timeout_minutes} min. "
+                f"This is a short time for a step to run. If the timeout have a short value, "
+                f"it will lead to cancel the step before it finishes.")
+
+        elif step.timeout_minutes >= 10:
+            self.timeout_findings.append(
+                f"Step '{step.name}' has a timeout of {step.timeout_minutes} min. "
+                f"This is a long time for a step to run. If a step is taking this long to run, "
+                f"it may be a sign that something is wrong. "
+                f"It is recommended to investigate why the step is taking so long to run "
+                f"and to try to optimize it.")
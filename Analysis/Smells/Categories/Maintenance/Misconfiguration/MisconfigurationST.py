@@ -1,15 +1,29 @@
 import re
 
+from Analysis.Engine.Walker import Walker
+
 
 class MainMisconfigurationCheck:
     """
     Strategy to check for misconfigurations in GitHub Actions workflows.
 
+    The missing parameters of the jobs are only reported for the first job. Every job is checked and recorded on
+    job_missing_findings, and results() keeps the ones of the first job, so each job only adds to the lists and
+    the Incremental analyzer can reuse what was recorded for the jobs that did not change.
+
     Attributes:
         self.findings: A list containing the misconfiguration self.findings.
+        self.job_missing_findings: (job name, finding) tuples of the missing parameters of the jobs. Every job
+            starts with a (job name, None) tuple.
     """
 
     def __init__(self):
+        self.missing_findings = []
+        self.job_missing_findings = []
+        self.fuzzy_findings = []
+        self.complexity_findings = []
+        self.concurrency_findings = []
+        self.fuzzy_version_pattern = re.compile(r'@v?\d+\.(?:x|\*|\d+\.x|\d+\.\*|latest|\d+\.\d+\.\*)')
         self.findings = []
 
     def check(self, workflow):
@@ -23,11 +37,42 @@ class MainMisconfigurationCheck:
             A list containing the misconfiguration self.findings.
         """
 
-        self.check_missing_parameters(workflow)
-        self.check_fuzzy_versions(workflow)
-        self.check_unnecessary_complexity(workflow)
-        self.check_concurrency(workflow)
+        walker = Walker()
+        self.register(walker)
+        walker.walk(workflow)
+        walker.raise_error(self)
+        return self.results()
+
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
 
+        Args:
+            walker: A Walker object.
+        """
+        self.missing_findings = []
+        self.job_missing_findings = []
+        self.fuzzy_findings = []
+        self.complexity_findings = []
+        self.concurrency_findings = []
+        self.findings = []
+        walker.register(self, 'workflow', self.visit_workflow_missing_parameters)
+        walker.register(self, 'job', self.visit_job_missing_parameters)
+        walker.register(self, 'step', self.visit_step_missing_parameters)
+        walker.register(self, 'step', self.visit_step_fuzzy_versions)
+        walker.register(self, 'step', self.visit_step_unnecessary_complexity)
+        walker.register(self, 'workflow', self.visit_workflow_concurrency)
+
+    def results(self):
+        """
+        Collect the findings of the visited workflow in the same order of the checks.
+        """
+        first_job = self.job_missing_findings[0][0] if self.job_missing_findings else None
+        first_job_findings = [finding for job_name, finding in self.job_missing_findings
+                              if job_name == first_job and finding]
+        self.findings = (self.missing_findings + first_job_findings + self.fuzzy_findings +
+                         self.complexity_findings + self.concurrency_findings)
         return self.findings
 
     def check_missing_parameters(self, workflow):
@@ -38,53 +83,63 @@ class MainMisconfigurationCheck:
             workflow: A Workflow object representing the GitHub Actions workflows.
         """
 
+        self.job_missing_findings = []
+        Walker.visit(workflow, self, [('workflow', self.visit_workflow_missing_parameters),
+                                      ('job', self.visit_job_missing_parameters),
+                                      ('step', self.visit_step_missing_parameters)])
+        return self.results()
+
+    def visit_workflow_missing_parameters(self, workflow):
         # Checking for missing parameters in the Workflow level
         if not workflow.name:
-            self.findings.append(
+            self.missing_findings.append(
                 "No 'name' were set for the workflow. "
                 "Consider providing an 'alias' for the workflow for better maintenance.")
 
         if not workflow.on:
-            self.findings.append(
+            self.missing_findings.append(
                 "Workflow is missing the 'on' parameter. "
                 "You need to provide a trigger event."
             )
 
         if not workflow.defaults:
-            self.findings.append(
+            self.missing_findings.append(
                 "No 'defaults' values were set on the workflow. Consider using the 'defaults' "
                 "parameter to set the common values for all your jobs."
             )
 
-        # Check for missing parameters in the Job and Step level
-        for job_name, job in workflow.jobs.items():
-
-            if not job.environment:
-                self.findings.append(
-                    f"Job '{job_name}' has no 'environment' parameter set. "
-                    "Consider create environments for better security and maintenance. "
-                    "You can find all the info about it at "
-                    "https://docs.github.com/en/actions/deployment/targeting-different-environments"
-                )
-
-            if not job.runs_on:
-                self.findings.append(
-                    f"Job '{job_name}' do not have a runner specified, "
-                    f"it will be use the default runner 'ubuntu-latest'. "
-                    f"Consider specifying 'runs-on' explicitly.")
-
-            for step in job.steps:
-                if not step.uses:
-                    self.findings.append(
-                        f"Step '{step.name}' in job '{job_name}' is missing the 'uses' parameter. "
-                        f"Consider specify an action for it.")
-
-                if not step.run:
-                    self.findings.append(
-                        f"Step '{step.name}' in job '{job_name}' is missing the 'run' parameter. "
-                        f"Consider specifying the command to run.")
-
-            return self.findings
+    def visit_job_missing_parameters(self, job_name, job):
+        # Only the findings of the first job of the workflow are reported, see results()
+        self.job_missing_findings.append((job_name, None))
+
+        if not job.environment:
+            self.job_missing_findings.append((
+                job_name,
+                f"Job '{job_name}' has no 'environment' parameter set. "
+                "Consider create environments for better security and maintenance. "
+                "You can find all the info about it at "
+                "https://docs.github.com/en/actions/deployment/targeting-different-environments"
+            ))
+
+        if not job.runs_on:
+            self.job_missing_findings.append((
+                job_name,
+                f"Job '{job_name}' do not have a runner specified, "
+                f"it will be use the default runner 'ubuntu-latest'. "
+                f"Consider specifying 'runs-on' explicitly."))
+
+    def visit_step_missing_parameters(self, job_name, job, step):
+        if not step.uses:
+            self.job_missing_findings.append((
+                job_name,
+                f"Step '{step.name}' in job '{job_name}' is missing the 'uses' parameter. "
+                f"Consider specify an action for it."))
+
+        if not step.run:
+            self.job_missing_findings.append((
+                job_name,
+                f"Step '{step.name}' in job '{job_name}' is missing the 'run' parameter. "
+                f"Consider specifying the command to run."))
 
     def check_fuzzy_versions(self, workflow):
         """
@@ -93,18 +148,18 @@ class MainMisconfigurationCheck:
         Args:
             workflow: A Workflow object representing the GitHub Actions workflows.
         """
-        fuzzy_version_pattern = re.compile(r'@v?\d+\.(?:x|\*|\d+\.x|\d+\.\*|latest|\d+\.\d+\.\*)')
-
-        for job_name, job in workflow.jobs.items():
-            for step in job.steps:
-                uses = step.uses
-                if uses and fuzzy_version_pattern.search(uses):
-                    version = uses.split('@')[1] if '@' in uses else 'unknown'
-                    self.findings.append(
-                        f"Job '{job_name}' has a step with an unspecified or fuzzy version {version}. "
-                        f"Consider specifying a more precise version or use the Matrix parameter."
-                    )
-        return self.findings
+
+        Walker.visit(workflow, self, [('step', self.visit_step_fuzzy_versions)])
+        return self.results()
+
+    def visit_step_fuzzy_versions(self, job_name, job, step):
+        uses = step.uses
+        if uses and self.fuzzy_version_pattern.search(uses):
+            version = uses.split('@')[1] if '@' in uses else 'unknown'
+            self.fuzzy_findings.append(
+                f"Job '{job_name}' has a step with an unspecified or fuzzy version {version}. "
+                f"Consider specifying a more precise version or use the Matrix parameter."
+            )
 
     def check_unnecessary_complexity(self, workflow):
         """
@@ -114,34 +169,35 @@ class MainMisconfigurationCheck:
             workflow: A Workflow object representing the GitHub Actions workflows.
         """
 
-        for job_name, job in workflow.jobs.items():
-            for step in job.steps:
-                if step._if:
-                    conditions = step._if.split("&&")
-                    if len(conditions) > 2:
-                        self.findings.append(
-                            f"Job '{job_name}' has a step '{step.name}' "
-                            f"with an unnecessary complexity on 'if' condition. "
-                            f"Consider simplifying the condition ou separating into different steps ou jobs."
-                        )
-
-                    # Check for nested conditions
-                    nested_conditions = re.findall(r'\(([^)]+)\)', step._if)
-                    if nested_conditions:
-                        self.findings.append(
-                            f"Step '{step.name}' in job '{job_name}' has nested 'if' conditions: '{step._if}'. "
-                            f"Consider simplifying the condition ou separating into different steps ou jobs."
-                        )
-
-                    # Check for multiple logical operators
-                    logical_operator_count = len(re.findall(r'(\|\||&&)', step._if))
-                    if logical_operator_count > 1:
-                        self.findings.append(
-                            f"Step '{step.name}' in job '{job_name}' has multiple logical operators in 'if' condition: '{step._if}'. "
-                            f"Consider simplifying the condition ou separating into different steps ou jobs."
-                        )
+        Walker.visit(workflow, self, [('step', self.visit_step_unnecessary_complexity)])
+        return self.results()
+
+    def visit_step_unnecessary_complexity(self, job_name, job, step):
+        if step._if:
+            conditions = step._if.split("&&")
+            if len(conditions) > 2:
+                self.complexity_findings.append(
+                    f"Job '{job_name}' has a step '{step.name}' "
+                    f"with an unnecessary complexity on 'if' condition. "
+                    f"Consider simplifying the condition ou separating into different steps ou jobs."
+                )
 
-        return self.findings
+            # Check for nested conditions
+            nested_conditions = re.findall(r'\(([^)]+)\)', step._if)
+            if nested_conditions:
+                self.complexity_findings.append(
+                    f"Step '{step.name}' in job '{job_name}' has nested 'if' conditions: '{step._if}'. "
+                    f"Consider simplifying the condition ou separating into different steps ou jobs."
+                )
+
+            # Check for multiple logical operators
+            logical_operator_count = len(re.findall(r'(\|\||&&)', step._if))
+            if logical_operator_count > 1:
+                self.complexity_findings.append(
+                    f"Step '{step.name}' in job '{job_name}' has multiple logical operators in 'if' condition: "
+                    f"'{step._if}'. "
+                    f"Consider simplifying the condition ou separating into different steps ou jobs."
+                )
 
     def check_concurrency(self, workflow):
         """
@@ -151,6 +207,10 @@ class MainMisconfigurationCheck:
             workflow: A Workflow object representing the GitHub Actions workflows.
         """
 
+        Walker.visit(workflow, self, [('workflow', self.visit_workflow_concurrency)])
+        return self.results()
+
+    def visit_workflow_concurrency(self, workflow):
         concurrency = workflow.concurrency
 
         def is_valid_expression(expression):
@@ -159,23 +219,20 @@ class MainMisconfigurationCheck:
 
         if concurrency:
             if 'group' not in concurrency or not isinstance(concurrency['group'], str):
-                self.findings.append(
+                self.concurrency_findings.append(
                     f"Concurrency configuration is missing the 'group' parameter or it is not a string: "
                     f"{concurrency.get('group')}. "
                     f"Ensure 'group' is specified and is a string.")
 
             if 'cancel-in-progress' not in concurrency:
-                self.findings.append(
+                self.concurrency_findings.append(
                     f"Concurrency configuration is missing the cancel-in-progress. "
                     f"Ensure 'cancel-in-progress' is specified and is a boolean.")
 
             if 'cancel-in-progress' in concurrency:
                 cancel = concurrency.get('cancel-in-progress')
                 if cancel not in ['True', 'true', True] and not is_valid_expression(cancel):
-                    self.findings.append(
+                    self.concurrency_findings.append(
                         f"Concurrency configuration for cancel-in-progress is not a boolean, valid GitHub "
                         f"expression or is not set to True. (cancel-in-progress: {cancel}). "
                         f"Ensure cancel-in-progress has the right configuration.")
-
-        else:
-            return self.findings
@@ -1,3 +1,6 @@
+from Analysis.Engine.Walker import Walker
+
+
 class MainLongBlockCheck:
     """
     Strategy for checking long blocks of code on the workflow.
@@ -24,6 +27,25 @@ class MainLongBlockCheck:
 
         return self.findings
 
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
+
+        Args:
+            walker: A Walker object.
+        """
+        self.findings = []
+        walker.register(self, 'workflow', self.visit_workflow)
+        walker.register(self, 'job', self.visit_job)
+        walker.register(self, 'run', self.visit_run)
+
+    def results(self):
+        """
+        Collect the findings of the visited workflow.
+        """
+        return self.findings
+
     def long_block_check(self, workflow):
         """
         Check the long blocks of code.
@@ -32,6 +54,14 @@ class MainLongBlockCheck:
             workflow: A Workflow object representing the GitHub Actions workflows.
         """
 
+        walker = Walker()
+        self.register(walker)
+        walker.walk(workflow)
+        walker.raise_error(self)
+
+        return self.findings
+
+    def visit_workflow(self, workflow):
         jobs_count = len(workflow.jobs)
 
         if jobs_count > self.max_job_per_workflow:
@@ -40,24 +70,18 @@ class MainLongBlockCheck:
                                  f"A longer pipeline can be difficult to maintain and "
                                  f"debug and can lead to security vulnerabilities.")
 
-        for jobs_, job in workflow.jobs.items():
-            steps_count = len(job.steps)
-            if steps_count > self.max_steps_per_job:
-                self.findings.append(f"The job '{jobs_}' has more than {steps_count} steps. "
-                                     f"Consider splitting the steps into multiple jobs. "
-                                     f"A longer job can be difficult to maintain and "
-                                     f"debug and can lead to security vulnerabilities.")
-
-            for step in job.steps:
-                if step.run is None:
-                    continue
-                else:
-                    commands_count = len(step.run.split('\n'))
-                    if commands_count > self.max_commands_per_step:
-                        self.findings.append(f"The step '{step.name}' run has more than {commands_count} commands. "
-                                             f"Consider splitting the commands into multiple step groups. "
-                                             f"A longer step group can be difficult to maintain and "
-                                             f"debug and can lead to security vulnerabilities.")
-
-        return self.findings
+    def visit_job(self, job_name, job):
+        steps_count = len(job.steps)
+        if steps_count > self.max_steps_per_job:
+            self.findings.append(f"The job '{job_name}' has more than {steps_count} steps. "
+                                 f"Consider splitting the steps into multiple jobs. "
+                                 f"A longer job can be difficult to maintain and "
+                                 f"debug and can lead to security vulnerabilities.")
 
+    def visit_run(self, job_name, step):
+        commands_count = len(step.run.split('\n'))
+        if commands_count > self.max_commands_per_step:
+            self.findings.append(f"The step '{step.name}' run has more than {commands_count} commands. "
+                                 f"Consider splitting the commands into multiple step groups. "
+                                 f"A longer step group can be difficult to maintain and "
+                                 f"debug and can lead to security vulnerabilities.")
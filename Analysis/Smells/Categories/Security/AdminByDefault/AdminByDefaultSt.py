@@ -1,5 +1,7 @@
 import logging
 
+from Analysis.Engine.Walker import Walker
+
 
 class MainAdminByDefaultCheck:
     """
@@ -24,15 +26,39 @@ class MainAdminByDefaultCheck:
             findings: List of found elevated permissions.
         """
 
-        # Verify permissions at the workflow level
-        self.findings.extend(self._check_permissions(content.permissions, 'workflow'))
+        walker = Walker()
+        self.register(walker)
+        walker.walk(content)
+        walker.raise_error(self)
 
-        # Verify permissions at job level
-        for job_name, job in content.jobs.items():
-            self.findings.extend(self._check_permissions(job.permissions, f'job {job_name}'))
+        return self.results()
+
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
 
+        Attributes:
+            walker: A Walker object.
+        """
+        self.findings = []
+        walker.register(self, 'workflow', self.visit_workflow)
+        walker.register(self, 'job', self.visit_job)
+
+    def results(self):
+        """
+        Collect the findings of the visited workflow.
+        """
         return self.findings
 
+    def visit_workflow(self, workflow):
+        # Verify permissions at the workflow level
+        self.findings.extend(self._check_permissions(workflow.permissions, 'workflow'))
+
+    def visit_job(self, job_name, job):
+        # Verify permissions at job level
+        self.findings.extend(self._check_permissions(job.permissions, f'job {job_name}'))
+
     def _check_permissions(self, permissions, level):
         self.findings = []
         if permissions is not None:
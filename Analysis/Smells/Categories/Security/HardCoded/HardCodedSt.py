@@ -1,6 +1,100 @@
 import re
 import logging
 from Utils.Utilities import Lists
+from Analysis.Engine.Walker import Walker
+
+
+class SecretMatcher:
+    """
+    A single pre-built matcher for all the hard-coded secret patterns and keywords.
+    The word patterns (\\bword\\b) and the keywords are folded into character tries and compiled into one regex,
+    so a text is scanned once, in linear time, instead of once per pattern.
+    Use SecretMatcher.shared() to build it only once per process.
+
+    Attributes:
+        patterns: List of regex patterns to search for in the scripts
+        keywords: List of keywords to search for in the scripts
+        regex: The combined regex
+    """
+
+    _shared = None
+
+    def __init__(self, patterns=None, keywords=None):
+        self.patterns = list(Lists.regex_patterns if patterns is None else patterns)
+        self.keywords = list(Lists.keywords if keywords is None else keywords)
+
+        self.word_patterns = {}
+        self.other_patterns = []
+        for pattern in self.patterns:
+            word = re.fullmatch(r'\\b(\w+)\\b', pattern)
+            if word:
+                self.word_patterns.setdefault(word.group(1).lower(), pattern)
+            else:
+                self.other_patterns.append(pattern)
+        self.keyword_lookup = {}
+        for keyword in self.keywords:
+            self.keyword_lookup.setdefault(keyword.lower(), keyword)
+
+        alternatives = []
+        if self.word_patterns:
+            alternatives.append(f'(?P<w>\\b{self._trie_regex(self.word_patterns)}\\b)')
+        if self.keyword_lookup:
+            alternatives.append(f'(?P<k>{self._trie_regex(self.keyword_lookup)})')
+        alternatives.extend(f'(?P<o{index}>{pattern})' for index, pattern in enumerate(self.other_patterns))
+        self.regex = re.compile('|'.join(alternatives) or r'(?!)', re.IGNORECASE)
+
+    @classmethod
+    def shared(cls):
+        """
+        Returns the matcher built with the default lists, creating it on the first call.
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def search(self, text):
+        """
+        Searches the first secret pattern or keyword in a text.
+
+        Attributes:
+            text: Text to search
+
+        Returns:
+            A (pattern, start, end) tuple with the matched pattern or keyword and its position, or None
+        """
+        match = self.regex.search(text)
+        if not match:
+            return None
+
+        matched = match.group().lower()
+        if match.lastgroup == 'w':
+            pattern = self.word_patterns.get(matched, matched)
+        elif match.lastgroup == 'k':
+            pattern = self.keyword_lookup.get(matched, matched)
+        else:
+            pattern = self.other_patterns[int(match.lastgroup[1:])]
+        return pattern, match.start(), match.end()
+
+    @classmethod
+    def _trie_regex(cls, words):
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        return cls._node_regex(trie)
+
+    @classmethod
+    def _node_regex(cls, node):
+        branches = [re.escape(char) + cls._node_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return f'(?:{body})?'
+        return body
 
 
 class MainHardCodedCheck:
@@ -9,18 +103,19 @@ class MainHardCodedCheck:
 
     Attributes:
         content: Content of the file to check
-        keywords: List of keywords to search for in the scripts
-        regex: List of regex patterns to search for in the scripts
+        matcher: SecretMatcher with the keywords and regex patterns to search for in the scripts
         safe Pattern: Pattern to search for safe secrets
+        matches: List with the pattern and position that caused each finding
 
     Returns:
         Findings: List of Hard-Coded secrets found
     """
 
     def __init__(self):
-        self.keywords = Lists.keywords
-        self.regex = [re.compile(pattern, re.IGNORECASE) for pattern in Lists.regex_patterns]
+        self.matcher = SecretMatcher.shared()
         self.safe_pattern = re.compile(r'\${{\s*secrets\.\w+\s*}}')
+        self.findings = []
+        self.matches = []
 
     def check(self, content=None):
         """
@@ -32,57 +127,86 @@ class MainHardCodedCheck:
         Returns:
             findings: List of findings
         """
-        findings = []
+        walker = Walker()
+        self.register(walker)
+        walker.walk(content)
+        walker.raise_error(self)
 
-        # Check workflow level
-        logging.debug(f"Checking workflow level: {content.env}")
-        findings.extend(self._check_env(content.env, 'workflow'))
-
-        # Check jobs level
-        for job_name, job in content.jobs.items():
-            logging.debug(f"Checking job level: {job_name}, env: {job.env}")
-            findings.extend(self._check_env(job.env, f'job {job_name}'))
-
-            # Check services level
-            if job.services:
-                for service_name, service in job.services.items():
-                    logging.debug(f"Checking service level: {service_name}")
-                    if 'env' in service:
-                        findings.extend(self._check_env(service['env'], f'service {service_name} in job {job_name}'))
-                    if 'credentials' in service:
-                        findings.extend(
-                            self._check_env(service['credentials'], f'service {service_name} in job {job_name}'))
-
-            # Check steps level
-            for step in job.steps:
-                logging.debug(f"Checking step level: {step.env}")
-                findings.extend(self._check_env(step.env, f'step in job {job_name}'))
-
-                if step.run:
-                    logging.debug(f"Checking run command: {step.run}")
-                    findings.extend(self._check_run(step.run, f'step in job {job_name}'))
+        return self.results()
 
-        return findings
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
+
+        Attributes:
+            walker: A Walker object.
+        """
+        self.findings = []
+        self.matches = []
+        walker.register(self, 'env', self.visit_env)
+        walker.register(self, 'job', self.visit_job)
+        walker.register(self, 'run', self.visit_run)
+
+    def results(self):
+        """
+        Collect the findings of the visited workflow.
+        """
+        return self.findings
+
+    def visit_env(self, level, key, value, job_name, step):
+        if level == 'workflow':
+            env_level = 'workflow'
+        elif level == 'job':
+            env_level = f'job {job_name}'
+        else:
+            env_level = f'step in job {job_name}'
+        logging.debug(f"Checking {level} level env: {key}")
+        finding = self._check_env_entry(key, value, env_level)
+        if finding:
+            self.findings.append(finding)
+
+    def visit_job(self, job_name, job):
+        # Check services level
+        if job.services:
+            for service_name, service in job.services.items():
+                logging.debug(f"Checking service level: {service_name}")
+                if 'env' in service:
+                    self.findings.extend(self._check_env(service['env'], f'service {service_name} in job {job_name}'))
+                if 'credentials' in service:
+                    self.findings.extend(
+                        self._check_env(service['credentials'], f'service {service_name} in job {job_name}'))
+
+    def visit_run(self, job_name, step):
+        logging.debug(f"Checking run command: {step.run}")
+        self.findings.extend(self._check_run(step.run, f'step in job {job_name}'))
 
     def _check_env(self, env, level):
         findings = []
         for key, value in env.items():
-            value_str = str(value).lower()
-            key_str = str(key).lower()
-            if (any(pattern.search(key_str) for pattern in self.regex)
-                    and not self.safe_pattern.search(value_str)):
-                findings.append(f"Hard-coded secret in {level} env '{key}'")
-            elif (any(
-                    keyword.lower() in key_str for keyword in self.keywords)
-                  and not self.safe_pattern.search(value_str)):
-                findings.append(f"Hard-coded secret in {level} env '{key}'")
+            finding = self._check_env_entry(key, value, level)
+            if finding:
+                findings.append(finding)
         return findings
 
+    def _check_env_entry(self, key, value, level):
+        match = self.matcher.search(str(key).lower())
+        if match and not self.safe_pattern.search(str(value).lower()):
+            self._add_match(level, 'env', key, match)
+            return f"Hard-coded secret in {level} env '{key}'"
+        return None
+
     def _check_run(self, run, level):
         findings = []
         run_str = str(run)
-        if any(pattern.search(run_str) for pattern in self.regex):
-            findings.append(f"Hard-coded secret in {level} run command '{run}'")
-        elif any(keyword.lower() in run_str.lower() for keyword in self.keywords):
+        match = self.matcher.search(run_str)
+        if match:
+            self._add_match(level, 'run', run_str, match)
             findings.append(f"Hard-coded secret in {level} run command '{run}'")
         return findings
+
+    def _add_match(self, level, source, text, match):
+        pattern, start, end = match
+        logging.debug(f"Secret pattern '{pattern}' matched {source} in {level} at {start}-{end}: {text[start:end]}")
+        self.matches.append({"level": level, "source": source, "text": text,
+                             "pattern": pattern, "start": start, "end": end})
@@ -1,4 +1,5 @@
 from Utils.Utilities import Lists
+from Analysis.Engine.Walker import Walker
 
 
 class MainRemoteRunCheck:
@@ -15,10 +16,31 @@ class MainRemoteRunCheck:
         Checks remote triggers configurations in the workflow
         """
 
-        self.check_dispatch(workflow)
-        self.check_call(workflow)
-        self.check_run(workflow)
+        walker = Walker()
+        self.register(walker)
+        walker.walk(workflow)
+        walker.raise_error(self)
 
+        return self.results()
+
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
+        The triggers are defined only on the workflow level.
+
+        Args:
+            walker: A Walker object.
+        """
+        self.findings = []
+        walker.register(self, 'workflow', self.check_dispatch)
+        walker.register(self, 'workflow', self.check_call)
+        walker.register(self, 'workflow', self.check_run)
+
+    def results(self):
+        """
+        Collect the findings of the visited workflow.
+        """
         return self.findings
 
     def check_dispatch(self, workflow):
@@ -1,6 +1,8 @@
 import re
 import logging
 
+from Analysis.Engine.Walker import Walker
+
 
 class MainUnsecureProtocolCheck:
     """
@@ -15,6 +17,7 @@ class MainUnsecureProtocolCheck:
 
     def __init__(self):
         self.pattern = re.compile(r'\bhttp://\S+', re.IGNORECASE)
+        self.findings = []
 
     def check(self, content=None):
         """
@@ -26,26 +29,43 @@ class MainUnsecureProtocolCheck:
         Returns:
             findings: List of findings
         """
-        findings = []
+        walker = Walker()
+        self.register(walker)
+        walker.walk(content)
+        walker.raise_error(self)
+
+        return self.results()
+
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
 
-        # Check workflow level
-        logging.debug(f"Checking workflow level: {content.env}")
-        findings.extend(self._check_urls(content.env, 'workflow'))
+        Attributes:
+            walker: A Walker object.
+        """
+        self.findings = []
+        walker.register(self, 'env', self.visit_env)
+        walker.register(self, 'run', self.visit_run)
 
-        # Check jobs level
-        for job_name, job in content.jobs.items():
-            logging.debug(f"Checking job level: {job_name}, env: {job.env}")
-            findings.extend(self._check_urls(job.env, f'job {job_name}'))
+    def results(self):
+        """
+        Collect the findings of the visited workflow.
+        """
+        return self.findings
 
-            # Check steps level
-            for step in job.steps:
-                logging.debug(f"Checking step level: {step.env}")
-                findings.extend(self._check_urls(step.env, f'step in job {job_name}'))
-                if step.run:
-                    logging.debug(f"Checking run command: {step.run}")
-                    findings.extend(self._check_run(step.run, f'step in job {job_name}'))
+    def visit_env(self, level, key, value, job_name, step):
+        if level == 'workflow':
+            env_level = 'workflow'
+        elif level == 'job':
+            env_level = f'job {job_name}'
+        else:
+            env_level = f'step in job {job_name}'
+        self.findings.extend(self._check_urls({key: value}, env_level))
 
-        return findings
+    def visit_run(self, job_name, step):
+        logging.debug(f"Checking run command: {step.run}")
+        self.findings.extend(self._check_run(step.run, f'step in job {job_name}'))
 
     def _check_urls(self, env, level):
         findings = []
@@ -3,7 +3,7 @@ from Analysis.Smells.Categories.Security.UntrustedDependencies.UntrustedDependen
 
 
 class UntrustedDependenciesFct:
-    def __init__(self, content=None, token=None):
+    def __init__(self, content=None, token=None, cache=None):
         if not content:
             raise ValueError("No workflow provided.")
         self.content = content
@@ -11,7 +11,7 @@ class UntrustedDependenciesFct:
             raise ValueError("No token provided")
         self.token = token
         self.findings = []
-        self.strategy = MainUntrustedDependenciesCheck(self.token)
+        self.strategy = MainUntrustedDependenciesCheck(self.token, cache)
 
     def detect(self):
         """
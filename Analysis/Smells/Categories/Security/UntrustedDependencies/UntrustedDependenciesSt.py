@@ -6,7 +6,11 @@ from os.path import dirname, abspath
 d = dirname(dirname(abspath(__file__)))
 sys.path.append(d)
 
+import requests
+
 from APIs import GitHub
+from APIs.Cache import ActionCache
+from Analysis.Engine.Walker import Walker
 
 
 class MainUntrustedDependenciesCheck:
@@ -14,9 +18,21 @@ class MainUntrustedDependenciesCheck:
     Strategy to check for untrusted dependencies in Actions scripts.
     """
 
-    def __init__(self, token):
+    def __init__(self, token, cache=None):
         self.api = GitHub
         self.token = token
+        self.call = self.api.GitHubAPI(self.token)
+        # The shared cache is only opened on the first lookup
+        self._cache = cache
+        self.findings = []
+        # False when an action could not be verified on the last check
+        self.complete = True
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = ActionCache.shared()
+        return self._cache
 
     def check(self, content=None):
         """
@@ -28,35 +44,76 @@ class MainUntrustedDependenciesCheck:
         Returns:
             findings: List of findings
         """
-        findings = []
+        walker = Walker()
+        self.register(walker)
+        walker.walk(content)
+        walker.raise_error(self)
 
-        # Check jobs level
-        for job_name, job in content.jobs.items():
-            logging.debug(f"Checking job level: {job_name}, uses: {job.uses}")
-            findings.extend(self._check_uses(job.uses, f'job {job_name}'))
+        return self.results()
 
-            # Check steps level
-            for step in job.steps:
-                logging.debug(f"Checking step level: {step.uses}")
-                findings.extend(self._check_uses(step.uses, f'step in job {job_name}'))
+    def register(self, walker):
+        """
+        Register the strategy callbacks on a Walker, so the workflow can be visited once by many strategies.
+        The findings of a previous walk are cleared, so the strategy can walk the workflow again.
 
-        return findings
+        Attributes:
+            walker: A Walker object.
+        """
+        self.findings = []
+        self.complete = True
+        walker.register(self, 'job', self.visit_job)
+        walker.register(self, 'step', self.visit_step)
+
+    def results(self):
+        """
+        Collect the findings of the visited workflow.
+        """
+        return self.findings
+
+    def visit_job(self, job_name, job):
+        logging.debug(f"Checking job level: {job_name}, uses: {job.uses}")
+        self.findings.extend(self._check_uses(job.uses, f'job {job_name}'))
+
+    def visit_step(self, job_name, job, step):
+        logging.debug(f"Checking step level: {step.uses}")
+        self.findings.extend(self._check_uses(step.uses, f'step in job {job_name}'))
 
     def _check_uses(self, uses, level):
         findings = []
-        call = self.api.GitHubAPI(self.token)
 
         if uses:
             match = re.match(r'([^/]+)/([^@]+)@(.+)', uses)
             if match:
                 user, repo, version = match.groups()
                 logging.debug(f"Checking {level} uses: user={user}, repo={repo}, version={version}")
-                owner_verified, verification_badge = call.fetch_action_verification(user, repo)
+                owner_verified, verification_badge, vulnerabilities = self._fetch_action(user, repo)
                 if not owner_verified and not verification_badge:
                     findings.append(f"Unverified dependency found in {level}: {uses}. "
                                     f"Consider using actions from verified creators.")
-                vulnerabilities = call.get_repository_vulnerabilities(user, repo)
                 if vulnerabilities:
                     findings.append(f"Vulnerabilities found in {level}: {uses}. "
                                     f"Details: {vulnerabilities}")
         return findings
+
+    def _fetch_action(self, user, repo):
+        """
+        Returns the verification status and the advisories of an action, reading them from the cache when they
+        are still fresh. The answers are only cached when every request succeeded, so a failed request is never
+        remembered as an unverified action.
+        """
+        cached = self.cache.get(user, repo)
+        if cached is not None:
+            return cached
+
+        try:
+            owner_verified, verification_badge = self.call.fetch_action_verification(user, repo, strict=True)
+            complete = True
+        except requests.RequestException:
+            owner_verified, verification_badge = False, False
+            complete = False
+            self.complete = False
+        vulnerabilities = self.call.get_repository_vulnerabilities(user, repo)
+
+        if complete:
+            self.cache.put(user, repo, owner_verified, verification_badge, vulnerabilities)
+        return owner_verified, verification_badge, vulnerabilities
@@ -1,34 +1,21 @@
 import argparse
 import configparser
 import glob
-import readline
-import re
 import sys
-from os.path import abspath, dirname, expanduser, join
+from functools import cached_property
+from os.path import abspath, dirname, join
 from urllib.parse import urlparse
 import os
-import time
 
 d = dirname(dirname(abspath(__file__)))
 sys.path.append(d)
 
-from Analysis.Parse import ActionParser
-from Analysis.Smells.Categories.Maintenance.CodeReplica.CodeReplicaFct import CodeReplicaFct
-from Analysis.Smells.Categories.Maintenance.ErrorHandling.ErrorHandlingFct import ErrorHandlingFct
-from Analysis.Smells.Categories.Maintenance.Misconfiguration.MisconfigurationFct import MisconfigurationFct
-from Analysis.Smells.Categories.Quality.LongBlocks.LongBlockFct import LongBlockFct
-from Analysis.Smells.Categories.Security.AdminByDefault.AdminByDefaultFct import AdminByDefaultFct
-from Analysis.Smells.Categories.Security.HardCoded.HardCodedFct import HardCodedFct
-from Analysis.Smells.Categories.Security.RemoteTriggers.RemoteTriggersFct import RemoteRunFct
-from Analysis.Smells.Categories.Security.UnsecureProtocol.UnsecureProtocolFct import UnsecureProtocolFct
-from Analysis.Smells.Categories.Security.UntrustedDependencies.UntrustedDependenciesFct import UntrustedDependenciesFct
-
-from APIs import GitHub
-from Miner import Mining
+# The modules of each subcommand are imported when the subcommand runs, so the local analysis starts without
+# loading PyDriller, requests and the network-backed detectors
 from Utils import Utilities
 
 # Define the path to the configuration file in the user's home directory
-CONFIG_DIR = join(expanduser("~"), ".gash")
+CONFIG_DIR = Utilities.Config.get_config_directory()
 CONFIG_FILE = join(CONFIG_DIR, 'config.ini')
 
 
@@ -36,6 +23,7 @@ def save_token(token):
     if not os.path.exists(CONFIG_DIR):
         os.makedirs(CONFIG_DIR)
     config = configparser.ConfigParser()
+    config.read(CONFIG_FILE)
     config['github'] = {'token': token}
     with open(CONFIG_FILE, 'w') as configfile:
         config.write(configfile)
@@ -56,27 +44,88 @@ def complete_path(text, state):
     return [x for x in glob.glob(text + '*')][state]
 
 
+def enable_path_completion():
+    import readline
+    readline.set_completer_delims(' \t\n;')
+    readline.parse_and_bind("tab: complete")
+    readline.set_completer(complete_path)
+
+
 class GASH:
     def __init__(self, token):
         self.token = token
-        self.api = GitHub.GitHubAPI(self.token)
-        self.parser = ActionParser
         self.utils = Utilities
-        self.miner = Mining
-        self.detectors = {}
-
-    def initialize_detectors(self, workflow, token):
-        self.detectors = {
-            'CodeReplica': CodeReplicaFct(workflow),
-            'ErrorHandling': ErrorHandlingFct(workflow),
-            'Misconfiguration': MisconfigurationFct(workflow),
-            'LongBlock': LongBlockFct(workflow),
-            'AdminByDefault': AdminByDefaultFct(workflow),
-            'HardCoded': HardCodedFct(workflow),
-            'RemoteRun': RemoteRunFct(workflow),
-            'UnsecureProtocol': UnsecureProtocolFct(workflow),
-            'UntrustedDependencies': UntrustedDependenciesFct(workflow, token)
-        }
+
+    @cached_property
+    def api(self):
+        from APIs import GitHub
+        return GitHub.GitHubAPI(self.token)
+
+    @property
+    def parser(self):
+        from Analysis.Parse import ActionParser
+        return ActionParser
+
+    @property
+    def miner(self):
+        from Miner import Mining
+        return Mining
+
+    @staticmethod
+    def file_cache(args):
+        """
+        Returns the cache of the analyzed files, or None if it is disabled.
+        """
+        if args.no_cache:
+            return None
+        from Analysis.Engine.FileCache import FileCache
+        return FileCache()
+
+    def authenticate(self):
+        """
+        Loads the GitHub API token, asking for it when it is not saved, and validates it.
+
+        :return: The token, or None if it is not valid.
+        """
+        _token = load_token()
+        if not _token:
+            print("\nHey there! I'm GASH, your friendly GitHub Actions Helper. 😊")
+            print("Before we get started, I'll need your GitHub API token to work my magic.")
+            print("Don't worry, if you already have it saved as an environment variable in your OS, you're all set!")
+            print("Just let me know by typing 'yes'.")
+            print("If you prefer to enter it manually, type 'no' and I'll store it securely for future use.")
+            print(f"Your token will be safely stored in: {CONFIG_FILE}. You won't have to enter it again next time!")
+            print("Let's get started and make your GitHub Actions awesome! 🚀\n\n")
+            while True:
+                answer1 = input("Enter 'yes' or 'no': ").strip().lower()
+                if answer1 == 'yes':
+                    env_name = input("Please enter your OS ENV name: ")
+                    _token = os.environ.get(env_name)
+                    if not _token:
+                        print(f"No token found in environment variable {env_name}. Please try again.")
+                        continue
+                elif answer1 == 'no':
+                    _token = input("Please enter your GitHub API token: ")
+                else:
+                    print("Invalid input. Please enter 'yes' or 'no'.")
+                    continue
+                break
+
+        print("\nHey there! I'm GASH, your friendly GitHub Actions Helper. 😊")
+        print("I will be using your stored GitHub API token.")
+        print("Let's get started and make your GitHub Actions awesome! 🚀\n\n")
+
+        from APIs import GitHub
+        api = GitHub.GitHubAPI(_token)
+        status_code = api.get_rate_limit()
+
+        if status_code == 200:
+            save_token(_token)
+            print("Proceeding with the operations...\n\n")
+            return _token
+
+        print("Invalid token. Please try again.")
+        return None
 
     def main(self):
         parser = argparse.ArgumentParser(
@@ -104,6 +153,19 @@ class GASH:
             description='Mine GitHub commits from a specified repository URL.'
         )
         parser_mine.add_argument('--url', type=str, help='GitHub repository URL to mine.')
+        parser_mine.add_argument('--all-commits', action='store_true',
+                                 help='Traverse every commit instead of asking git for the workflow commits only.')
+        parser_mine.add_argument('--restart', action='store_true',
+                                 help='Mine from the first commit instead of resuming from the last checkpoint.')
+        parser_mine.add_argument('--pipeline', action='store_true',
+                                 help='Fetch the GitHub info and analyze the workflows on concurrent stages.')
+        parser_mine.add_argument('--enrich-workers', type=int, default=8,
+                                 help='Number of threads fetching the GitHub info on the pipeline (default: 8).')
+        parser_mine.add_argument('--analysis-workers', type=int, default=2,
+                                 help='Number of threads analyzing the workflows on the pipeline (default: 2).')
+        parser_mine.add_argument('--metrics', nargs='*', choices=Utilities.OPTIONAL_METRICS,
+                                 default=Utilities.OPTIONAL_METRICS,
+                                 help='Expensive columns to compute, leave it empty to skip all of them (default: all).')
 
         parser_batch = subparsers.add_parser(
             'batch-commit',
@@ -114,6 +176,38 @@ class GASH:
         )
         parser_batch.add_argument('--file', type=str, help='CSV file path containing GitHub repositories URL to mine.')
         parser_batch.add_argument('--url', type=int, help='Column number containing the URLs.')
+        parser_batch.add_argument('--all-commits', action='store_true',
+                                  help='Traverse every commit instead of asking git for the workflow commits only.')
+        parser_batch.add_argument('--jobs', type=int, default=1,
+                                  help='Number of repositories mined at once on separate processes (default: 1).')
+        parser_batch.add_argument('--restart', action='store_true',
+                                  help='Mine from the first commit instead of resuming from the last checkpoint.')
+        parser_batch.add_argument('--pipeline', action='store_true',
+                                  help='Fetch the GitHub info and analyze the workflows on concurrent stages.')
+        parser_batch.add_argument('--enrich-workers', type=int, default=8,
+                                  help='Number of threads fetching the GitHub info on the pipeline (default: 8).')
+        parser_batch.add_argument('--analysis-workers', type=int, default=2,
+                                  help='Number of threads analyzing the workflows on the pipeline (default: 2).')
+        parser_batch.add_argument('--metrics', nargs='*', choices=Utilities.OPTIONAL_METRICS,
+                                  default=Utilities.OPTIONAL_METRICS,
+                                  help='Expensive columns to compute, leave it empty to skip all of them (default: all).')
+
+        parser_remote = subparsers.add_parser(
+            'remote',
+            help='--url: Repository URL or --file: CSV File Path, '
+                 'Analyze the workflows of repositories without cloning them.',
+            description='Analyze the current workflows of GitHub repositories through the GitHub API, '
+                        'without cloning them.'
+        )
+        parser_remote.add_argument('--url', type=str, help='GitHub repository URL to analyze.')
+        parser_remote.add_argument('--file', type=str, help='CSV file path containing GitHub repositories URL, '
+                                                            'e.g. the repos_dataset.csv of the repo command.')
+        parser_remote.add_argument('--column', type=int, default=3,
+                                   help='Column number containing the URLs (default: 3, as on repos_dataset.csv).')
+        parser_remote.add_argument('--fetch-workers', type=int, default=4,
+                                   help='Number of threads fetching the workflows (default: 4).')
+        parser_remote.add_argument('--analysis-workers', type=int, default=2,
+                                   help='Number of threads analyzing the workflows (default: 2).')
 
         # Subcommand for analyzing smells
         parser_analyze = subparsers.add_parser(
@@ -123,6 +217,10 @@ class GASH:
             description='Analyze GitHub Actions file for smells.'
         )
         parser_analyze.add_argument('--file', type=str, help='GitHub Actions file path to analyze.')
+        parser_analyze.add_argument('--offline', action='store_true',
+                                    help='Skip the token validation and the detectors that need the GitHub API.')
+        parser_analyze.add_argument('--no-cache', action='store_true',
+                                    help='Analyze the file again even if it did not change.')
 
         parser_batch_analyze = subparsers.add_parser(
             'batch-analyze',
@@ -131,6 +229,59 @@ class GASH:
         )
         parser_batch_analyze.add_argument('--dir', type=str,
                                           help='Directory path containing GitHub Actions files to analyze.')
+        parser_batch_analyze.add_argument('--jobs', type=int, default=1,
+                                          help='Number of worker processes used to analyze the files.')
+        parser_batch_analyze.add_argument('--offline', action='store_true',
+                                          help='Skip the token validation and the detectors that need the '
+                                               'GitHub API.')
+        parser_batch_analyze.add_argument('--no-cache', action='store_true',
+                                          help='Analyze every file again, even the ones that did not change.')
+
+        # Subcommand for the long-running analysis service
+        parser_serve = subparsers.add_parser(
+            'serve',
+            help='--port: Port, --socket: Unix socket path, Serve the analysis over HTTP.',
+            description='Keep the detectors and caches loaded and analyze the workflows posted to /analyze.'
+        )
+        parser_serve.add_argument('--host', type=str, default='127.0.0.1',
+                                  help='Address to listen on (default: 127.0.0.1).')
+        parser_serve.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765).')
+        parser_serve.add_argument('--socket', type=str, help='Listen on this Unix socket instead of the port.')
+        parser_serve.add_argument('--offline', action='store_true',
+                                  help='Skip the token validation and the detectors that need the GitHub API.')
+
+        # Subcommand for watching the workflows of a repository
+        parser_watch = subparsers.add_parser(
+            'watch',
+            help='dir: Repository path, Analyze the workflows again every time they change.',
+            description='Watch the .github/workflows directory and analyze the changed jobs of every saved file.'
+        )
+        parser_watch.add_argument('dir', type=str, nargs='?', default='.',
+                                  help='Repository or workflows directory (default: current directory).')
+        parser_watch.add_argument('--poll', action='store_true', help='Poll the files instead of using inotify.')
+        parser_watch.add_argument('--interval', type=float, default=1.0,
+                                  help='Seconds between two polls (default: 1).')
+        parser_watch.add_argument('--offline', action='store_true',
+                                  help='Skip the token validation and the detectors that need the GitHub API.')
+
+        # Subcommand for the editors
+        parser_lsp = subparsers.add_parser(
+            'lsp',
+            help='Run a Language Server Protocol server on stdin/stdout.',
+            description='Publish the smells of the workflows open on an editor as diagnostics.'
+        )
+        parser_lsp.add_argument('--offline', action='store_true',
+                                help='Skip the detectors that need the GitHub API, even with a saved token.')
+        parser_lsp.add_argument('--debounce', type=float, default=0.15,
+                                help='Seconds without edits before a document is analyzed (default: 0.15).')
+
+        # Subcommand for reading the mined snapshots
+        parser_snapshot = subparsers.add_parser(
+            'snapshot',
+            help='--oid: Blob ID, Print a workflow snapshot referenced by the commits datasets.',
+            description='Print a workflow snapshot saved by the commit miners.'
+        )
+        parser_snapshot.add_argument('--oid', type=str, help='Blob ID from a "Path Src Code" column.')
 
         parser.add_argument('-d', '--daemon', action='store_true', help='Run as a daemon in the background')
 
@@ -153,42 +304,33 @@ class GASH:
             parser.print_help()
             return
 
-        _token = load_token()
-        if not _token:
-            print("\nHey there! I'm GASH, your friendly GitHub Actions Helper. 😊")
-            print("Before we get started, I'll need your GitHub API token to work my magic.")
-            print("Don't worry, if you already have it saved as an environment variable in your OS, you're all set!")
-            print("Just let me know by typing 'yes'.")
-            print("If you prefer to enter it manually, type 'no' and I'll store it securely for future use.")
-            print(f"Your token will be safely stored in: {CONFIG_FILE}. You won't have to enter it again next time!")
-            print("Let's get started and make your GitHub Actions awesome! 🚀\n\n")
-            while True:
-                answer1 = input("Enter 'yes' or 'no': ").strip().lower()
-                if answer1 == 'yes':
-                    env_name = input("Please enter your OS ENV name: ")
-                    _token = os.environ.get(env_name)
-                    if not _token:
-                        print(f"No token found in environment variable {env_name}. Please try again.")
-                        continue
-                elif answer1 == 'no':
-                    _token = input("Please enter your GitHub API token: ")
-                else:
-                    print("Invalid input. Please enter 'yes' or 'no'.")
-                    continue
-
-        print("\nHey there! I'm GASH, your friendly GitHub Actions Helper. 😊")
-        print("I will be using your stored GitHub API token.")
-        print("Let's get started and make your GitHub Actions awesome! 🚀\n\n")
+        if args.command == 'snapshot':
+            oid = args.oid or input("Please enter the blob ID of the snapshot: ")
+            from Miner.BlobStore import BlobStore
+            content = BlobStore.at(Utilities.Config.get_base_directory()).get(oid.strip())
+            if content is None:
+                print(f"Snapshot not found: {oid}")
+            else:
+                print(content, end='')
+            return
 
-        api = GitHub.GitHubAPI(_token)
-        status_code = api.get_rate_limit()
+        if args.command == 'lsp':
+            from Analysis.Engine.LanguageServer import LanguageServer
+            output = sys.stdout.buffer
+            # The protocol owns stdout, so everything printed goes to stderr. The saved token is used without
+            # asking or validating it, since stdin belongs to the editor as well.
+            sys.stdout = sys.stderr
+            _token = None if args.offline else load_token()
+            LanguageServer(sys.stdin.buffer, output, _token, offline=not _token, debounce=args.debounce).run()
+            return
 
-        if status_code == 200:
-            save_token(_token)
-            print("Proceeding with the operations...\n\n")
+        if getattr(args, 'offline', False):
+            # Local analysis only, so neither the token nor the network is needed
+            _token = None
         else:
-            print("Invalid token. Please try again.")
-            return
+            _token = self.authenticate()
+            if not _token:
+                return
 
         if args.command == 'repo':
             age = args.age
@@ -214,16 +356,16 @@ class GASH:
             repo_name = urlparse(url).path.split('/')[2]
             print(f"Mining GitHub repository: {repo_name}")
             worker = self.miner.Mining(_token)
-            worker.commits(url)
+            worker.commits(url, workflow_only=not args.all_commits, pipeline=args.pipeline,
+                           enrich_workers=args.enrich_workers, analysis_workers=args.analysis_workers,
+                           resume=not args.restart, metrics=args.metrics)
 
         elif args.command == 'batch-commit':
             _file = args.file
             url_column = args.url
 
             if _file is None or url_column is None:
-                readline.set_completer_delims(' \t\n;')
-                readline.parse_and_bind("tab: complete")
-                readline.set_completer(complete_path)
+                enable_path_completion()
                 _file = input('Please provide a csv file path: ')
                 url_column = input('Please provide a column number that contains the URLs: ')
 
@@ -233,35 +375,46 @@ class GASH:
 
             print(f'Mining repositories listed in the file: {_file}')
             worker = self.miner.Mining(_token)
-            worker.batch(f'{_file}', url_column)
+            worker.batch(f'{_file}', url_column, workflow_only=not args.all_commits, jobs=args.jobs,
+                         pipeline=args.pipeline, enrich_workers=args.enrich_workers,
+                         analysis_workers=args.analysis_workers, resume=not args.restart,
+                         metrics=args.metrics)
+
+        elif args.command == 'remote':
+            if args.file:
+                if not os.path.exists(args.file):
+                    print(f"File not found: {args.file}")
+                    return
+                repo_urls = list(Utilities.Config(args.file).reading_repos(args.column))
+                output_csv = f"remote_{os.path.splitext(os.path.basename(args.file))[0]}.csv"
+            else:
+                url = args.url or input("Please enter the GitHub repository URL to analyze: ")
+                repo_urls = [url]
+                output_csv = f"remote_{urlparse(url).path.split('/')[2]}.csv"
+
+            print(f"Analyzing the workflows of {len(repo_urls)} repositories")
+            worker = self.miner.Mining(_token)
+            worker.remote(repo_urls, output_csv, fetch_workers=args.fetch_workers,
+                          analysis_workers=args.analysis_workers)
 
         elif args.command == 'analyze':
             _file = args.file
 
             if not _file:
-                readline.set_completer_delims(' \t\n;')
-                readline.parse_and_bind("tab: complete")
-                readline.set_completer(complete_path)
+                enable_path_completion()
                 _file = input("Please enter the path to the GitHub Actions file: ")
 
             print(f"Analyzing GitHub Actions file: {_file}")
-            action = self.parser.Action(file_path=f'{_file}')
-            workflow = action.prepare_for_analysis()
-
-            self.initialize_detectors(workflow, _token)
-
-            for detector_name, detector in self.detectors.items():
-                findings = detector.detect()
-                print(f"\nFindings for {detector_name}:")
-                if findings:
-                    for finding in findings:
-                        for line in re.split(r',\s*(?![^{}]*})', finding):
-                            print(f"- {line.strip()}")
-                else:
-                    print("No findings detected.")
+            from Analysis.Engine import Analyzer
+            analyzer = Analyzer.BatchAnalyzer(_token, offline=args.offline, cache=self.file_cache(args))
+            _, results, errors = next(analyzer.findings([_file]))
+            print(Analyzer.format_log(_file, results, errors))
 
         elif args.command == 'batch-analyze':
+            from Analysis.Engine import Analyzer
+            cache = self.file_cache(args)
             _dir = args.dir
+            jobs = args.jobs
 
             repo_dirs = glob.glob(_dir, recursive=True)
 
@@ -282,64 +435,21 @@ class GASH:
                 print(f"Starting analysis for {len(yaml_files)} "
                       f"GitHub Actions files in directory: {repo_dir}\n")
 
-                for file_path in yaml_files:
-                    file_root, file_ext = os.path.splitext(os.path.basename(file_path))
-                    log_file_path = os.path.join(analysis_dir, f'{file_root}.log')
-                    print(f"Analyzing GitHub Actions file: {file_path}\n")
-                    with open(log_file_path, 'w') as log_file:
-                        action = self.parser.Action(file_path=file_path)
-                        workflow = action.prepare_for_analysis()
-
-                        attempts = 0
-                        while attempts < 3:
-                            try:
-                                self.initialize_detectors(workflow, _token)
-                                break
-                            except Exception as e:
-                                print(f"Error initializing detectors: {e}")
-                                attempts += 1
-                                if attempts < 3:
-                                    print(f"Retrying in {3 * attempts} seconds...")
-                                    time.sleep(3 * attempts)
-                                else:
-                                    print(f"Failed to initialize detectors after {attempts} attempts. Skipping file.")
-                                    log_file.write(
-                                        f"Failed to initialize detectors after {attempts} attempts. Skipping file.\n")
-                                    break
-
-                        if attempts < 3:
-                            for detector_name, detector in self.detectors.items():
-                                detection_attempts = 0
-                                while detection_attempts < 5:
-                                    try:
-                                        findings = detector.detect()
-                                        break
-                                    except Exception as e:
-                                        print(f"Error detecting with {detector_name}: {e}")
-                                        detection_attempts += 1
-                                        if detection_attempts < 3:
-                                            print(f"Retrying detection in {10 * detection_attempts} seconds...")
-                                            time.sleep(3 * detection_attempts)
-                                        else:
-                                            print(
-                                                f"Failed to detect with {detector_name} after {detection_attempts} "
-                                                f"attempts. Skipping detector.")
-                                            log_file.write(
-                                                f"Failed to detect with {detector_name} after {detection_attempts} "
-                                                f"attempts.\n")
-                                            findings = []
-
-                                log_file.write(f"\nFindings for {detector_name} in {file_path}:\n")
-                                if findings:
-                                    for finding in findings:
-                                        for line in re.split(r',\s*(?![^{}]*})', finding):
-                                            log_file.write(f"- {line.strip()}\n")
-                                else:
-                                    log_file.write("No findings detected.\n")
-
-                    print(f"Analysis complete for {file_path}.\n"
-                          f"Log written to {log_file_path}.\n\n")
-                    time.sleep(5)
+                Analyzer.BatchAnalyzer(_token, jobs, args.offline, cache).run(yaml_files, analysis_dir)
+
+        elif args.command == 'watch':
+            from Analysis.Engine.Watcher import WorkflowWatcher
+            if not os.path.isdir(args.dir):
+                print(f"Directory not found: {args.dir}")
+                return
+            WorkflowWatcher(args.dir, _token, args.offline, args.interval, poll=args.poll).run()
+
+        elif args.command == 'serve':
+            from Analysis.Engine.Server import AnalysisServer
+            server = AnalysisServer(_token, args.offline)
+            print(f"Serving the analysis on {args.socket or f'http://{args.host}:{args.port}'}. "
+                  f"Post the workflows to /analyze.")
+            server.serve(args.host, args.port, args.socket)
 
         else:
             parser.print_help()
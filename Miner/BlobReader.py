@@ -0,0 +1,73 @@
+import subprocess
+import threading
+
+
+class BlobReader:
+    """
+    Reads the files of a git repository at any revision from a single long-lived `git cat-file --batch` process,
+    so the files are never checked out or copied to temporary files, and no process is started per file.
+
+    The reader can be used as a context manager, which stops the git process on exit.
+
+    Attributes:
+        repo_path (str): Path of the git repository.
+    """
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self._process = None
+        self._lock = threading.Lock()
+
+    def read(self, revision, path=None):
+        """
+        Reads a blob.
+
+            :param revision: A commit, a tree or a blob ID. With a path, the revision is a commit or a tree.
+            :param path: Path of the file on the revision.
+            :return: A tuple with the blob ID and the content as bytes, or (None, None) if there is no such blob.
+        """
+        name = f"{revision}:{path}" if path is not None else revision
+        if '\n' in name:
+            raise ValueError(f"Invalid object name {name!r}.")
+
+        with self._lock:
+            process = self._start()
+            process.stdin.write(name.encode('utf-8') + b'\n')
+            process.stdin.flush()
+
+            header = process.stdout.readline()
+            if not header:
+                self.close()
+                raise RuntimeError(f"git cat-file stopped while reading {name} from {self.repo_path}.")
+            if header.endswith((b' missing\n', b' ambiguous\n')):
+                return None, None
+
+            oid, kind, size = header.rsplit(b' ', 2)
+            # The content is followed by a newline
+            data = process.stdout.read(int(size) + 1)[:-1]
+            if kind != b'blob':
+                return None, None
+            return oid.decode('ascii'), data
+
+    def close(self):
+        """
+        Stops the git process. It is started again by the next read.
+        """
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+    def _start(self):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(["git", "-C", self.repo_path, "cat-file", "--batch"],
+                                             stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL)
+        return self._process
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
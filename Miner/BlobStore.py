@@ -0,0 +1,73 @@
+import hashlib
+import os
+import zlib
+
+from Utils.Storage import SQLiteStore
+
+
+def blob_id(data):
+    """
+    Returns the git blob ID of a content, the same ID printed by git hash-object.
+    """
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class BlobStore(SQLiteStore):
+    """
+    Content-addressed store of the workflow snapshots. Every distinct content is kept once, compressed with zlib
+    and keyed by its git blob ID, so the same file saved by many commits, repositories or forks costs one row.
+    The store is a single SQLite file, shared by the processes mining in parallel.
+
+    Attributes:
+        known (set): Blob IDs already stored, so they are not written again by the current process.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS blobs (
+            oid TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.known = set()
+        super().__init__(path)
+
+    @classmethod
+    def at(cls, base_dir):
+        """
+        Returns the store of a base directory of generated files.
+        """
+        return cls(os.path.join(base_dir, "Scripts", "blobs.db"))
+
+    def put(self, content):
+        """
+        Stores a content and returns its blob ID.
+
+            :param content: The content, as str (saved as UTF-8) or bytes.
+            :return: The git blob ID of the content.
+        """
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        oid = blob_id(data)
+        if oid not in self.known:
+            self.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?)", (oid, len(data), zlib.compress(data)))
+            self.known.add(oid)
+        return oid
+
+    def get(self, oid):
+        """
+        Returns the content of a blob as str, or None if the blob is not stored.
+        """
+        data = self.get_bytes(oid)
+        return data.decode('utf-8') if data is not None else None
+
+    def get_bytes(self, oid):
+        """
+        Returns the content of a blob as bytes, or None if the blob is not stored.
+        """
+        rows = self.query("SELECT data FROM blobs WHERE oid = ?", (oid,))
+        return zlib.decompress(rows[0][0]) if rows else None
+
+    def __contains__(self, oid):
+        return oid in self.known or bool(self.query("SELECT 1 FROM blobs WHERE oid = ?", (oid,)))
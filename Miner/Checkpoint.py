@@ -0,0 +1,73 @@
+import time
+
+from Utils.Storage import SQLiteStore
+
+
+class CheckpointStore(SQLiteStore):
+    """
+    Records, for every mined repository, the last commit whose rows were completely written on its dataset.
+
+    The commits of a run are the ones reachable from its tip (the commit HEAD pointed to when the run started) but
+    not from its base (the tip of the previous run). The traversal follows the commit dates, so with merged
+    branches the last commit written is not always the tip. A checkpoint keeps the base and the tip of the run:
+    once the run is complete, both are the tip, and the next run only mines the commits that are not reachable
+    from it.
+
+    Besides the commit, a checkpoint keeps the size of the CSV file at that moment, so the rows of a commit that
+    was interrupted halfway can be dropped before the mining resumes, and the optional metrics written on the rows.
+
+    Attributes:
+        path (str): The path of the database file.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            repo_url TEXT PRIMARY KEY,
+            csv_path TEXT NOT NULL,
+            workflow_only INTEGER NOT NULL,
+            commit_hash TEXT NOT NULL,
+            csv_offset INTEGER NOT NULL,
+            updated_at REAL NOT NULL,
+            metrics TEXT,
+            base_commit TEXT,
+            tip_commit TEXT
+        );
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        # The checkpoints saved before the optional metrics or the tips have none, so they never match a dataset
+        columns = [column[1] for column in self.query("PRAGMA table_info(checkpoints)")]
+        for column in ("metrics", "base_commit", "tip_commit"):
+            if column not in columns:
+                self.execute(f"ALTER TABLE checkpoints ADD COLUMN {column} TEXT")
+
+    def get(self, repo_url):
+        """
+        Returns the checkpoint of a repository as a dictionary, or None if it was never mined.
+        """
+        rows = self.query("SELECT csv_path, workflow_only, commit_hash, csv_offset, updated_at, metrics, "
+                          "base_commit, tip_commit FROM checkpoints WHERE repo_url = ?", (repo_url,))
+        if not rows:
+            return None
+        csv_path, workflow_only, commit_hash, csv_offset, updated_at, metrics, base, tip = rows[0]
+        if metrics is not None:
+            metrics = tuple(metrics.split(',')) if metrics else ()
+        return {"csv_path": csv_path, "workflow_only": bool(workflow_only), "commit": commit_hash,
+                "csv_offset": csv_offset, "updated_at": updated_at, "metrics": metrics, "base": base, "tip": tip}
+
+    def save(self, repo_url, csv_path, workflow_only, commit_hash, csv_offset, metrics=(), base=None, tip=None):
+        """
+        Stores the last commit completely written on the dataset of a repository, and the base and the tip of
+        the run that wrote it.
+        """
+        self.execute("INSERT OR REPLACE INTO checkpoints (repo_url, csv_path, workflow_only, commit_hash, "
+                     "csv_offset, updated_at, metrics, base_commit, tip_commit) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (repo_url, csv_path, int(workflow_only), commit_hash, csv_offset, time.time(),
+                      ','.join(sorted(metrics)), base, tip))
+
+    def clear(self, repo_url):
+        """
+        Forgets the checkpoint of a repository, so it is mined again from the first commit.
+        """
+        self.execute("DELETE FROM checkpoints WHERE repo_url = ?", (repo_url,))
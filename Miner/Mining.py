@@ -3,43 +3,125 @@ import logging
 import os
 import sys
 import re
-import shutil
 import time
+from contextlib import nullcontext
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
-from pydriller import Repository, ModificationType
+import requests
+from pydriller import ModificationType
 from os.path import dirname, abspath
 
 d = dirname(dirname(abspath(__file__)))
 sys.path.append(d)
 
-from APIs.GitHub import GitHubAPI
+from APIs.Enrichment import Enricher
+from APIs.GitHub import GRAPHQL_BATCH_SIZE, GitHubAPI
+from APIs.Transport import Transport
 from Utils import Utilities
 from Analysis.Parse import ActionParser
-from Analysis.Smells.Categories.Maintenance.CodeReplica.CodeReplicaFct import CodeReplicaFct
-from Analysis.Smells.Categories.Maintenance.ErrorHandling.ErrorHandlingFct import ErrorHandlingFct
-from Analysis.Smells.Categories.Maintenance.Misconfiguration.MisconfigurationFct import MisconfigurationFct
-from Analysis.Smells.Categories.Quality.LongBlocks.LongBlockFct import LongBlockFct
-from Analysis.Smells.Categories.Security.AdminByDefault.AdminByDefaultFct import AdminByDefaultFct
-from Analysis.Smells.Categories.Security.HardCoded.HardCodedFct import HardCodedFct
-from Analysis.Smells.Categories.Security.RemoteTriggers.RemoteTriggersFct import RemoteRunFct
-from Analysis.Smells.Categories.Security.UnsecureProtocol.UnsecureProtocolFct import UnsecureProtocolFct
+from Analysis.Engine import Analyzer
+from Analysis.Engine.Memo import SmellMemo
+from Miner.BlobReader import BlobReader
+from Miner.BlobStore import BlobStore
+from Miner.Checkpoint import CheckpointStore
+from Miner.Mirrors import MirrorCache, is_remote
+from Miner.Pipeline import Pipeline
+from Miner.WorkflowHistory import HistoryRewritten, WorkflowRepository, is_workflow_file, resolve_commit
 from Analysis.Smells.Categories.Security.UntrustedDependencies.UntrustedDependenciesFct import UntrustedDependenciesFct
 
 
 class Mining:
+    # Columns of the commits dataset
+    COMMIT_HEADERS = [
+        "Project",
+        "Author",
+        "Author Acc Type",
+        "Author Email",
+        "Commiter",
+        "Commiter Acc Type",
+        "Commiter Email",
+        "Commit",
+        "Commit Parent",
+        "Commit Date",
+        "Commit Message",
+        "Number of Files Changed by Commit",
+        "Release",
+        "Files Names",
+        "Type Of Commit",
+        "Added lines",
+        "Deleted lines",
+        "Token count",
+        "Pull Request",
+        "Issue Tracker",
+        "Issue Creator",
+        "Issue Creator Acc type",
+        "Issue Creator Association",
+        "Issue Closer",
+        "Issue Closer Acc Type",
+        "Issue Created At",
+        "Issue Closed At",
+        "Issue State",
+        "Issue Labels",
+        "Issue Reviewers",
+        "Issue Reviewers Acc Type",
+        "Issue Body",
+        "Path Src Code Current",
+        "Path Src Code Before",
+        "Path Src Code After",
+        "DMM_Unit",
+        "DMM_Complexity",
+        "DMM_Interfacing",
+        "CodeReplica",
+        "ErrorHandling",
+        "Misconfiguration",
+        "LongBlock",
+        "AdminByDefault",
+        "HardCoded",
+        "RemoteTriggers",
+        "UnsecureProtocol",
+        "UntrustedDependencies",
+        "Diff"
+    ]
+
+    REMOTE_HEADERS = [
+        "Owner",
+        "Repo",
+        "Files Names",
+        "Path",
+        "Blob",
+        "CodeReplica",
+        "ErrorHandling",
+        "Misconfiguration",
+        "LongBlock",
+        "AdminByDefault",
+        "HardCoded",
+        "RemoteTriggers",
+        "UnsecureProtocol",
+        "UntrustedDependencies"
+    ]
+
+    # Repositories whose workflows are fetched by a single GraphQL query
+    REMOTE_BATCH_SIZE = 20
+
+    # Columns that are expensive to compute, filled only when requested
+    OPTIONAL_METRICS = Utilities.OPTIONAL_METRICS
+
     def __init__(self, token):
         self.token = token
         self.github_api = GitHubAPI(self.token)
         self.handler = Utilities.Config
         self.parser = ActionParser
+        self.memo = None
+        self.enricher = None
 
     def threaded_analyses(self, query, sort='stars', order='desc', max_pages=10):
         """Search and filter repositories that have the desired Parser in a single function."""
         filtered_repos = []
+        workers = 20
+        self.github_api.transport.resize(workers)
 
-        with ThreadPoolExecutor(max_workers=20) as executor:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
             futures = [
                 executor.submit(self.github_api.fetch_repo, query, sort, order, page) for page in
                 range(1, max_pages + 1)
@@ -108,14 +190,29 @@ class Mining:
 
         print("DataSet Created")
 
-    def commits(self, repo_url):
+    def commits(self, repo_url, workflow_only=True, pipeline=False, enrich_workers=8, analysis_workers=2,
+                resume=True, metrics=OPTIONAL_METRICS):
         """
         Extract commits from a repository and save them to a CSV file.
         Attributes:
             repo_url: URL of the repository to be mined.
+            workflow_only: Ask git for the commits touching the workflow files only, instead of traversing
+                and diffing the whole history.
+            pipeline: Run the traversal, the GitHub enrichment, the smell analysis and the CSV writing as
+                concurrent stages, so the network and the CPU work at the same time. The rows keep the same order.
+            enrich_workers: Number of threads fetching the commit and issue info when pipeline is True.
+            analysis_workers: Number of threads analyzing the workflows when pipeline is True.
+            resume: Continue from the checkpoint of the last run, appending the rows of the new commits to the
+                dataset. When False, or when there is no usable checkpoint, the dataset is created again.
+            metrics: The optional metrics to compute, among Mining.OPTIONAL_METRICS. The columns of the other
+                ones are left empty.
 
         Returns: CSV file with the commits infos.
         """
+        metrics = tuple(sorted(set(metrics)))
+        unknown = set(metrics) - set(self.OPTIONAL_METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics {sorted(unknown)}. Use some of {self.OPTIONAL_METRICS}.")
 
         # Logging config
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -124,8 +221,6 @@ class Mining:
         owner = urlparse(repo_url).path.split('/')[1]
         repo_name = urlparse(repo_url).path.split('/')[2]
 
-        extension1 = "yaml"
-        extension2 = "yml"
         output_csv = f"commits_{repo_name}.csv"
 
         # Creating Directory to save Parser
@@ -135,328 +230,506 @@ class Mining:
         dataset_dir = os.path.join(base_dir, "DataSets")
         os.makedirs(dataset_dir, exist_ok=True)
 
-        saved_files_dir = os.path.join(base_dir, "Scripts", repo_name)
-        os.makedirs(saved_files_dir, exist_ok=True)
-
-        saved_ymls_dir = os.path.join(saved_files_dir, "CurrentCode")
-        os.makedirs(saved_ymls_dir, exist_ok=True)
-
-        src_before_dir = os.path.join(saved_files_dir, "FilesBefore")
-        os.makedirs(src_before_dir, exist_ok=True)
-
-        src_after_dir = os.path.join(saved_files_dir, "FilesAfter")
-        os.makedirs(src_after_dir, exist_ok=True)
-
-        # CSV
-        headers = [
-            "Project",
-            "Author",
-            "Author Acc Type",
-            "Author Email",
-            "Commiter",
-            "Commiter Acc Type",
-            "Commiter Email",
-            "Commit",
-            "Commit Parent",
-            "Commit Date",
-            "Commit Message",
-            "Number of Files Changed by Commit",
-            "Release",
-            "Files Names",
-            "Type Of Commit",
-            "Added lines",
-            "Deleted lines",
-            "Token count",
-            "Pull Request",
-            "Issue Tracker",
-            "Issue Creator",
-            "Issue Creator Acc type",
-            "Issue Creator Association",
-            "Issue Closer",
-            "Issue Closer Acc Type",
-            "Issue Created At",
-            "Issue Closed At",
-            "Issue State",
-            "Issue Labels",
-            "Issue Reviewers",
-            "Issue Reviewers Acc Type",
-            "Issue Body",
-            "Path Src Code Current",
-            "Path Src Code Before",
-            "Path Src Code After",
-            "DMM_Unit",
-            "DMM_Complexity",
-            "DMM_Interfacing",
-            "CodeReplica",
-            "ErrorHandling",
-            "Misconfiguration",
-            "LongBlock",
-            "AdminByDefault",
-            "HardCoded",
-            "RemoteTriggers",
-            "UnsecureProtocol",
-            "UntrustedDependencies",
-            "Diff"
-        ]
+        # Snapshots of the workflow files and their findings, shared by every repository
+        blobs = BlobStore.at(base_dir)
+        self.memo = SmellMemo()
+        self.enricher = Enricher(self.github_api)
 
         # Updating path of the csv
         output_csv_path = os.path.join(dataset_dir, output_csv)
 
-        with open(output_csv_path, mode='w', newline='', encoding='utf-8') as csvfile:
+        checkpoints = CheckpointStore(os.path.join(dataset_dir, "checkpoints.db"))
+        checkpoint = checkpoints.get(repo_url) if resume else None
+        if checkpoint and not (checkpoint["tip"] and checkpoint["csv_path"] == output_csv_path and
+                               checkpoint["workflow_only"] == workflow_only and
+                               checkpoint["metrics"] == metrics and
+                               os.path.exists(output_csv_path) and
+                               os.path.getsize(output_csv_path) >= checkpoint["csv_offset"]):
+            logging.info(f"The checkpoint of {repo_url} does not match its dataset. Mining from the first commit.")
+            checkpoint = None
+
+        # Remote repositories are mined from a local mirror, so only the new commits are downloaded every time
+        source = MirrorCache.at(base_dir).mirror(repo_url) if is_remote(repo_url) else nullcontext(repo_url)
+        with source as repo_path:
+            while True:
+                try:
+                    self.write_dataset(repo_url, repo_path, owner, repo_name, output_csv_path, blobs, checkpoints,
+                                       checkpoint, workflow_only, pipeline, enrich_workers, analysis_workers,
+                                       metrics)
+                    break
+                except HistoryRewritten as e:
+                    if checkpoint is None:
+                        raise
+                    logging.warning(f"{e} Mining {repo_url} from the first commit.")
+                    checkpoint = None
+
+    def write_dataset(self, repo_url, repo_path, owner, repo_name, output_csv_path, blobs, checkpoints, checkpoint,
+                      workflow_only, pipeline, enrich_workers, analysis_workers, metrics=OPTIONAL_METRICS):
+        """
+        Writes the rows of the commits on the dataset, saving a checkpoint every time a commit is complete.
+        With a checkpoint, the rows written after it are dropped and only the commits that are not on the dataset
+        are mined. The commits are read from repo_path, the local copy of the repository at repo_url.
+        """
+        if checkpoint:
+            csvfile = open(output_csv_path, mode='r+', newline='', encoding='utf-8')
+            csvfile.seek(checkpoint["csv_offset"])
+            csvfile.truncate()
+        else:
+            csvfile = open(output_csv_path, mode='w', newline='', encoding='utf-8')
+            checkpoints.clear(repo_url)
+
+        # Every traversal is a (base, tip, done) tuple: the commits reachable from the tip and not from the base,
+        # skipping the ones up to the done commit, which are already on the dataset
+        head = resolve_commit(repo_path)
+        if not checkpoint:
+            traversals = [(None, head, None)]
+        elif checkpoint["base"] == checkpoint["tip"]:
+            traversals = [(checkpoint["tip"], head, None)]
+        else:
+            # The last run was interrupted, so its commits are completed before the new ones
+            traversals = [(checkpoint["base"], checkpoint["tip"], checkpoint["commit"]),
+                          (checkpoint["tip"], head, None)]
+
+        with csvfile:
             writer = csv.writer(csvfile, delimiter=';')
-            writer.writerow(headers)
-
-            logging.info("Creating Dataset...")
-
-            for commit in Repository(repo_url, histogram_diff=True).traverse_commits():
-                for modification in commit.modified_files:
-
-                    # Creating short commit hash
-                    short_hash = commit.hash[:7]
-
-                    # Getting the right path, existing or not
-                    filepath = (modification.new_path if modification.change_type != ModificationType.DELETE
-                                else modification.old_path)
-
-                    # Verifying is the file is on the right path of the repo
-                    if (filepath and filepath.startswith('.github/workflows/') and
-                            (filepath.endswith(f'.{extension1}') or filepath.endswith(f'.{extension2}'))):
-
-                        # Checking the Parser status
-                        if modification.change_type.name == "DELETE":
-                            source_path = None
-                        else:
-                            source_path = os.path.join(commit.project_path, modification.new_path)
-
-                        # Saving Parser
-                        current_filepath = os.path.join(saved_ymls_dir, f"{modification.filename}")
-
-                        before_filepath = os.path.join(src_before_dir, f"{short_hash}_{modification.filename}")
-                        with open(before_filepath, 'w', encoding='utf-8') as file:
-                            file.write(modification.source_code_before if modification.source_code_before else "")
-
-                        after_filepath = os.path.join(src_after_dir, f"{short_hash}_{modification.filename}")
-                        with open(after_filepath, 'w', encoding='utf-8') as file:
-                            file.write(modification.source_code if modification.source_code else "")
-
-                        # Filtering the copy current Parser
-                        if source_path and os.path.exists(source_path):
-                            destination_path = os.path.join(saved_ymls_dir, os.path.basename(modification.new_path))
-                            shutil.copy2(source_path, destination_path)
-                        else:
-                            logging.warning(f"File {source_path} not found.")
-
-                        # Getting issue number
-                        issue_tracker = Mining.extract_issue_numbers(commit.msg)
-
-                        # getting commit info
-                        commit_gh = self.github_api.fetch_specific_commit(owner, repo_name, commit.hash)
-
-                        # Getting issue info if available
-                        issues = None
-                        if issue_tracker:
-                            issues = [self.github_api.fetch_specific_issues(owner, repo_name, issue_number) for
-                                      issue_number in issue_tracker]
-
-                        # Smell analysis
-                        if modification.change_type.name != "DELETE":
-                            file_path = current_filepath
-                            if os.path.exists(file_path):
-                                action = self.parser.Action(file_path=file_path)
-                            else:
-                                with open(after_filepath, 'r', encoding='utf-8') as file:
-                                    file_content = file.read()
-                                action = self.parser.Action(content=file_content)
-
-                            if commit_gh:
-                                auth_acc_type = commit_gh[0]['Author Acc']
-                                comt_acc_type = commit_gh[0]['Committer Acc']
-                            else:
-                                auth_acc_type = None
-                                comt_acc_type = None
-
-                            if issues:
-                                if isinstance(issues[0], dict):
-                                    issue_creator = issues[0]['Creator']
-                                    issue_creator_association = issues[0]['Creator association']
-                                    issue_creator_type = issues[0]['Creator type']
-                                    issue_created_at = issues[0]['Created At']
-                                    issue_closed_at = issues[0]['Closed At']
-                                    issue_state = issues[0]['State']
-                                    issue_body = issues[0]['Body']
-                                    issue_closer = issues[0]['Closer']
-                                    issue_closer_type = issues[0]['Closer type']
-                                    issue_labels = issues[0]['Labels']
-                                    issue_reviewers = issues[0]['Reviewers/Assignees']
-                                    issue_reviewers_type = issues[0]['Reviewers/Assignees type']
-                                    is_pull_request = issues[0]['Is Pull Request']
-                                    issue_milestone = issues[0]['Milestone']
-                                else:
-                                    issue_creator = None
-                                    issue_creator_association = None
-                                    issue_creator_type = None
-                                    issue_created_at = None
-                                    issue_closed_at = None
-                                    issue_state = None
-                                    issue_body = None
-                                    issue_closer = None
-                                    issue_closer_type = None
-                                    issue_labels = None
-                                    issue_reviewers = None
-                                    issue_reviewers_type = None
-                                    is_pull_request = None
-                                    issue_milestone = None
-
-                            else:
-                                issue_creator = None
-                                issue_creator_association = None
-                                issue_creator_type = None
-                                issue_created_at = None
-                                issue_closed_at = None
-                                issue_state = None
-                                issue_body = None
-                                issue_closer = None
-                                issue_closer_type = None
-                                issue_labels = None
-                                issue_reviewers = None
-                                issue_reviewers_type = None
-                                is_pull_request = None
-                                issue_milestone = None
-
-                            workflow = action.prepare_for_analysis()
-
-                            if workflow:
-                                codereplica = bool(CodeReplicaFct(workflow).detect())
-                                errorhandling = bool(ErrorHandlingFct(workflow).detect())
-                                misconfiguration = bool(MisconfigurationFct(workflow).detect())
-                                longblock = bool(LongBlockFct(workflow).detect())
-                                adminbydefault = bool(AdminByDefaultFct(workflow).detect())
-                                hardcoded = bool(HardCodedFct(workflow).detect())
-                                triggers = bool(RemoteRunFct(workflow).detect())
-                                unsecureprotocol = bool(UnsecureProtocolFct(workflow).detect())
-
-                                # Retrying untrusted dependencies
-                                attempts = 0
-                                while attempts < 3:
-                                    try:
-                                        untrusteddependencies = bool(
-                                            UntrustedDependenciesFct(workflow, self.token).detect())
-                                        break
-                                    except Exception as e:
-                                        logging.error(f"Error processing untrusted dependencies detector. "
-                                                      f"Attempt {attempts + 1} of 3. Error: {e}")
-                                        attempts += 1
-                                        if attempts < 3:
-                                            logging.info(f"Retrying in {10 * attempts} seconds...")
-                                            time.sleep(10 * attempts)
-                                        else:
-                                            if e == 404:
-                                                logging.error(f"Failed to process the {modification.filename} "
-                                                              f"file for untrusted dependencies. "
-                                                              f"Dependency were not found, "
-                                                              f"check if the name of dependency is right.")
-                                                untrusteddependencies = True
-                                            else:
-                                                logging.error(f"Failed to process the {modification.filename} "
-                                                              f"file for untrusted dependencies after 3 attempts. "
-                                                              f"The dependency will be considered as untrusted."
-                                                              f"Moving to the next one.")
-                                                untrusteddependencies = True
-                            else:
-                                logging.error(f"Failed to prepare workflow for analysis from file: {file_path}")
-                                continue
-
-                        writer.writerow([
-                            commit.project_name,
-                            commit.author.name,
-                            auth_acc_type,
-                            commit.author.email,
-                            commit.committer.name,
-                            comt_acc_type,
-                            commit.committer.email,
-                            commit.hash,
-                            commit.parents[-1] if commit.parents else None,
-                            commit.committer_date,
-                            commit.msg,
-                            commit.files,
-                            issue_milestone,
-                            modification.filename,
-                            modification.change_type.name,
-                            modification.added_lines,
-                            modification.deleted_lines,
-                            modification.token_count,
-                            is_pull_request,
-                            ','.join(issue_tracker),
-                            issue_creator,
-                            issue_creator_type,
-                            issue_creator_association,
-                            issue_closer,
-                            issue_closer_type,
-                            issue_created_at,
-                            issue_closed_at,
-                            issue_state,
-                            issue_labels,
-                            issue_reviewers,
-                            issue_reviewers_type,
-                            issue_body,
-                            os.path.join(base_dir, current_filepath),
-                            os.path.join(base_dir, before_filepath),
-                            os.path.join(base_dir, after_filepath),
-                            self.handler.handle_none(commit.dmm_unit_size),
-                            self.handler.handle_none(commit.dmm_unit_complexity),
-                            self.handler.handle_none(commit.dmm_unit_interfacing),
-                            codereplica,
-                            errorhandling,
-                            misconfiguration,
-                            longblock,
-                            adminbydefault,
-                            hardcoded,
-                            triggers,
-                            unsecureprotocol,
-                            untrusteddependencies,
-                            modification.diff
-                        ])
-
-                        logging.info(f"Project: {commit.project_name}")
-                        logging.info(f"Author: {commit.author.name}")
-                        logging.info(f"Committer: {commit.committer.name}")
-                        logging.info(f"File: {modification.filename}")
-                        logging.info(f"Message: {commit.msg}")
-                        logging.info(f"Modification Type: {modification.change_type.name}")
-                        logging.info(f"Issues: {len(issue_tracker)}")
-                        logging.info(f"Issue Labels: {issue_labels}")
-                        logging.info(f"Created At: {issue_created_at}")
-                        logging.info(f"Closed At: {issue_closed_at}")
-                        logging.info(f"State: {issue_state}")
-                        logging.info(f"Release: {issue_milestone}")
-                        logging.info("-" * 40)
+            if not checkpoint:
+                writer.writerow(self.COMMIT_HEADERS)
+                logging.info("Creating Dataset...")
+            else:
+                logging.info(f"Resuming Dataset after commit {checkpoint['commit']}...")
+
+            def save_checkpoint(commit_hash, base, tip):
+                csvfile.flush()
+                checkpoints.save(repo_url, output_csv_path, workflow_only, commit_hash, csvfile.tell(), metrics,
+                                 base, tip)
+
+            for base, tip, done in traversals:
+                if base == tip:
+                    continue
+                tasks = self.prefetched(self.workflow_modifications(repo_path, blobs, workflow_only, base, metrics,
+                                                                    tip, done), owner, repo_name)
+                if pipeline:
+                    self.github_api.transport.resize(enrich_workers + analysis_workers)
+                    stages = [
+                        ("enrich", lambda task: self.enrich(task, owner, repo_name), enrich_workers),
+                        ("analyze", self.analyze, analysis_workers)
+                    ]
+                    window = 4 * (enrich_workers + analysis_workers)
+                    results = (task for position, task in Pipeline(stages, window).run(tasks))
+                else:
+                    results = (self.analyze(self.enrich(task, owner, repo_name)) for task in tasks)
+
+                current_commit = None
+                for task in results:
+                    if not task:
+                        continue
+                    # The rows arrive in order, so a new commit means the previous one is complete
+                    if current_commit and task["row"]["Commit"] != current_commit:
+                        save_checkpoint(current_commit, base, tip)
+                    current_commit = task["row"]["Commit"]
+                    self.write_row(writer, task)
+
+                # Every commit reachable from the tip is on the dataset now
+                save_checkpoint(tip, tip, tip)
 
             logging.info("Dataset Created.")
 
-    def batch(self, file, url):
+    def workflow_modifications(self, repo_url, blobs, workflow_only=True, after_commit=None,
+                               metrics=OPTIONAL_METRICS, tip=None, done_commit=None):
+        """
+        Traverses the repository and saves the workflow files of each modification.
+        It is the only step touching the git repository, so it always runs on a single thread.
+
+        Attributes:
+            repo_url: URL or local path of the repository to be mined.
+            blobs: BlobStore where the workflow snapshots are saved.
+            workflow_only: Traverse only the commits touching the workflow files.
+            after_commit: Traverse only the commits made or merged after this one.
+            metrics: The optional metrics to compute. They are PyDriller lazy properties, so the skipped ones
+                are never computed.
+            tip: The commit to traverse from. When None, the current HEAD.
+            done_commit: Skip the commits traversed up to this one (included).
+
+        Returns: Generator of tasks. A task is a dictionary with the CSV row, the referenced issues, and the
+            content and blob ID of the workflow to analyze.
+        """
+        # Blob ID and content of the current code (the version on HEAD) of each workflow file name
+        current_code = {}
+        # The files are read from the git objects of the clone, which only exists during the traversal
+        reader = None
+
+        repository = WorkflowRepository(repo_url, workflow_only=workflow_only, after_commit=after_commit, tip=tip,
+                                        histogram_diff=True)
+        try:
+            for commit in repository.traverse_commits():
+                if done_commit:
+                    if commit.hash == done_commit:
+                        done_commit = None
+                    continue
+                if reader is None:
+                    reader = BlobReader(commit.project_path)
+                yield from self.commit_tasks(commit, blobs, reader, current_code, metrics)
+        finally:
+            if reader is not None:
+                reader.close()
+
+    def commit_tasks(self, commit, blobs, reader, current_code, metrics):
+        """
+        Builds the tasks of the workflow files modified by a commit. See workflow_modifications.
+        """
+        # The DMM metrics describe the whole commit, so they are computed once for all its workflow files
+        dmm = None
+        for modification in commit.modified_files:
+
+            # Getting the right path, existing or not
+            filepath = (modification.new_path if modification.change_type != ModificationType.DELETE
+                        else modification.old_path)
+
+            # Verifying is the file is on the right path of the repo
+            if not is_workflow_file(filepath):
+                continue
+
+            # Saving the snapshots
+            after_code = modification.source_code if modification.source_code else ""
+            before_oid = blobs.put(modification.source_code_before if modification.source_code_before else "")
+            after_oid = blobs.put(after_code)
+
+            if modification.change_type.name != "DELETE":
+                oid, data = reader.read("HEAD", modification.new_path)
+                if oid:
+                    if oid not in blobs:
+                        blobs.put(data)
+                    current_code[modification.filename] = (oid, data.decode('utf-8', errors='replace'))
+                else:
+                    logging.warning(f"File {modification.new_path} not found on HEAD.")
+            current_oid, current_content = current_code.get(modification.filename, (None, None))
+
+            # The content is read now, so the later stages do not depend on the snapshots saved afterwards
+            content = None
+            if modification.change_type.name != "DELETE":
+                content = current_content if current_oid else after_code
+
+            # Getting issue number
+            issue_tracker = Mining.extract_issue_numbers(commit.msg)
+
+            row = dict.fromkeys(self.COMMIT_HEADERS)
+            row.update({
+                "Project": commit.project_name,
+                "Author": commit.author.name,
+                "Author Email": commit.author.email,
+                "Commiter": commit.committer.name,
+                "Commiter Email": commit.committer.email,
+                "Commit": commit.hash,
+                "Commit Parent": commit.parents[-1] if commit.parents else None,
+                "Commit Date": commit.committer_date,
+                "Commit Message": commit.msg,
+                "Number of Files Changed by Commit": commit.files,
+                "Files Names": modification.filename,
+                "Type Of Commit": modification.change_type.name,
+                "Added lines": modification.added_lines,
+                "Deleted lines": modification.deleted_lines,
+                "Token count": modification.token_count if "token_count" in metrics else None,
+                "Issue Tracker": ','.join(issue_tracker),
+                "Path Src Code Current": current_oid,
+                "Path Src Code Before": before_oid,
+                "Path Src Code After": after_oid,
+                "Diff": modification.diff if "diff" in metrics else None
+            })
+            if "dmm" in metrics:
+                if dmm is None:
+                    dmm = {
+                        "DMM_Unit": self.handler.handle_none(commit.dmm_unit_size),
+                        "DMM_Complexity": self.handler.handle_none(commit.dmm_unit_complexity),
+                        "DMM_Interfacing": self.handler.handle_none(commit.dmm_unit_interfacing)
+                    }
+                row.update(dmm)
+
+            yield {"row": row, "issues": issue_tracker, "content": content,
+                   "oid": current_oid if current_oid else after_oid}
+
+    def prefetched(self, tasks, owner, repo_name, size=GRAPHQL_BATCH_SIZE):
+        """
+        Buffers the tasks and resolves the commits and first issues of each buffer with batched GraphQL queries,
+        so the enrichment does not make one request per task.
+
+        Returns: Generator with the same tasks, in the same order.
+        """
+        def flush(batch):
+            self.enricher.prefetch(owner, repo_name,
+                                   [(task["row"]["Commit"], task["row"]["Author Email"], task["row"]["Commiter Email"])
+                                    for task in batch],
+                                   [task["issues"][0] for task in batch if task["issues"]])
+            return batch
+
+        batch = []
+        try:
+            for task in tasks:
+                batch.append(task)
+                if len(batch) == size:
+                    yield from flush(batch)
+                    batch = []
+            yield from flush(batch)
+        finally:
+            tasks.close()
+
+    def enrich(self, task, owner, repo_name):
+        """
+        Fills the account types of the commit and the info of its first issue from the GitHub API.
+        They are usually resolved in advance by prefetched, and the account types of the known emails need no
+        request.
+        """
+        row = task["row"]
+
+        # getting commit info
+        account_types = self.enricher.account_types(owner, repo_name, row["Commit"], row["Author Email"],
+                                                    row["Commiter Email"])
+        if account_types:
+            row["Author Acc Type"], row["Commiter Acc Type"] = account_types
+
+        # Getting issue info if available. Only the first referenced issue fills the row
+        issues = [self.enricher.issue(owner, repo_name, issue_number) for issue_number in task["issues"][:1]]
+        if issues and issues[0]:
+            issue = issues[0][0]
+            row.update({
+                "Release": issue['Milestone'],
+                "Pull Request": issue['Is Pull Request'],
+                "Issue Creator": issue['Creator'],
+                "Issue Creator Acc type": issue['Creator type'],
+                "Issue Creator Association": issue['Creator association'],
+                "Issue Closer": issue['Closer'],
+                "Issue Closer Acc Type": issue['Closer type'],
+                "Issue Created At": issue['Created At'],
+                "Issue Closed At": issue['Closed At'],
+                "Issue State": issue['State'],
+                "Issue Labels": issue['Labels'],
+                "Issue Reviewers": issue['Reviewers/Assignees'],
+                "Issue Reviewers Acc Type": issue['Reviewers/Assignees type'],
+                "Issue Body": issue['Body']
+            })
+        return task
+
+    def analyze(self, task):
+        """
+        Runs the smell detectors on the workflow of the task. The findings already saved on the memo for the
+        same content are reused, so a workflow seen before is not parsed or analyzed again.
+
+        Returns: The task with the smells on its row, or None if the workflow could not be parsed.
+        """
+        if task["content"] is None:
+            # Deleted workflows have nothing to analyze
+            return task
+
+        row = task["row"]
+        findings, untrusted = self.memo.get(task["oid"])
+
+        if findings is None or untrusted is None:
+            workflow = self.parser.Action(content=task["content"]).prepare_for_analysis()
+            if not workflow:
+                logging.error(f"Failed to prepare workflow for analysis from file: {row['Files Names']}")
+                return None
+
+            if findings is None:
+                # Local detectors share a single traversal of the workflow
+                detectors = Analyzer.initialize_detectors(workflow, self.token, offline=True)
+                results = Analyzer.detect_all(workflow, detectors)
+                findings = {name: results[name] if name in results else detector.detect()
+                            for name, detector in detectors.items()}
+                self.memo.put(task["oid"], findings=findings)
+
+            if untrusted is None:
+                untrusted, complete = self.untrusted_dependencies(workflow, row['Files Names'])
+                # Actions that could not be verified are asked again on the next time
+                if complete:
+                    self.memo.put(task["oid"], untrusted=untrusted)
+
+        row.update({
+            "CodeReplica": bool(findings['CodeReplica']),
+            "ErrorHandling": bool(findings['ErrorHandling']),
+            "Misconfiguration": bool(findings['Misconfiguration']),
+            "LongBlock": bool(findings['LongBlock']),
+            "AdminByDefault": bool(findings['AdminByDefault']),
+            "HardCoded": bool(findings['HardCoded']),
+            "RemoteTriggers": bool(findings['RemoteRun']),
+            "UnsecureProtocol": bool(findings['UnsecureProtocol']),
+            # A workflow that could not be verified is considered as untrusted
+            "UntrustedDependencies": bool(untrusted) if untrusted is not None else True
+        })
+        return task
+
+    def untrusted_dependencies(self, workflow, filename):
+        """
+        Runs the untrusted dependencies detector, retrying it when the GitHub API fails.
+
+        Returns: A tuple with the findings of the detector (None if the GitHub API kept failing) and whether
+            every action was verified.
+        """
+        attempts = 0
+        while attempts < 3:
+            try:
+                detector = UntrustedDependenciesFct(workflow, self.token)
+                return detector.detect(), detector.strategy.complete
+            except Exception as e:
+                logging.error(f"Error processing untrusted dependencies detector. "
+                              f"Attempt {attempts + 1} of 3. Error: {e}")
+                attempts += 1
+                if attempts < 3:
+                    logging.info(f"Retrying in {10 * attempts} seconds...")
+                    time.sleep(10 * attempts)
+                else:
+                    logging.error(f"Failed to process the {filename} file for untrusted dependencies after "
+                                  f"3 attempts. The dependency will be considered as untrusted."
+                                  f"Moving to the next one.")
+        return None, False
+
+    def write_row(self, writer, task):
+        """
+        Writes the row of a task on the CSV file.
+        """
+        row = task["row"]
+        writer.writerow([row[header] for header in self.COMMIT_HEADERS])
+
+        logging.info(f"Project: {row['Project']}")
+        logging.info(f"Author: {row['Author']}")
+        logging.info(f"Committer: {row['Commiter']}")
+        logging.info(f"File: {row['Files Names']}")
+        logging.info(f"Message: {row['Commit Message']}")
+        logging.info(f"Modification Type: {row['Type Of Commit']}")
+        logging.info(f"Issues: {len(task['issues'])}")
+        logging.info(f"Issue Labels: {row['Issue Labels']}")
+        logging.info(f"Created At: {row['Issue Created At']}")
+        logging.info(f"Closed At: {row['Issue Closed At']}")
+        logging.info(f"State: {row['Issue State']}")
+        logging.info(f"Release: {row['Release']}")
+        logging.info("-" * 40)
+
+    def batch(self, file, url, workflow_only=True, jobs=1, **options):
         """
         Responsible for mining commits from a batch of repositories.
 
         Attributes:
             file: CSV file with the repositories URLs.
             url: Column number with the repositories URLs.
+            workflow_only: Mine only the commits touching the workflow files.
+            jobs: Number of repositories mined at once, each one on its own process. The processes share the
+                GitHub rate budget and the on-disk caches.
+            options: Pipeline and resume options passed to commits.
 
         Returns: CSV file with the commit info.
         """
         csv_file = self.handler(file)
-        for repo_url in self.handler.reading_repos(csv_file, url):
-            attempts = 0
-            while attempts < 3:
-                try:
-                    self.commits(repo_url)
-                    break
-                except Exception as e:
-                    logging.error(f"Error processing repository {repo_url}. Attempt {attempts + 1} of 3. Error: {e}")
-                    attempts += 1
-                    if attempts < 3:
-                        logging.info(f"Retrying in {3 * attempts} seconds...")
-                        time.sleep(3 * attempts)
-                    else:
-                        logging.error(f"Failed to process repository {repo_url} "
-                                      f"after 3 attempts. Moving to the next one.")
+        repo_urls = list(self.handler.reading_repos(csv_file, url))
+
+        if jobs > 1 and len(repo_urls) > 1:
+            # Repositories with the same name write the same files, so they are mined by the same worker
+            groups = {}
+            for repo_url in repo_urls:
+                groups.setdefault(urlparse(repo_url).path.split('/')[2].lower(), []).append(repo_url)
+
+            with ProcessPoolExecutor(max_workers=min(jobs, len(groups)), initializer=Transport.share_budget) \
+                    as executor:
+                futures = [executor.submit(mine_repositories, self.token, group, workflow_only, options)
+                           for group in groups.values()]
+                for future in as_completed(futures):
+                    for repo_url, mined in future.result():
+                        logging.info(f"Finished repository {repo_url}." if mined else
+                                     f"Skipped repository {repo_url}.")
+            return
+
+        for repo_url in repo_urls:
+            self.mine_with_retries(repo_url, workflow_only, **options)
             time.sleep(10)
+
+    def mine_with_retries(self, repo_url, workflow_only=True, **options):
+        """
+        Mines the commits of a repository, trying it up to three times.
+
+        Returns: True if the repository was mined.
+        """
+        attempts = 0
+        while attempts < 3:
+            try:
+                self.commits(repo_url, workflow_only, **options)
+                return True
+            except Exception as e:
+                logging.error(f"Error processing repository {repo_url}. Attempt {attempts + 1} of 3. Error: {e}")
+                attempts += 1
+                if attempts < 3:
+                    logging.info(f"Retrying in {3 * attempts} seconds...")
+                    time.sleep(3 * attempts)
+                else:
+                    logging.error(f"Failed to process repository {repo_url} "
+                                  f"after 3 attempts. Moving to the next one.")
+        return False
+
+    def remote(self, repo_urls, output_csv="remote_workflows.csv", fetch_workers=4, analysis_workers=2):
+        """
+        Analyzes the workflows on the default branch of many repositories without cloning them. The workflow
+        files are fetched with their content through GraphQL, REMOTE_BATCH_SIZE repositories per query, and the
+        queries and the analyses run on concurrent stages.
+
+        Attributes:
+            repo_urls: URLs of the repositories.
+            output_csv: Name of the CSV file written on the DataSets directory.
+            fetch_workers: Number of threads fetching the workflows.
+            analysis_workers: Number of threads analyzing the workflows.
+
+        Returns: CSV file with the smells of each workflow. The Blob column references the saved snapshots.
+        """
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+        base_dir = self.handler.get_base_directory()
+        dataset_dir = os.path.join(base_dir, "DataSets")
+        os.makedirs(dataset_dir, exist_ok=True)
+        blobs = BlobStore.at(base_dir)
+        self.memo = SmellMemo()
+
+        repositories = [tuple(urlparse(repo_url).path.split('/')[1:3]) for repo_url in repo_urls]
+        batches = [repositories[start:start + self.REMOTE_BATCH_SIZE]
+                   for start in range(0, len(repositories), self.REMOTE_BATCH_SIZE)]
+
+        def fetch(batch):
+            try:
+                workflows = self.github_api.fetch_workflows(batch)
+            except requests.RequestException as e:
+                logging.error(f"Error when fetching the workflows of {len(batch)} repositories. Error: {e}")
+                return []
+
+            tasks = []
+            for owner, name in batch:
+                for workflow in workflows.get((owner, name), []):
+                    row = dict.fromkeys(self.REMOTE_HEADERS)
+                    row.update({
+                        "Owner": owner,
+                        "Repo": name,
+                        "Files Names": os.path.basename(workflow["Path"]),
+                        "Path": workflow["Path"],
+                        "Blob": blobs.put(workflow["Content"])
+                    })
+                    tasks.append({"row": row, "content": workflow["Content"], "oid": row["Blob"]})
+            return tasks
+
+        def analyze(tasks):
+            return [task for task in map(self.analyze, tasks) if task]
+
+        self.github_api.transport.resize(fetch_workers + analysis_workers)
+        stages = [("fetch", fetch, fetch_workers), ("analyze", analyze, analysis_workers)]
+        with open(os.path.join(dataset_dir, output_csv), mode='w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile, delimiter=';')
+            writer.writerow(self.REMOTE_HEADERS)
+            for position, tasks in Pipeline(stages, window=2 * (fetch_workers + analysis_workers)).run(batches):
+                for task in tasks:
+                    writer.writerow([task["row"][column] for column in self.REMOTE_HEADERS])
+                logging.info(f"Analyzed the workflows of {len(batches[position])} repositories.")
+
+        logging.info("Dataset Created.")
+
+
+def mine_repositories(token, repo_urls, workflow_only, options):
+    """
+    Mines a list of repositories on a batch worker process.
+    It is a module level function, so it can be sent to the worker processes.
+
+    Returns: List of (repository URL, mined) tuples.
+    """
+    worker = Mining(token)
+    return [(repo_url, worker.mine_with_retries(repo_url, workflow_only, **options)) for repo_url in repo_urls]
@@ -0,0 +1,208 @@
+import logging
+import os
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+
+from Utils.Storage import SQLiteStore
+from Utils.Utilities import Config
+
+DEFAULT_MAX_SIZE = 50 * 1024
+# Only the branches and the tags are mirrored. GitHub also advertises a refs/pull/* ref for every pull request,
+# which the traversal never reads.
+FETCH_REFSPECS = ('+refs/heads/*:refs/heads/*', '+refs/tags/*:refs/tags/*')
+
+
+def is_remote(repo_url):
+    """
+    Checks if a repository URL points to a remote repository, with the same rule used by PyDriller.
+    """
+    return repo_url.startswith(("git@", "https://", "http://", "git://", "ssh://"))
+
+
+class MirrorCache(SQLiteStore):
+    """
+    Cache of bare clones of the branches and tags of the mined repositories. A repository is cloned the first time
+    it is mined, and only the new objects are fetched on the next times.
+
+    The mirrors are kept on the Mirrors directory of the base directory, as <owner>/<repository>. When their total
+    size goes over the limit, the least recently used ones are removed, except the ones being mined. The processes
+    mining a mirror are kept on the users table, one row per use, so a mirror is kept until every one of them
+    released it. The limit can be set on the [mirrors] section of config.ini with the max_size key, in megabytes.
+
+    Attributes:
+        directory (str): The directory of the mirrors.
+        max_size (int): Maximum size of the mirrors, in bytes.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS mirrors (
+            path TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS users (
+            path TEXT NOT NULL,
+            pid INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS users_path ON users (path);
+    """
+
+    def __init__(self, directory, max_size=None):
+        if max_size is None:
+            max_size = int(float(Config.read_setting('mirrors', 'max_size', DEFAULT_MAX_SIZE)) * 1024 * 1024)
+        self.directory = directory
+        self.max_size = max_size
+        super().__init__(os.path.join(directory, 'mirrors.db'))
+
+    @classmethod
+    def at(cls, base_dir):
+        """
+        Returns the cache of a base directory of generated files.
+        """
+        return cls(os.path.join(base_dir, "Mirrors"))
+
+    def mirror_path(self, repo_url):
+        """
+        Returns the path of the mirror of a repository. The last directory keeps the name of the repository, so
+        PyDriller gives the commits the same project name.
+        """
+        owner, name = repo_url.rstrip('/').replace(':', '/').split('/')[-2:]
+        if name.endswith('.git'):
+            name = name[:-len('.git')]
+        return os.path.join(self.directory, owner, name)
+
+    @contextmanager
+    def mirror(self, repo_url):
+        """
+        Clones or updates the mirror of a repository and returns its path. The mirror is not removed while the
+        block runs.
+
+            :param repo_url: URL of the repository.
+        """
+        path = self.acquire(repo_url)
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def acquire(self, repo_url):
+        """
+        Clones or updates the mirror of a repository, and marks it as used by the current process.
+
+            :param repo_url: URL of the repository.
+            :return: The path of the mirror.
+        """
+        path = self.mirror_path(repo_url)
+        with self.transaction() as connection:
+            connection.execute("INSERT INTO mirrors (path, url, size, last_used) VALUES (?, ?, 0, ?) "
+                               "ON CONFLICT (path) DO UPDATE SET url = excluded.url, last_used = excluded.last_used",
+                               (path, repo_url, time.time()))
+            connection.execute("INSERT INTO users VALUES (?, ?)", (path, os.getpid()))
+        try:
+            if os.path.isdir(path):
+                logging.info(f"Fetching the new commits of {repo_url}...")
+                self.git("-C", path, "remote", "set-url", "origin", repo_url)
+                self.configure(path)
+                self.git("-C", path, "fetch", "--prune", "--quiet", "origin")
+            else:
+                logging.info(f"Cloning {repo_url}...")
+                # The clone is moved to its place once complete, so a broken mirror is never used
+                partial = f"{path}.partial"
+                shutil.rmtree(partial, ignore_errors=True)
+                self.git("clone", "--bare", "--quiet", repo_url, partial)
+                self.configure(partial)
+                os.replace(partial, path)
+        except Exception:
+            self.release(path)
+            raise
+
+        self.execute("UPDATE mirrors SET size = ? WHERE path = ?", (self.disk_usage(path), path))
+        self.evict()
+        return path
+
+    def configure(self, path):
+        """
+        Limits the fetches of a mirror to the branches and the tags. The other refs of the mirrors cloned with
+        --mirror, like the pull request refs, are removed.
+        """
+        self.git("-C", path, "config", "--replace-all", "remote.origin.fetch", FETCH_REFSPECS[0])
+        for refspec in FETCH_REFSPECS[1:]:
+            self.git("-C", path, "config", "--add", "remote.origin.fetch", refspec)
+        self.git("-C", path, "config", "--unset-all", "remote.origin.mirror", check=False)
+
+        refs = self.git("-C", path, "for-each-ref", "--format=%(refname)").split()
+        other = [ref for ref in refs if not ref.startswith(('refs/heads/', 'refs/tags/'))]
+        if other:
+            self.git("-C", path, "update-ref", "--stdin", input="".join(f"delete {ref}\n" for ref in other))
+
+    def release(self, path):
+        """
+        Marks a mirror as not used anymore by one use of the current process.
+        """
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM users WHERE rowid = (SELECT rowid FROM users WHERE path = ? AND pid = ? "
+                               "LIMIT 1)", (path, os.getpid()))
+            connection.execute("UPDATE mirrors SET last_used = ? WHERE path = ?", (time.time(), path))
+
+    def evict(self):
+        """
+        Removes the least recently used mirrors until the total size is under the limit. The mirrors used by a
+        running process are kept.
+        """
+        rows = self.query("SELECT path, size, last_used FROM mirrors ORDER BY last_used")
+        total = sum(row[1] for row in rows)
+        for path, size, last_used in rows:
+            if total <= self.max_size:
+                break
+
+            # The mirror is moved away while no other process can acquire it, and only if nobody did meanwhile
+            removed = f"{path}.removed"
+            with self.transaction() as connection:
+                pids = {pid for pid, in connection.execute("SELECT pid FROM users WHERE path = ?", (path,))}
+                if any(self.is_running(pid) for pid in pids):
+                    continue
+                # The uses of the processes that ended without releasing the mirror are forgotten
+                connection.execute("DELETE FROM users WHERE path = ?", (path,))
+                if not connection.execute("DELETE FROM mirrors WHERE path = ? AND last_used = ?",
+                                          (path, last_used)).rowcount:
+                    continue
+                if os.path.isdir(path):
+                    os.replace(path, removed)
+            logging.info(f"Removed the mirror {path}.")
+            shutil.rmtree(removed, ignore_errors=True)
+            total -= size
+
+    @staticmethod
+    def is_running(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @staticmethod
+    def disk_usage(path):
+        """
+        Returns the size of the files of a directory, in bytes.
+        """
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, directories, files in os.walk(path) for name in files)
+
+    @staticmethod
+    def git(*args, input=None, check=True):
+        """
+        Runs a git command and returns its output. It raises a RuntimeError if the command fails, unless check
+        is False.
+        """
+        # Private or missing repositories fail instead of asking for credentials
+        result = subprocess.run(["git", *args], capture_output=True, input=input.encode() if input else None,
+                                env={**os.environ, "GIT_TERMINAL_PROMPT": "0"})
+        if check and result.returncode != 0:
+            raise RuntimeError(f"git {args[0] if args[0] != '-C' else args[2]} failed: "
+                               f"{result.stderr.decode('utf-8', errors='replace').strip()}")
+        return result.stdout.decode('utf-8', errors='replace')
@@ -0,0 +1,125 @@
+import queue
+import threading
+
+_STOP = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class Pipeline:
+    """
+    Runs items through a sequence of stages connected by bounded queues, each stage with its own worker threads.
+
+    The results are yielded in the same order the items were produced, no matter which worker finished first.
+    The number of items between the producer and the consumer (on the queues, on the workers, or waiting for
+    an earlier item to be yielded) never exceeds the window, so a slow stage or consumer stops the producer
+    instead of growing the memory. An error raised by a stage is raised again by run() at the position of its item.
+
+    Attributes:
+        stages (list): List of (name, function, workers). Each function receives the result of the previous stage.
+            A stage that returns None drops the item, and the following stages are skipped for it.
+        window (int): Maximum number of items in flight.
+    """
+
+    def __init__(self, stages, window=64):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.stages = [(name, function, max(1, workers)) for name, function, workers in stages]
+        self.window = max(window, 1)
+
+    def run(self, items):
+        """
+        Runs the items through the stages.
+
+        :param items: Iterable with the items. It is consumed by a single thread, in order.
+        :return: Generator of (item index, result) in the order of the items. Dropped items are not yielded.
+        """
+        slots = threading.Semaphore(self.window)
+        cancelled = threading.Event()
+        queues = [queue.Queue(maxsize=workers * 2) for name, function, workers in self.stages]
+        output = queue.Queue()
+        threads = [threading.Thread(target=self._produce, args=(items, slots, cancelled, queues[0]),
+                                    name="pipeline-source", daemon=True)]
+
+        for index, (name, function, workers) in enumerate(self.stages):
+            target = queues[index + 1] if index + 1 < len(queues) else output
+            next_workers = self.stages[index + 1][2] if index + 1 < len(self.stages) else 1
+            remaining = [workers]
+            lock = threading.Lock()
+            for number in range(workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(function, queues[index], target, next_workers, remaining, lock, cancelled),
+                    name=f"pipeline-{name}-{number}", daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            pending = {}
+            expected = 0
+            finished = False
+            while True:
+                if expected in pending:
+                    result = pending.pop(expected)
+                    expected += 1
+                    slots.release()
+                    if isinstance(result, _Failure):
+                        raise result.error
+                    if result is not None:
+                        yield expected - 1, result
+                elif finished:
+                    return
+                else:
+                    entry = output.get()
+                    if entry is _STOP:
+                        finished = True
+                    else:
+                        position, result = entry
+                        pending[position] = result
+        finally:
+            cancelled.set()
+            for _ in range(self.window):
+                slots.release()
+
+    def _produce(self, items, slots, cancelled, target):
+        position = 0
+        try:
+            for item in items:
+                slots.acquire()
+                if cancelled.is_set():
+                    break
+                target.put((position, item))
+                position += 1
+        except Exception as e:
+            slots.acquire()
+            target.put((position, _Failure(e)))
+        finally:
+            if hasattr(items, 'close'):
+                items.close()
+            for _ in range(self.stages[0][2]):
+                target.put(_STOP)
+
+    @staticmethod
+    def _work(function, source, target, next_workers, remaining, lock, cancelled):
+        while True:
+            entry = source.get()
+            if entry is _STOP:
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    for _ in range(next_workers):
+                        target.put(_STOP)
+                return
+
+            position, item = entry
+            if not cancelled.is_set() and item is not None and not isinstance(item, _Failure):
+                try:
+                    item = function(item)
+                except Exception as e:
+                    item = _Failure(e)
+            target.put((position, item))
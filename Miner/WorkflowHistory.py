@@ -0,0 +1,150 @@
+from functools import cached_property
+
+from git import GitCommandError, Repo
+from pydriller import Repository
+from pydriller.domain.commit import Commit, NULL_TREE
+
+WORKFLOW_DIRECTORY = '.github/workflows/'
+WORKFLOW_EXTENSIONS = ('.yaml', '.yml')
+WORKFLOW_PATHSPECS = [f'{WORKFLOW_DIRECTORY}*{extension}' for extension in WORKFLOW_EXTENSIONS]
+
+
+def is_workflow_file(filepath):
+    """
+    Checks if a path of the repository is a GitHub Actions workflow file.
+    """
+    return bool(filepath) and filepath.startswith(WORKFLOW_DIRECTORY) and filepath.endswith(WORKFLOW_EXTENSIONS)
+
+
+def resolve_commit(path_to_repo, revision='HEAD'):
+    """
+    Returns the hash of the commit a revision of a local repository points to.
+    """
+    repo = Repo(path_to_repo)
+    try:
+        return repo.commit(revision).hexsha
+    finally:
+        repo.close()
+
+
+class MemoizedCommit(Commit):
+    """
+    PyDriller commit that diffs its files once. PyDriller diffs the commit again every time modified_files is read,
+    and each DMM metric reads it and runs lizard on every modified file.
+    """
+
+    modified_files = cached_property(Commit.modified_files.fget)
+
+
+class WorkflowCommit(Commit):
+    """
+    PyDriller commit that only materializes the diffs of the workflow files.
+    The commit level metrics (files, DMM) still describe the whole commit, as on a regular PyDriller commit.
+    """
+
+    @property
+    def modified_files(self):
+        options = {}
+        if self._conf.get("histogram"):
+            options["histogram"] = True
+        if self._conf.get("skip_whitespaces"):
+            options["w"] = True
+
+        if len(self.parents) == 1:
+            diff_index = self._c_object.parents[0].diff(other=self._c_object, paths=WORKFLOW_PATHSPECS,
+                                                        create_patch=True, **options)
+        elif len(self.parents) > 1:
+            # Merge commits have no modified files on PyDriller
+            diff_index = []
+        else:
+            diff_index = self._c_object.diff(NULL_TREE, paths=WORKFLOW_PATHSPECS, create_patch=True, **options)
+
+        return self._parse_diff(diff_index)
+
+    @cached_property
+    def whole_commit(self):
+        """
+        The regular PyDriller commit, used for the metrics that need every modified file.
+        """
+        return MemoizedCommit(self._c_object, self._conf)
+
+    @property
+    def dmm_unit_size(self):
+        return self.whole_commit.dmm_unit_size
+
+    @property
+    def dmm_unit_complexity(self):
+        return self.whole_commit.dmm_unit_complexity
+
+    @property
+    def dmm_unit_interfacing(self):
+        return self.whole_commit.dmm_unit_interfacing
+
+
+class HistoryRewritten(Exception):
+    """
+    Raised when the commit a traversal should resume from is no longer on the history of the repository.
+    """
+
+
+class WorkflowRepository(Repository):
+    """
+    PyDriller repository that only traverses the commits touching the workflow files.
+
+    The commits are selected by git itself (rev-list with the workflow pathspecs and --full-history, so the
+    commits of merged branches are kept), and only the workflow files of each commit are diffed. The mining time
+    then follows the churn of the workflows instead of the size of the history.
+
+    Attributes:
+        workflow_only (bool): When False every commit is traversed, as on a regular PyDriller repository.
+        after_commit (str): Only the commits that are not reachable from this commit are traversed, i.e. the
+            commits made or merged after it. HistoryRewritten is raised if it is not an ancestor of the traversed
+            revision anymore.
+        tip (str): The commit the traversal starts from. When None, the revision of the configuration (HEAD by
+            default) is resolved when the traversal starts and kept here. HistoryRewritten is raised if a given
+            tip does not exist anymore.
+    """
+
+    def __init__(self, path_to_repo, workflow_only=True, after_commit=None, tip=None, **kwargs):
+        super().__init__(path_to_repo, **kwargs)
+        self.workflow_only = workflow_only
+        self.after_commit = after_commit
+        self.tip = tip
+
+    def traverse_commits(self):
+        for path_repo in self._conf.get('path_to_repos'):
+            with self._prep_repo(path_repo=path_repo) as git:
+                rev, kwargs = self._conf.build_args()
+                kwargs.setdefault('reverse', True)
+                paths = ''
+                if self.workflow_only:
+                    kwargs['full_history'] = True
+                    paths = WORKFLOW_PATHSPECS
+
+                # The traversal is pinned to a commit, so the commits made meanwhile are left for the next one
+                revisions = rev if isinstance(rev, list) else [rev]
+                if self.tip is None:
+                    self.tip = git.repo.commit(revisions[-1]).hexsha
+                elif not self._is_ancestor(git, self.tip, self.tip):
+                    raise HistoryRewritten(f"Commit {self.tip} does not exist anymore.")
+                revisions = [*revisions[:-1], self.tip]
+
+                if self.after_commit:
+                    if not self._is_ancestor(git, self.after_commit, self.tip):
+                        raise HistoryRewritten(f"Commit {self.after_commit} is not on the history of "
+                                               f"{self.tip} anymore.")
+                    revisions.append(f'^{self.after_commit}')
+                rev = revisions
+
+                commit_class = WorkflowCommit if self.workflow_only else MemoizedCommit
+                for git_commit in git.repo.iter_commits(rev=rev, paths=paths, **kwargs):
+                    commit = commit_class(git_commit, self._conf)
+                    if not self._conf.is_commit_filtered(commit):
+                        yield commit
+
+    @staticmethod
+    def _is_ancestor(git, ancestor, revision):
+        try:
+            return git.repo.is_ancestor(ancestor, revision)
+        except GitCommandError:
+            return False
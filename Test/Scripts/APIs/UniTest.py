@@ -0,0 +1,278 @@
+import json
+import os
+import pytest
+from requests import Response
+from requests.adapters import BaseAdapter
+from APIs.Cache import AccountIndex, EntityCache
+from APIs.Enrichment import Enricher
+from APIs.GitHub import GitHubAPI
+from APIs.Transport import RateLimiter, SharedRateLimiter, Transport, resource_of
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeAdapter(BaseAdapter):
+    """Answers the requests with the queued (status, headers, body) tuples."""
+
+    def __init__(self, answers):
+        super().__init__()
+        self.answers = list(answers)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request.url)
+        status, headers, body = self.answers.pop(0)
+        response = Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = body.encode()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def quota(remaining, reset=2000, limit=5000, resource='core'):
+    return {'X-RateLimit-Limit': str(limit), 'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(reset), 'X-RateLimit-Resource': resource}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_transport(clock, answers):
+    transport = Transport(limiter=RateLimiter(clock=clock.time, sleep=clock.sleep))
+    adapter = FakeAdapter(answers)
+    transport.session.mount('https://', adapter)
+    return transport, adapter
+
+
+def test_resource_of():
+    assert resource_of("https://api.github.com/repos/a/b") == 'core'
+    assert resource_of("https://api.github.com/search/repositories?q=x") == 'search'
+    assert resource_of("https://api.github.com/graphql") == 'graphql'
+    assert resource_of("https://api.github.com/rate_limit") is None
+    assert resource_of("https://github.com/marketplace/actions/x") is None
+
+
+def test_waits_for_the_window_reset(clock):
+    transport, adapter = make_transport(clock, [(200, quota(1), "{}"), (200, quota(0), "{}"),
+                                                (200, quota(4999, reset=5600), "{}")])
+    for _ in range(3):
+        transport.get("https://api.github.com/repos/a/b", headers={'Authorization': 'token x'})
+
+    assert len(adapter.requests) == 3
+    assert clock.sleeps == [1000.0]
+
+
+def test_retry_after(clock):
+    transport, adapter = make_transport(clock, [(429, {'Retry-After': '30'}, "{}"), (200, quota(10), "{}")])
+    response = transport.get("https://api.github.com/repos/a/b")
+
+    assert response.status_code == 200
+    assert clock.sleeps == [30.0]
+
+
+def test_secondary_rate_limit_backoff(clock):
+    body = '{"message": "You have exceeded a secondary rate limit."}'
+    transport, adapter = make_transport(clock, [(403, {}, body), (403, {}, body), (200, quota(10), "{}")])
+    response = transport.get("https://api.github.com/repos/a/b")
+
+    assert response.status_code == 200
+    assert clock.sleeps == [60, 120]
+
+
+def test_errors_are_returned(clock):
+    transport, adapter = make_transport(clock, [(404, quota(10), '{"message": "Not Found"}')])
+    assert transport.get("https://api.github.com/repos/a/b").status_code == 404
+    assert clock.sleeps == []
+
+
+def test_seed(clock):
+    transport, adapter = make_transport(clock, [(200, {}, "{}")])
+    transport.seed({'Authorization': 'token x'}, {'search': {'limit': 30, 'remaining': 0, 'reset': 1010}})
+    transport.get("https://api.github.com/search/repositories?q=x", headers={'Authorization': 'token x'})
+
+    assert clock.sleeps == [10.0]
+
+
+def test_shared_budget(clock, tmp_path):
+    first = SharedRateLimiter(str(tmp_path / "ratelimit.db"), clock=clock.time, sleep=clock.sleep)
+    second = SharedRateLimiter(str(tmp_path / "ratelimit.db"), clock=clock.time, sleep=clock.sleep)
+    key = ('token x', 'core')
+
+    first.update(key, 5000, 2, 2000)
+    first.acquire(key)
+    second.acquire(key)
+    assert clock.sleeps == []
+
+    # Both limiters spent the same bucket, so the third request waits for the reset
+    second.acquire(key)
+    assert clock.sleeps == [1000.0]
+    assert "token x" not in open(tmp_path / "ratelimit.db", "rb").read().decode(errors="ignore")
+
+
+def test_forked_process_gets_its_own_pool(monkeypatch, tmp_path):
+    monkeypatch.setattr(Transport, "_shared", None)
+    parent = Transport.shared()
+    parent.resize(16)
+    assert Transport.shared() is parent
+
+    # The worker processes of the miner call share_budget after the fork
+    pid = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: pid + 1)
+    child = Transport.share_budget(str(tmp_path / "ratelimit.db"))
+    assert child is not parent and child.session is not parent.session
+    assert child.pool_size == 16 and isinstance(child.limiter, SharedRateLimiter)
+    assert not isinstance(parent.limiter, SharedRateLimiter)
+    assert Transport.shared() is child
+
+
+def graphql_answer(repository):
+    return 200, quota(4999, resource='graphql'), json.dumps({"data": {"repository": repository}})
+
+
+def test_fetch_commits_and_issues(clock):
+    transport, adapter = make_transport(clock, [
+        graphql_answer({
+            "c0": {"tree": {"oid": "t0"}, "author": {"name": "dev", "user": {"login": "dev"}},
+                   "committer": {"name": "dependabot[bot]", "user": None}},
+            "c1": None}),
+        graphql_answer({
+            "i0": {"__typename": "PullRequest", "author": {"login": "renovate", "__typename": "Bot"},
+                   "authorAssociation": "NONE", "createdAt": "2024-01-01T00:00:00Z",
+                   "closedAt": "2024-01-02T00:00:00Z", "state": "MERGED", "body": "",
+                   "labels": {"nodes": [{"name": "deps"}, {"name": "ci"}]},
+                   "assignees": {"nodes": [{"login": "dev", "__typename": "User"}]}, "milestone": None,
+                   "timelineItems": {"nodes": [{"actor": {"login": "dev", "__typename": "User"}}]}}})
+    ])
+    api = GitHubAPI("token", transport=transport)
+
+    assert api.fetch_commits("owner", "repo", ["a" * 40, "b" * 40]) == \
+        {"a" * 40: {"Author Acc": "User", "Committer Acc": "Bot", "Tree": "t0"}}
+    assert api.fetch_issues("owner", "repo", ["7"]) == {7: {
+        "Creator": "renovate[bot]", "Creator association": "NONE", "Creator type": "Bot",
+        "Created At": "2024-01-01T00:00:00Z", "Closed At": "2024-01-02T00:00:00Z", "State": "closed",
+        "Body": None, "Closer": "dev", "Closer type": "User", "Labels": "deps, ci", "Reviewers/Assignees": "dev",
+        "Reviewers/Assignees type": "User", "Is Pull Request": True, "Milestone": None}}
+    assert adapter.requests == ["https://api.github.com/graphql"] * 2
+
+
+def issue(number):
+    return {"Creator": f"user {number}", "Creator type": "User", "Closer": None, "Closer type": None,
+            "Reviewers/Assignees": "", "Reviewers/Assignees type": ""}
+
+
+def test_enricher_fetches_each_entity_once(tmp_path):
+    class FakeAPI:
+        def __init__(self):
+            self.calls = []
+
+        def fetch_commits(self, owner, repo, shas):
+            self.calls.append(("commits", list(shas)))
+            return {sha: {"Author Acc": "User"} for sha in shas if sha != "missing"}
+
+        def fetch_issues(self, owner, repo, numbers):
+            self.calls.append(("issues", list(numbers)))
+            return {int(number): issue(number) for number in numbers}
+
+    api = FakeAPI()
+    cache = EntityCache(str(tmp_path / "entities.db"))
+    enricher = Enricher(api, cache, AccountIndex(str(tmp_path / "accounts.db")))
+    enricher.prefetch("owner", "repo", [(sha, None, None) for sha in ["a", "b", "a", "missing"]], ["1", "2"])
+    assert enricher.commit("owner", "repo", "a") == [{"Author Acc": "User"}]
+    assert enricher.commit("owner", "repo", "missing") == []
+    assert enricher.issue("owner", "repo", "2") == [issue(2)]
+    assert api.calls == [("commits", ["a", "b", "missing"]), ("issues", ["1", "2"])]
+
+    # A new process reads the fetched entries from the cache
+    other = Enricher(api, cache, AccountIndex(str(tmp_path / "accounts.db")))
+    assert other.issue("Owner", "Repo", 1) == [issue(1)]
+    assert other.accounts.query("SELECT COUNT(*) FROM accounts") == [(0,)]
+    assert len(api.calls) == 2
+    assert Enricher(api, EntityCache(str(tmp_path / "entities.db"), issue_ttl=-1),
+                    AccountIndex(str(tmp_path / "accounts.db"))).issue("owner", "repo", 1)
+    assert api.calls[-1] == ("issues", ["1"])
+
+
+def test_known_accounts_need_no_request(tmp_path):
+    class FakeAPI:
+        def __init__(self):
+            self.shas = []
+
+        def fetch_commits(self, owner, repo, shas):
+            self.shas.extend(shas)
+            return {sha: {"Author Acc": "User", "Committer Acc": "Bot"} for sha in shas}
+
+        def fetch_issues(self, owner, repo, numbers):
+            return {}
+
+    api = FakeAPI()
+    accounts = AccountIndex(str(tmp_path / "accounts.db"))
+    enricher = Enricher(api, EntityCache(str(tmp_path / "entities.db")), accounts)
+    assert enricher.account_types("owner", "repo", "a", "dev@example.com", "bot@example.com") == ("User", "Bot")
+
+    enricher.prefetch("owner", "repo", [("b", "Dev@example.com", "bot@example.com"), ("c", "new@example.com", "")])
+    assert enricher.account_types("owner", "repo", "b", "dev@example.com", "bot@example.com") == ("User", "Bot")
+    assert api.shas == ["a", "c"]
+    assert AccountIndex(str(tmp_path / "accounts.db"), ttl=-1).get("email", "dev@example.com") == (False, None)
+
+
+def test_fetch_workflows(clock):
+    def entry(name, text, truncated=False, kind="blob"):
+        return {"name": name, "path": f".github/workflows/{name}", "type": kind,
+                "object": {"oid": f"oid-{name}", "text": text, "isBinary": False, "isTruncated": truncated}}
+
+    transport, adapter = make_transport(clock, [
+        (200, quota(4999, resource='graphql'), json.dumps({"data": {
+            "r0": {"object": {"entries": [entry("ci.yml", "on: push\n"), entry("big.yaml", "on:", truncated=True),
+                                          entry("README.md", "docs"), entry("nested", None, kind="tree")]}},
+            "r1": {"object": None},
+            "r2": None}})),
+        (200, quota(4998), "on: pull_request\n")
+    ])
+    workflows = GitHubAPI("token", transport=transport).fetch_workflows(
+        [("owner", "repo"), ("owner", "empty"), ("owner", "missing")])
+
+    assert workflows == {
+        ("owner", "repo"): [{"Path": ".github/workflows/ci.yml", "Oid": "oid-ci.yml", "Content": "on: push\n"},
+                            {"Path": ".github/workflows/big.yaml", "Oid": "oid-big.yaml",
+                             "Content": "on: pull_request\n"}],
+        ("owner", "empty"): []}
+    assert adapter.requests[1] == "https://api.github.com/repos/owner/repo/git/blobs/oid-big.yaml"
+
+
+def test_fetch_repo_lists_workflows_in_one_query(clock):
+    def item(name):
+        return {"full_name": f"owner/{name}", "name": name, "description": None, "html_url": f"https://x/{name}",
+                "language": None, "stargazers_count": 1, "open_issues_count": 0,
+                "owner": {"login": "owner", "type": "User"}, "created_at": "", "updated_at": "", "size": 1,
+                "has_downloads": True}
+
+    transport, adapter = make_transport(clock, [
+        (200, quota(29, resource='search'), json.dumps({"items": [item("first"), item("second")]})),
+        (200, quota(4999, resource='graphql'), json.dumps({"data": {
+            "r0": {"object": {"entries": [{"name": "ci.yml"}, {"name": "README.md"}, {"name": "cd.yaml"}]}},
+            "r1": {"object": None}}}))
+    ])
+    repos = GitHubAPI("token", transport=transport).fetch_repo("stars:1", "stars", "desc", 1)
+
+    assert [(repo["Name"], repo["YML Count"], repo["hasYml"]) for repo in repos] == \
+        [("owner/first", 2, True), ("owner/second", 0, False)]
+    assert repos[0]["YML Files"] == "ci.yml; cd.yaml"
+    assert len(adapter.requests) == 2
@@ -0,0 +1,385 @@
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+from http.client import HTTPConnection
+from io import BytesIO
+import pytest
+from APIs.Cache import ActionCache
+from Analysis.Engine import Analyzer
+from Analysis.Engine.Analyzer import BatchAnalyzer, analyze_file, detect_all, format_log, initialize_detectors
+from Analysis.Engine.FileCache import FileCache
+from Analysis.Engine.Incremental import IncrementalAnalyzer
+from Analysis.Engine.LanguageServer import LanguageServer, apply_change
+from Analysis.Engine.Memo import SmellMemo
+from Analysis.Engine.Server import AnalysisServer
+from Analysis.Engine.Watcher import Inotify, WorkflowWatcher
+from Analysis.Engine.Walker import Walker
+from Analysis.Parse.ActionParser import Action
+from Analysis.Smells.Categories.Maintenance.ErrorHandling.ErrorHandlingSt import MainErrorHandlingCheck
+from Miner.BlobStore import blob_id
+
+
+@pytest.fixture(autouse=True)
+def gash_home(tmp_path, monkeypatch):
+    # Keeps the shared action cache out of the real home directory
+    monkeypatch.setenv("GASH_HOME", str(tmp_path / "home"))
+    monkeypatch.setattr(ActionCache, "_shared", None)
+
+
+@pytest.fixture
+def yaml_files():
+    return [os.path.abspath("../../Yamls/Smells/RemoteTriggers.yaml"),
+            os.path.abspath("../../Yamls/Smells/LongBlock.yaml"),
+            os.path.abspath("../../Yamls/Parser/multijobs.yaml")]
+
+
+def test_analyze_file(yaml_files):
+    log = analyze_file(yaml_files[1], "token")
+    assert f"\nFindings for LongBlock in {yaml_files[1]}:\n" in log
+    assert "\nFindings for UntrustedDependencies in" in log
+
+
+def test_batch_keeps_order(yaml_files):
+    serial = list(BatchAnalyzer("token", jobs=1).analyze(yaml_files))
+    parallel = list(BatchAnalyzer("token", jobs=2).analyze(yaml_files))
+    assert [file_path for file_path, log in parallel] == yaml_files
+    assert parallel == serial
+
+
+def test_batch_writes_logs(yaml_files, tmp_path):
+    BatchAnalyzer("token", jobs=2).run(yaml_files, str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["LongBlock.log", "RemoteTriggers.log", "multijobs.log"]
+    with open(tmp_path / "LongBlock.log") as log_file:
+        assert log_file.read() == analyze_file(yaml_files[1], "token")
+
+
+def test_walker_order():
+    workflow = Action(file_path="../../Yamls/Parser/simple.yaml").prepare_for_analysis()
+    walker = Walker()
+    events = []
+    walker.register("owner", "workflow", lambda wf: events.append("workflow"))
+    walker.register("owner", "env", lambda level, key, value, job_name, step: events.append(f"env {level} {key}"))
+    walker.register("owner", "job", lambda job_name, job: events.append(f"job {job_name}"))
+    walker.register("owner", "step", lambda job_name, job, step: events.append(f"step {step.name}"))
+    walker.register("owner", "run", lambda job_name, step: events.append(f"run {step.run}"))
+    walker.walk(workflow)
+
+    assert events[0] == "workflow"
+    assert events.index("job test_job") < events.index("step Checkout code") < events.index("step Run tests")
+    assert events[-1] == "run pytest"
+
+
+def test_walker_isolates_errors():
+    workflow = Action(file_path="../../Yamls/Parser/multijobs.yaml").prepare_for_analysis()
+    walker = Walker()
+    visited = []
+
+    def fail(job_name, job):
+        raise RuntimeError("boom")
+
+    walker.register("broken", "job", fail)
+    walker.register("working", "job", lambda job_name, job: visited.append(job_name))
+    errors = walker.walk(workflow)
+
+    assert list(errors) == ["broken"]
+    assert visited == list(workflow.jobs)
+    with pytest.raises(RuntimeError):
+        walker.raise_error("broken")
+
+
+def test_detect_all_matches_detectors():
+    workflow = Action(file_path="../../Yamls/Smells/Prisma/test-template.yml").prepare_for_analysis()
+    detectors = initialize_detectors(workflow, "token")
+    detectors.pop("UntrustedDependencies")
+    results = detect_all(workflow, detectors)
+
+    for detector_name, detector in initialize_detectors(workflow, "token").items():
+        if detector_name in results:
+            assert results[detector_name] == detector.detect()
+
+
+def test_retry_does_not_repeat_findings(monkeypatch):
+    workflow = Action(file_path="../../Yamls/Smells/Prisma/test-template.yml").prepare_for_analysis()
+    expected = detect_all(workflow, initialize_detectors(workflow, "token", offline=True))
+    visit_job_timeout = MainErrorHandlingCheck.visit_job_timeout
+    calls = []
+
+    def flaky(self, job_name, job):
+        calls.append(job_name)
+        # Fails once the strategy already holds the findings of the first jobs
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        visit_job_timeout(self, job_name, job)
+
+    monkeypatch.setattr(MainErrorHandlingCheck, "visit_job_timeout", flaky)
+    monkeypatch.setattr(Analyzer.time, "sleep", lambda seconds: None)
+    findings, errors, complete = Analyzer.detect_workflow(workflow, "token", offline=True)
+
+    assert not errors
+    assert expected["ErrorHandling"]
+    assert findings == expected
+
+
+def test_offline_analysis(yaml_files):
+    log = analyze_file(yaml_files[1], None, offline=True)
+    assert f"\nFindings for LongBlock in {yaml_files[1]}:\n" in log
+    assert "UntrustedDependencies" not in log
+
+    # The offline analysis does not load the GitHub API client
+    code = ("import sys\n"
+            "from Analysis.Engine.Analyzer import analyze_file\n"
+            f"analyze_file({yaml_files[1]!r}, None, offline=True)\n"
+            "assert 'requests' not in sys.modules and 'APIs.GitHub' not in sys.modules, sorted(sys.modules)\n")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": os.path.abspath("../../..")})
+    assert result.returncode == 0, result.stderr
+
+
+def test_file_cache_replays_findings(yaml_files, tmp_path, monkeypatch):
+    cache = FileCache(str(tmp_path / "cache"), SmellMemo(str(tmp_path / "smells.db")))
+    copy = tmp_path / "LongBlock.yaml"
+    copy.write_bytes(open(yaml_files[1], "rb").read())
+    os.utime(copy, (1, 1))
+    files = yaml_files + [str(copy)]
+    logs = list(BatchAnalyzer(None, offline=True, cache=cache).analyze(files))
+    assert logs == list(BatchAnalyzer(None, offline=True).analyze(files))
+
+    detected = []
+    detect_file = Analyzer.detect_file
+    monkeypatch.setattr(Analyzer, "detect_file", lambda file_path, *args: detected.append(file_path) or
+                        detect_file(file_path, *args))
+
+    # A touched file is hashed again, and its findings are replayed while the content is the same
+    os.utime(copy, (2, 2))
+    assert list(BatchAnalyzer(None, offline=True, cache=cache).analyze(files)) == logs
+    assert detected == []
+
+    # The same content as another file is replayed as well, and only a new content is analyzed
+    copy.write_bytes(open(yaml_files[0], "rb").read())
+    os.utime(copy, (3, 3))
+    assert list(BatchAnalyzer(None, offline=True, cache=cache).analyze(files))[-1][1] == \
+        logs[0][1].replace(yaml_files[0], str(copy))
+    assert detected == []
+
+    copy.write_bytes(open(yaml_files[1], "rb").read() + b"\n# Changed\n")
+    os.utime(copy, (4, 4))
+    list(BatchAnalyzer(None, offline=True, cache=cache).analyze(files))
+    assert detected == [str(copy)]
+
+
+def test_findings_belong_to_the_hashed_content(yaml_files, tmp_path, monkeypatch):
+    cache = FileCache(str(tmp_path / "cache"), SmellMemo(str(tmp_path / "smells.db")))
+    copy = tmp_path / "LongBlock.yaml"
+    content = open(yaml_files[1], "rb").read()
+    copy.write_bytes(content)
+    lookup = cache.lookup
+
+    def lookup_and_change(file_path, *args, **kwargs):
+        result = lookup(file_path, *args, **kwargs)
+        # The file changes after it was hashed, before the detectors run
+        copy.write_bytes(open(yaml_files[0], "rb").read())
+        return result
+
+    monkeypatch.setattr(cache, "lookup", lookup_and_change)
+    logs = list(BatchAnalyzer(None, offline=True, cache=cache).analyze([str(copy)]))
+
+    assert logs == [(str(copy), analyze_file(yaml_files[1], None, offline=True).replace(yaml_files[1], str(copy)))]
+    assert cache.memo.get(blob_id(content))[0] == Analyzer.detect_file(yaml_files[1], None, offline=True)[0]
+
+
+def test_unreadable_files_are_reported(yaml_files, tmp_path, monkeypatch):
+    cache = FileCache(str(tmp_path / "cache"), SmellMemo(str(tmp_path / "smells.db")))
+    invalid = tmp_path / "invalid.yml"
+    invalid.write_text("jobs: [\n")
+    monkeypatch.setattr(Analyzer.time, "sleep", lambda seconds: pytest.fail("A parse failure was retried."))
+
+    missing = str(tmp_path / "missing.yml")
+    results = list(BatchAnalyzer(None, offline=True, cache=cache).findings([missing, str(invalid), yaml_files[0]]))
+    assert [(findings, list(errors)) for file_path, findings, errors in results[:2]] == [({}, [None]), ({}, [None])]
+    assert "No such file or directory" in results[0][2][None] and "not a valid workflow" in results[1][2][None]
+    assert results[2][1] and results[2][2] == {}
+    assert format_log(missing, {}, results[0][2]) == results[0][2][None]
+
+
+class UnixHTTPConnection(HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def test_server(yaml_files, tmp_path, monkeypatch):
+    service = AnalysisServer(None, offline=True, memo=SmellMemo(str(tmp_path / "smells.db")))
+    expected = [Analyzer.detect_file(file_path, None, True)[0] for file_path in yaml_files]
+    detected = []
+    detect_workflow = Analyzer.detect_workflow
+    monkeypatch.setattr(Analyzer, "detect_workflow", lambda *args: detected.append(args) or detect_workflow(*args))
+
+    for server, connect in ((service.server(port=0), None),
+                            (service.server(socket_path=str(tmp_path / "gash.sock")), UnixHTTPConnection)):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            for file_path, findings in zip(yaml_files, expected):
+                connection = (connect(server.server_address) if connect else
+                              HTTPConnection(*server.server_address[:2]))
+                connection.request("POST", "/analyze", open(file_path, "rb").read())
+                response = connection.getresponse()
+                result = json.loads(response.read())
+                assert response.status == 200
+                assert result["findings"] == findings
+
+            connection.request("POST", "/analyze", b"on: [")
+            assert connection.getresponse().status == 400
+
+            # Missing, invalid and negative lengths are rejected without reading the body
+            for length in (None, "abc", "-1"):
+                connection.putrequest("POST", "/analyze")
+                if length is not None:
+                    connection.putheader("Content-Length", length)
+                connection.endheaders()
+                response = connection.getresponse()
+                assert response.status == 400 and "Content-Length" in json.loads(response.read())["error"]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    # The second server answered every workflow from the memo
+    assert len(detected) == len(yaml_files)
+
+
+def analyze(workflow):
+    return detect_all(workflow, initialize_detectors(workflow, None, offline=True))
+
+
+def test_incremental_analysis():
+    analyzer = IncrementalAnalyzer()
+    workflow = Action(file_path="../../Yamls/Smells/LongBlock.yaml", use_cache=False).prepare_for_analysis()
+    assert analyzer.analyze(workflow) == analyze(workflow)
+    assert (analyzer.analyzed_jobs, analyzer.reused_jobs) == (len(workflow.jobs), 0)
+
+    # The jobs visited first decide the replicated jobs and the missing parameters
+    workflow.jobs = dict(reversed(list(workflow.jobs.items())))
+    assert analyzer.analyze(workflow) == analyze(workflow)
+    assert (analyzer.analyzed_jobs, analyzer.reused_jobs) == (0, len(workflow.jobs))
+
+    job_name, job = next(iter(workflow.jobs.items()))
+    job.steps = job.steps[:-1]
+    del workflow.jobs[list(workflow.jobs)[-1]]
+    assert analyzer.analyze(workflow) == analyze(workflow)
+    assert (analyzer.analyzed_jobs, analyzer.reused_jobs) == (1, len(workflow.jobs) - 1)
+
+
+def test_incremental_analysis_keeps_key_order():
+    analyzer = IncrementalAnalyzer()
+    workflow = Action(file_path="../../Yamls/Smells/Prisma/bundle-size.yml", use_cache=False).prepare_for_analysis()
+    analyzer.analyze(workflow)
+
+    # The CodeReplica findings follow the order of the parameters
+    step = next(step for job in workflow.jobs.values() for step in job.steps if "skip-tsc" in step.with_params)
+    step.with_params = dict(reversed(list(step.with_params.items())))
+    assert analyzer.analyze(workflow) == analyze(workflow)
+    assert (analyzer.analyzed_jobs, analyzer.reused_jobs) == (1, 0)
+
+
+def test_watcher(tmp_path):
+    workflows = tmp_path / ".github" / "workflows"
+    workflows.mkdir(parents=True)
+    path = str(workflows / "ci.yml")
+    content = open("../../Yamls/Smells/LongBlock.yaml").read()
+    with open(path, "w") as file:
+        file.write(content)
+
+    watcher = WorkflowWatcher(str(tmp_path))
+    inotify = Inotify(watcher.directory)
+    assert watcher.poll() == {path}
+    assert watcher.analyze(path) == analyze(Action(file_path=path).prepare_for_analysis())
+
+    with open(path, "w") as file:
+        file.write(content.replace("job4", "renamed"))
+    os.utime(path, ns=(1, 1))
+    assert inotify.read(1) == {"ci.yml"}
+    assert watcher.poll() == {path}
+    assert watcher.analyze(path) == analyze(Action(file_path=path).prepare_for_analysis())
+    assert watcher.analyzers[path].analyzed_jobs == 1
+
+    os.remove(path)
+    assert watcher.poll() == {path}
+    assert watcher.analyze(path) is None and not watcher.analyzers
+    inotify.close()
+
+
+def test_apply_change():
+    text = "a: 1\nb: \U0001F600x\n"
+    change = {"range": {"start": {"line": 1, "character": 5}, "end": {"line": 1, "character": 6}}, "text": "y"}
+    assert apply_change(text, change) == "a: 1\nb: \U0001F600y\n"
+    assert apply_change(text, {"text": "c: 2"}) == "c: 2"
+
+
+def test_language_server():
+    def message(method, params, request_id=None):
+        body = json.dumps({"jsonrpc": "2.0", "method": method, "params": params,
+                           **({"id": request_id} if request_id is not None else {})}).encode()
+        return b"Content-Length: %d\r\n\r\n" % len(body) + body
+
+    def diagnostics(output):
+        messages = [json.loads(part) for part in re.split(rb"Content-Length: \d+\r\n\r\n", output.getvalue())[1:]]
+        return [message["params"] for message in messages if message.get("method") == "textDocument/publishDiagnostics"]
+
+    uri = "file:///ci.yml"
+    text = open("../../Yamls/Smells/LongBlock.yaml").read()
+    line = next(index for index, content in enumerate(text.split("\n")) if content.strip() == "job4:")
+    change = {"range": {"start": {"line": line, "character": 2}, "end": {"line": line, "character": 6}}, "text": "jobX"}
+    output = BytesIO()
+    server = LanguageServer(BytesIO(
+        message("initialize", {}, 1) +
+        message("textDocument/didOpen", {"textDocument": {"uri": uri, "version": 1, "text": text}}) +
+        message("textDocument/didChange", {"textDocument": {"uri": uri, "version": 2}, "contentChanges": [change]}) +
+        message("textDocument/didChange", {"textDocument": {"uri": uri, "version": 3},
+                                           "contentChanges": [{"text": "jobs: ["}]}) +
+        message("textDocument/didClose", {"textDocument": {"uri": uri}}) +
+        message("exit", {})), output, debounce=0)
+    server.run()
+
+    opened, changed, invalid, closed = diagnostics(output)
+    replicas = [diagnostic for diagnostic in opened["diagnostics"] if diagnostic["message"].startswith("Job 'job4'")]
+    assert replicas[0]["code"] == "CodeReplica" and replicas[0]["range"]["start"] == {"line": line, "character": 2}
+    assert [diagnostic["message"].replace("jobX", "job4") for diagnostic in changed["diagnostics"]] == \
+        [diagnostic["message"] for diagnostic in opened["diagnostics"]]
+    assert server.analyzers == {} and server.jobs == {} and changed["version"] == 2
+    assert invalid["diagnostics"][0]["message"].startswith("Invalid YAML")
+    assert closed == {"uri": uri, "diagnostics": []}
+
+    # The malformed messages are answered with an error and skipped
+    output = BytesIO()
+    server = LanguageServer(BytesIO(
+        b"Content-Length: many\r\n\r\n" +
+        b"Content-Length: 7\r\n\r\n{\"id\": " +
+        b"Content-Length: 2\r\n\r\n[]" +
+        message("shutdown", {}, 2) +
+        message("exit", {})), output, debounce=0)
+    server.run()
+    replies = [json.loads(part) for part in re.split(rb"Content-Length: \d+\r\n\r\n", output.getvalue())[1:]]
+    assert [reply.get("error", {}).get("code") for reply in replies] == [-32700, -32700, -32600, None]
+    assert replies[0]["id"] is None and replies[-1] == {"jsonrpc": "2.0", "id": 2, "result": None}
+
+    # The unchanged jobs are reused by the next build. The comment keeps the text out of the parse cache.
+    text += "\n# reused\n"
+    server = LanguageServer(BytesIO(), BytesIO(), debounce=0)
+    server.update(uri, text, 1)
+    jobs = dict(server.jobs[uri])
+    opened = server.diagnostics(uri, text)
+    server.update(uri, text.replace("job4:", "jobX:"), 2)
+    assert all(server.jobs[uri][job_name][1] is job for job_name, (source, job) in jobs.items() if job_name != "job4")
+    assert "job4" not in server.jobs[uri] and "jobX" in server.jobs[uri]
+
+    # The findings of the reused jobs keep their lines
+    changed = server.diagnostics(uri, text.replace("job4:", "jobX:") + "\n")
+    assert [diagnostic["range"] for diagnostic in changed] == [diagnostic["range"] for diagnostic in opened]
+    assert len({diagnostic["range"]["start"]["line"] for diagnostic in changed}) > 1
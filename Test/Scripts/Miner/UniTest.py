@@ -0,0 +1,406 @@
+import csv
+import os
+import subprocess
+import time
+import pytest
+from unittest.mock import PropertyMock, patch
+from pydriller import Repository
+from Analysis.Engine.Memo import SmellMemo
+from Miner.BlobReader import BlobReader
+from Miner.BlobStore import BlobStore, blob_id
+from Miner.Mining import Mining
+from Miner.Mirrors import MirrorCache
+from Miner.Pipeline import Pipeline
+from Miner.WorkflowHistory import WorkflowRepository, is_workflow_file
+
+
+def git(repo, *args, date=None):
+    dates = {"GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date} if date else {}
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True,
+                   env={**os.environ, "GIT_AUTHOR_NAME": "gash", "GIT_AUTHOR_EMAIL": "gash@example.com",
+                        "GIT_COMMITTER_NAME": "gash", "GIT_COMMITTER_EMAIL": "gash@example.com", **dates})
+
+
+def git_output(repo, *args):
+    return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True).stdout.decode().strip()
+
+
+def commit(repo, files, message, date=None):
+    for name, content in files.items():
+        path = repo / name
+        if content is None:
+            git(repo, "rm", "-q", name)
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        git(repo, "add", name)
+    git(repo, "commit", "-q", "-m", message, date=date)
+
+
+def make_repo(repo):
+    repo.mkdir(parents=True)
+    git(repo, "init", "-q", "-b", "main")
+    commit(repo, {"main.py": "print('a')\n"}, "code")
+    commit(repo, {".github/workflows/ci.yml": "on: push\njobs:\n  build:\n    runs-on: ubuntu-latest\n"
+                                           "    steps:\n      - run: echo ok\n",
+                  "main.py": "print('b')\n"}, "add ci (#3)")
+    commit(repo, {"README.md": "docs\n"}, "docs")
+    git(repo, "checkout", "-q", "-b", "feature")
+    commit(repo, {".github/workflows/release.yaml": "on: release\n"}, "add release")
+    git(repo, "checkout", "-q", "main")
+    commit(repo, {".github/workflows/ci.yml": "on: [push, pull_request]\n"}, "update ci")
+    git(repo, "merge", "-q", "--no-ff", "feature", "-m", "merge feature")
+    commit(repo, {".github/workflows/ci.yml": None, "notes.yml": "a: 1\n"}, "drop ci")
+    return repo
+
+
+@pytest.fixture
+def repo(tmp_path):
+    return make_repo(tmp_path / "repo")
+
+
+def workflow_rows(repository):
+    return [(commit.hash, modification.filename, modification.change_type.name, modification.diff,
+             commit.files, commit.dmm_unit_size)
+            for commit in repository.traverse_commits()
+            for modification in commit.modified_files
+            if is_workflow_file(modification.new_path or modification.old_path)]
+
+
+def test_is_workflow_file():
+    assert is_workflow_file(".github/workflows/ci.yml")
+    assert is_workflow_file(".github/workflows/nested/ci.yaml")
+    assert not is_workflow_file(".github/dependabot.yml")
+    assert not is_workflow_file(".github/workflows/README.md")
+    assert not is_workflow_file(None)
+
+
+def test_workflow_repository_matches_full_traversal(repo):
+    full = workflow_rows(Repository(str(repo), histogram_diff=True))
+    restricted = workflow_rows(WorkflowRepository(str(repo), histogram_diff=True))
+
+    assert restricted == full
+    assert [row[2] for row in restricted] == ["ADD", "ADD", "MODIFY", "DELETE"]
+
+
+def test_workflow_repository_skips_other_commits(repo):
+    messages = [commit.msg for commit in WorkflowRepository(str(repo)).traverse_commits()]
+    assert "code" not in messages and "docs" not in messages
+    for commit in WorkflowRepository(str(repo)).traverse_commits():
+        assert all(is_workflow_file(modification.new_path or modification.old_path)
+                   for modification in commit.modified_files)
+
+
+def test_pipeline_keeps_order():
+    def slow(value):
+        time.sleep((value % 5) / 1000)
+        return value
+
+    stages = [("first", slow, 4), ("second", lambda value: None if value % 7 == 0 else value * 2, 3)]
+    results = list(Pipeline(stages, window=8).run(iter(range(200))))
+
+    assert results == [(value, value * 2) for value in range(200) if value % 7]
+
+
+def test_pipeline_raises_in_order():
+    def fail(value):
+        if value == 20:
+            raise KeyError(value)
+        return value
+
+    seen = []
+    with pytest.raises(KeyError):
+        for position, value in Pipeline([("fail", fail, 3)], window=4).run(range(100)):
+            seen.append(value)
+    assert seen == list(range(20))
+
+
+def mocked_api(output):
+    return patch('Utils.Utilities.Config.get_base_directory', return_value=str(output)), \
+        patch('APIs.GitHub.GitHubAPI.fetch_commits',
+              side_effect=lambda owner, name, shas: {sha: {"Author Acc": "User", "Committer Acc": "User"}
+                                                     for sha in shas}), \
+        patch('APIs.GitHub.GitHubAPI.fetch_issues',
+              side_effect=lambda owner, name, numbers: {number: dict.fromkeys(
+                  ["Creator", "Creator association", "Creator type", "Created At", "Closed At", "State", "Body",
+                   "Closer", "Closer type", "Labels", "Reviewers/Assignees", "Reviewers/Assignees type",
+                   "Is Pull Request", "Milestone"], f"issue {number}") for number in numbers}), \
+            patch.object(Mining, 'untrusted_dependencies', return_value=([], True))
+
+
+def read_dataset(path):
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        return list(csv.DictReader(csv_file, delimiter=';'))
+
+
+def mine(repo, tmp_path, home=None, **options):
+    output = tmp_path / "generated"
+    config, commit_api, issue_api, untrusted = mocked_api(output)
+    with config, commit_api, issue_api, untrusted, patch.dict(os.environ, {"GASH_HOME": str(home or tmp_path)}):
+        Mining("token").commits(str(repo), **options)
+
+    datasets = output / "DataSets"
+    return read_dataset(next(datasets.glob("commits_*.csv")))
+
+
+def test_pipeline_matches_serial_mining(repo, tmp_path):
+    serial = mine(repo, tmp_path / "serial")
+    pipelined = mine(repo, tmp_path / "pipeline", pipeline=True, enrich_workers=3, analysis_workers=2)
+
+    assert pipelined == serial
+    assert [row["Type Of Commit"] for row in serial] == ["ADD", "ADD", "MODIFY", "DELETE"]
+    assert serial[0]["Author Acc Type"] == "User" and serial[0]["Issue Creator"] == "issue 3"
+    assert serial[0]["ErrorHandling"] == "True" and serial[-1]["ErrorHandling"] == ""
+
+
+def test_parallel_batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GASH_HOME", str(tmp_path / "home"))
+    for name in ("first", "second", "third"):
+        make_repo(tmp_path / "owner" / name)
+    with open(tmp_path / "repos.csv", "w") as csv_file:
+        csv_file.write("Name;Url\n" + "".join(f"{name};./owner/{name}\n" for name in ("first", "second", "third")))
+
+    config, commit_api, issue_api, untrusted = mocked_api(tmp_path / "generated")
+    with config, commit_api, issue_api, untrusted:
+        Mining("token").batch(str(tmp_path / "repos.csv"), 1, jobs=2)
+
+    datasets = tmp_path / "generated" / "DataSets"
+    assert sorted(path.name for path in datasets.glob("*.csv")) == \
+        ["commits_first.csv", "commits_second.csv", "commits_third.csv"]
+    for name in ("first", "second", "third"):
+        assert [row["Type Of Commit"] for row in read_dataset(datasets / f"commits_{name}.csv")] == \
+            ["ADD", "ADD", "MODIFY", "DELETE"]
+
+
+def test_resume_appends_new_commits(repo, tmp_path):
+    assert len(mine(repo, tmp_path / "resumed")) == 4
+    commit(repo, {".github/workflows/ci.yaml": "on: push\n"}, "add ci again")
+    resumed = mine(repo, tmp_path / "resumed")
+
+    assert resumed == mine(repo, tmp_path / "fresh")
+    assert [row["Commit Message"] for row in resumed][-1] == "add ci again"
+
+
+def make_branched_repo(repo):
+    # The feature commit is newer than the last main commit, which is not one of its ancestors
+    repo.mkdir(parents=True)
+    git(repo, "init", "-q", "-b", "main")
+    commit(repo, {".github/workflows/ci.yml": "on: push\n"}, "add ci", date="1700000000 +0000")
+    git(repo, "checkout", "-q", "-b", "feature")
+    git(repo, "checkout", "-q", "main")
+    commit(repo, {".github/workflows/ci.yml": "on: [push]\n"}, "update ci", date="1700001000 +0000")
+    git(repo, "checkout", "-q", "feature")
+    commit(repo, {".github/workflows/release.yml": "on: release\n"}, "add release", date="1700002000 +0000")
+    git(repo, "checkout", "-q", "main")
+    git(repo, "merge", "-q", "--no-ff", "feature", "-m", "merge feature", date="1700003000 +0000")
+    return repo
+
+
+def test_resume_with_merged_branches(tmp_path):
+    repo = make_branched_repo(tmp_path / "repo")
+    first = mine(repo, tmp_path / "resumed")
+    assert [row["Commit Message"] for row in first] == ["add ci", "update ci", "add release"]
+
+    # Nothing is mined again, although the last row is not a descendant of every mined commit
+    assert mine(repo, tmp_path / "resumed") == first
+    commit(repo, {".github/workflows/lint.yml": "on: pull_request\n"}, "add lint", date="1700004000 +0000")
+    assert mine(repo, tmp_path / "resumed") == mine(repo, tmp_path / "fresh")
+
+
+def test_resume_after_interruption(tmp_path):
+    repo = make_branched_repo(tmp_path / "repo")
+    complete = mine(repo, tmp_path / "complete")
+
+    # The run stops on the third commit, after the rows of the first two were saved
+    commit_tasks = Mining.commit_tasks
+    def interrupted(self, commit, *args):
+        if commit.msg == "add release":
+            raise KeyboardInterrupt
+        return commit_tasks(self, commit, *args)
+
+    with patch.object(Mining, "commit_tasks", interrupted), pytest.raises(KeyboardInterrupt):
+        mine(repo, tmp_path / "interrupted")
+    commit(repo, {".github/workflows/lint.yml": "on: pull_request\n"}, "add lint", date="1700004000 +0000")
+    resumed = mine(repo, tmp_path / "interrupted")
+
+    assert resumed[:3] == complete
+    assert [row["Commit Message"] for row in resumed] == ["add ci", "update ci", "add release", "add lint"]
+
+
+def test_resume_drops_interrupted_rows(repo, tmp_path):
+    complete = mine(repo, tmp_path)
+    dataset = next((tmp_path / "generated" / "DataSets").glob("commits_*.csv"))
+    with open(dataset, "a", encoding="utf-8") as csv_file:
+        csv_file.write("half;written;row\n")
+
+    assert mine(repo, tmp_path) == complete
+
+
+def test_resume_after_history_rewrite(repo, tmp_path):
+    mine(repo, tmp_path / "rewritten")
+    git(repo, "reset", "-q", "--hard", "HEAD~2")
+    commit(repo, {".github/workflows/other.yml": "on: push\n"}, "other history")
+
+    assert mine(repo, tmp_path / "rewritten") == mine(repo, tmp_path / "fresh")
+
+
+def test_snapshots_are_blobs(repo, tmp_path):
+    rows = mine(repo, tmp_path)
+    blobs = BlobStore.at(str(tmp_path / "generated"))
+
+    for row in rows:
+        for column in ("Path Src Code Before", "Path Src Code After"):
+            oid = row[column]
+            expected = subprocess.run(["git", "hash-object", "--stdin"], input=blobs.get_bytes(oid),
+                                      capture_output=True, check=True).stdout.decode().strip()
+            assert oid == expected
+    assert blobs.get(rows[0]["Path Src Code After"]).startswith("on: push")
+    # The after snapshot of a commit is the before snapshot of the next change of the same file
+    assert rows[0]["Path Src Code After"] == rows[2]["Path Src Code Before"]
+    assert not (tmp_path / "generated" / "Scripts" / "repo").exists()
+
+
+def test_memo_skips_seen_blobs(repo, tmp_path):
+    first = mine(repo, tmp_path / "first", home=tmp_path)
+    with patch('Analysis.Engine.Analyzer.detect_all') as detect_all:
+        second = mine(repo, tmp_path / "second", home=tmp_path)
+
+    detect_all.assert_not_called()
+    assert second == first
+
+
+def test_memo_is_versioned(tmp_path):
+    memo = SmellMemo(str(tmp_path / "smells.db"), version="old", untrusted_ttl=60)
+    memo.put("oid", findings={"LongBlock": ["finding"]})
+    memo.put("oid", untrusted=[])
+
+    assert memo.get("oid") == ({"LongBlock": ["finding"]}, [])
+    assert SmellMemo(str(tmp_path / "smells.db"), version="new").get("oid") == (None, None)
+    assert SmellMemo(str(tmp_path / "smells.db"), version="old", untrusted_ttl=-1).get("oid") == \
+        ({"LongBlock": ["finding"]}, None)
+
+
+def test_skipped_metrics_are_not_computed(repo, tmp_path):
+    complete = mine(repo, tmp_path / "complete")
+    with patch('Miner.WorkflowHistory.MemoizedCommit.modified_files', new_callable=PropertyMock) as whole_commit, \
+            patch('pydriller.domain.commit.ModifiedFile.token_count', new_callable=PropertyMock) as token_count:
+        smells_only = mine(repo, tmp_path / "smells", metrics=())
+
+    whole_commit.assert_not_called()
+    token_count.assert_not_called()
+    skipped = ("Token count", "DMM_Unit", "DMM_Complexity", "DMM_Interfacing", "Diff")
+    assert all(not row[column] for row in smells_only for column in skipped)
+    assert [{key: value for key, value in row.items() if key not in skipped} for row in smells_only] == \
+        [{key: value for key, value in row.items() if key not in skipped} for row in complete]
+
+
+def test_resume_with_other_metrics_mines_again(repo, tmp_path):
+    mine(repo, tmp_path)
+    assert mine(repo, tmp_path, metrics=("dmm",)) == mine(repo, tmp_path / "fresh", metrics=("dmm",))
+
+
+def test_blob_reader(repo):
+    with BlobReader(str(repo)) as reader:
+        oid, data = reader.read("HEAD~1", ".github/workflows/ci.yml")
+        assert data == b"on: [push, pull_request]\n" and oid == blob_id(data)
+        assert reader.read(oid) == (oid, data)
+        assert reader.read("HEAD", ".github/workflows/ci.yml") == (None, None)
+        assert reader.read("HEAD", ".github/workflows") == (None, None)
+        assert reader.read("HEAD", "notes.yml")[1] == b"a: 1\n"
+
+
+def test_current_code_is_read_from_head(repo, tmp_path):
+    (repo / ".github" / "workflows" / "release.yaml").write_text("uncommitted\n")
+    rows = mine(repo, tmp_path)
+    blobs = BlobStore.at(str(tmp_path / "generated"))
+
+    release = next(row for row in rows if row["Files Names"] == "release.yaml")
+    assert blobs.get(release["Path Src Code Current"]) == "on: release\n"
+
+
+def test_mirror_cache(tmp_path):
+    first, second = make_repo(tmp_path / "owner" / "first"), make_repo(tmp_path / "owner" / "second")
+    mirrors = MirrorCache(str(tmp_path / "mirrors"), max_size=1)
+
+    with mirrors.mirror(str(first)) as path:
+        assert path == str(tmp_path / "mirrors" / "owner" / "first")
+        commit(first, {"new.txt": "new\n"}, "new commit")
+    with mirrors.mirror(str(first)) as path:
+        assert git_output(path, "log", "-1", "--format=%s") == "new commit"
+
+        # The least recently used mirror is removed once the cache is full, unless it is in use
+        with mirrors.mirror(str(second)):
+            assert os.path.isdir(path)
+    with mirrors.mirror(str(second)):
+        assert not os.path.isdir(path)
+
+
+def test_mirrors_keep_branches_and_tags(repo, tmp_path):
+    git(repo, "tag", "v1", "HEAD~1")
+    git(repo, "update-ref", "refs/pull/1/head", "feature")
+    mirrors = MirrorCache(str(tmp_path / "mirrors"), max_size=1)
+    refs = ["refs/heads/feature", "refs/heads/main", "refs/tags/v1"]
+
+    with mirrors.mirror(str(repo)) as path:
+        assert git_output(path, "for-each-ref", "--format=%(refname)").split() == refs
+    # The mirrors cloned with --mirror drop the other refs on the next fetch
+    subprocess.run(["git", "clone", "-q", "--mirror", str(repo), path + ".old"], check=True)
+    os.replace(path, path + ".new")
+    os.replace(path + ".old", path)
+    with mirrors.mirror(str(repo)):
+        assert git_output(path, "for-each-ref", "--format=%(refname)").split() == refs
+        git(repo, "update-ref", "refs/pull/2/head", "main")
+    with mirrors.mirror(str(repo)):
+        assert git_output(path, "for-each-ref", "--format=%(refname)").split() == refs
+
+
+def test_mirrors_are_kept_while_any_process_uses_them(repo, tmp_path):
+    other = make_repo(tmp_path / "owner" / "other")
+    mirrors = MirrorCache(str(tmp_path / "mirrors"), max_size=1)
+
+    with mirrors.mirror(str(repo)) as path:
+        # Another running process acquired the same mirror
+        mirrors.execute("INSERT INTO users VALUES (?, ?)", (path, os.getppid()))
+    with mirrors.mirror(str(other)):
+        assert os.path.isdir(path)
+
+    mirrors.execute("DELETE FROM users WHERE pid = ?", (os.getppid(),))
+    with mirrors.mirror(str(other)):
+        assert not os.path.isdir(path)
+
+
+def test_remote_repositories_are_mined_from_mirrors(repo, tmp_path):
+    with patch('Miner.Mining.is_remote', return_value=True):
+        mirrored = mine(repo, tmp_path / "mirrored")
+
+    assert mirrored == mine(repo, tmp_path / "direct")
+    assert (tmp_path / "mirrored" / "generated" / "Mirrors" / repo.parent.name / "repo" / "HEAD").exists()
+
+
+def test_enrichment_is_batched_and_cached(repo, tmp_path):
+    config, commit_api, issue_api, untrusted = mocked_api(tmp_path / "generated")
+    with config, commit_api as fetch_commits, issue_api as fetch_issues, untrusted, \
+            patch.dict(os.environ, {"GASH_HOME": str(tmp_path)}):
+        Mining("token").commits(str(repo))
+        Mining("token").commits(str(repo), resume=False)
+
+    assert fetch_commits.call_count == 1 and len(fetch_commits.call_args.args[2]) == 4
+    assert fetch_issues.call_count == 1
+
+
+def test_remote_analysis(tmp_path):
+    ci = "on: push\njobs:\n  build:\n    runs-on: ubuntu-latest\n    steps:\n      - run: echo ok\n"
+    workflows = {("owner", "first"): [{"Path": ".github/workflows/ci.yml", "Oid": "", "Content": ci}],
+                 ("owner", "second"): [{"Path": ".github/workflows/ci.yml", "Oid": "", "Content": ci},
+                                       {"Path": ".github/workflows/broken.yml", "Oid": "", "Content": "on: ["}]}
+    config, commit_api, issue_api, untrusted = mocked_api(tmp_path / "generated")
+    with config, untrusted, patch.dict(os.environ, {"GASH_HOME": str(tmp_path)}), \
+            patch('APIs.GitHub.GitHubAPI.fetch_workflows',
+                  side_effect=lambda repositories: {key: workflows[key] for key in repositories if key in workflows}):
+        Mining("token").remote([f"https://github.com/owner/{name}" for name in ("first", "missing", "second")])
+
+    rows = read_dataset(tmp_path / "generated" / "DataSets" / "remote_workflows.csv")
+    assert [(row["Repo"], row["Files Names"]) for row in rows] == [("first", "ci.yml"), ("second", "ci.yml")]
+    assert rows[0]["Blob"] == rows[1]["Blob"] == blob_id(ci.encode())
+    assert rows[0]["ErrorHandling"] == "True" and rows[0]["UntrustedDependencies"] == "False"
@@ -0,0 +1,43 @@
+import glob
+import pytest
+from Analysis.Parse.ActionParser import Action, backends
+
+yaml_files = sorted(glob.glob('../../Yamls/**/*.y*ml', recursive=True))
+
+
+def as_dict(value):
+    """Turns Workflow, Job and Step objects into plain values, so they can be compared."""
+    if hasattr(value, '__dict__'):
+        return {key: as_dict(item) for key, item in vars(value).items()}
+    if isinstance(value, dict):
+        return {key: as_dict(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [as_dict(item) for item in value]
+    return value
+
+
+def parse(file_path, backend):
+    try:
+        return as_dict(Action(file_path=file_path, use_cache=False, backend=backend).prepare_for_analysis())
+    except Exception as e:
+        return type(e).__name__
+
+
+def test_corpus_found():
+    assert len(yaml_files) > 30
+
+
+@pytest.mark.skipif('libyaml' not in backends, reason="PyYAML was built without libyaml")
+@pytest.mark.parametrize('file_path', yaml_files)
+def test_backends_build_same_workflow(file_path):
+    assert parse(file_path, 'libyaml') == parse(file_path, 'python')
+
+
+@pytest.mark.skipif('libyaml' not in backends, reason="PyYAML was built without libyaml")
+def test_backends_keep_scalars():
+    content = "on: yes\njobs:\n  build:\n    continue-on-error: true\n    timeout-minutes: 5\n"
+    for backend in backends:
+        workflow = Action(content=content, use_cache=False, backend=backend).prepare_for_analysis()
+        assert workflow.on == 'yes'
+        assert workflow.jobs['build'].continue_on_error == 'true'
+        assert workflow.jobs['build'].timeout_minutes == 5
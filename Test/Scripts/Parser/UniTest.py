@@ -1,5 +1,5 @@
 import pytest
-from Analysis.Parse.ActionParser import Action
+from Analysis.Parse.ActionParser import Action, WorkflowCache, workflow_cache
 
 
 @pytest.fixture
@@ -56,3 +56,33 @@ def test_populate_step(action):
     step = action.populate_step(step_data)
     assert step.name == 'Checkout code'
     assert step.uses == 'actions/checkout@v2'
+
+
+def test_workflow_cache(yaml_content):
+    workflow_cache.clear()
+    first = Action(content=yaml_content).prepare_for_analysis()
+    second = Action(content=yaml_content).prepare_for_analysis()
+    other = Action(content=yaml_content + "\n").prepare_for_analysis()
+
+    assert second is first
+    assert other is not first
+    assert workflow_cache.info() == {'hits': 1, 'misses': 2, 'size': 2, 'maxsize': workflow_cache.maxsize}
+
+
+def test_workflow_cache_eviction():
+    cache = WorkflowCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_workflow_cache_disabled(yaml_content):
+    first = Action(content=yaml_content, use_cache=False).prepare_for_analysis()
+    second = Action(content=yaml_content, use_cache=False).prepare_for_analysis()
+    assert second is not first
@@ -1,6 +1,7 @@
 import pytest
 import logging
 from Analysis.Smells.Categories.Security.HardCoded.HardCodedFct import HardCodedFct
+from Analysis.Smells.Categories.Security.HardCoded.HardCodedSt import MainHardCodedCheck, SecretMatcher
 from Analysis.DataStruct import Workflow, Jobs, Steps
 from Analysis.Parse.ActionParser import Action
 
@@ -72,3 +73,25 @@ def test_integration():
     ]
 
     assert findings == expected_findings
+
+
+def test_secret_matcher():
+    matcher = SecretMatcher.shared()
+    assert matcher is SecretMatcher.shared()
+
+    assert matcher.search("echo $MY_API_KEY") == ("API_KEY", 9, 16)
+    assert matcher.search("export PASSWORD=1") == (r'\bpassword\b', 7, 15)
+    assert matcher.search("password_x") == ("PASSWORD", 0, 8)
+    assert matcher.search("npm ci && npm test") is None
+
+
+def test_matches_report_pattern(workflow):
+    checker = MainHardCodedCheck()
+    checker.check(workflow)
+
+    assert [(match["level"], match["pattern"]) for match in checker.matches] == [
+        ("workflow", "API_KEY"),
+        ("job build", r'\bdb_password\b'),
+        ("step in job build", r'\btoken\b'),
+        ("step in job build", "SECRET_KEY"),
+    ]
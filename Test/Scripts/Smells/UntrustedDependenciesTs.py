@@ -1,9 +1,11 @@
 import pytest
 import logging
+import requests
 from unittest.mock import patch
 from Analysis.Smells.Categories.Security.UntrustedDependencies.UntrustedDependenciesFct import UntrustedDependenciesFct
 from Analysis.DataStruct import Workflow, Jobs, Steps
 from Analysis.Parse.ActionParser import Action
+from APIs.Cache import ActionCache
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -31,6 +33,14 @@ def workflow():
     return workflow
 
 
+@pytest.fixture(autouse=True)
+def gash_home(tmp_path, monkeypatch):
+    # Keeps the shared action cache out of the real home directory
+    monkeypatch.setenv("GASH_HOME", str(tmp_path / "home"))
+    monkeypatch.setattr(ActionCache, "_shared", None)
+    return tmp_path / "home"
+
+
 def mock_get_repository_vulnerabilities(owner, repo):
     if owner == "CodSpeedHQ" and repo == "action":
         return {
@@ -112,3 +122,43 @@ def test_integration(mock_get_vulns):
     ]
 
     assert findings == expected_findings
+
+
+@patch('APIs.GitHub.GitHubAPI.get_repository_vulnerabilities', side_effect=mock_get_repository_vulnerabilities)
+@patch('APIs.GitHub.GitHubAPI.fetch_action_verification', return_value=(False, False))
+def test_cached_actions(mock_verification, mock_get_vulns, workflow, tmp_path):
+    cache = ActionCache(path=str(tmp_path / "actions.db"))
+    first = UntrustedDependenciesFct(content=workflow, token="token", cache=cache).detect()
+    assert mock_verification.call_count == 4
+
+    # A new process reads the same database
+    shared = ActionCache(path=str(tmp_path / "actions.db"))
+    second = UntrustedDependenciesFct(content=workflow, token="token", cache=shared).detect()
+    assert second == first
+    assert mock_verification.call_count == 4
+    assert mock_get_vulns.call_count == 4
+
+    expired = ActionCache(path=str(tmp_path / "actions.db"), ttl=-1)
+    UntrustedDependenciesFct(content=workflow, token="token", cache=expired).detect()
+    assert mock_verification.call_count == 8
+
+
+@patch('APIs.GitHub.GitHubAPI.get_repository_vulnerabilities', return_value=None)
+@patch('APIs.GitHub.GitHubAPI.fetch_action_verification', side_effect=requests.ConnectionError)
+def test_failed_requests_are_not_cached(mock_verification, mock_get_vulns, workflow, tmp_path):
+    cache = ActionCache(path=str(tmp_path / "actions.db"))
+    findings = UntrustedDependenciesFct(content=workflow, token="token", cache=cache).detect()
+    assert len(findings) == 4
+    assert cache.get("actions", "checkout") is None
+
+
+@patch('APIs.GitHub.GitHubAPI.get_repository_vulnerabilities', return_value=None)
+@patch('APIs.GitHub.GitHubAPI.fetch_action_verification', return_value=(True, True))
+def test_shared_cache_is_opened_on_first_lookup(mock_verification, mock_get_vulns, workflow, gash_home):
+    factory = UntrustedDependenciesFct(content=workflow, token="token")
+    assert ActionCache._shared is None
+    assert not gash_home.exists()
+
+    factory.detect()
+    assert ActionCache._shared is not None
+    assert (gash_home / "actions.db").exists()
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteStore:
+    """
+    A small SQLite database shared by threads, processes and runs.
+
+    Every thread keeps its own connection, and the connections are opened again after a fork. The database uses
+    the WAL journal, so readers never wait for a writer and many processes can share the same file.
+
+    Attributes:
+        path (str): The path of the database file.
+        schema (str): The SQL script that creates the tables. It is run every time the store is opened.
+    """
+
+    schema = ""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        with connection:
+            connection.executescript(self.schema)
+
+    def connection(self):
+        """
+        Returns the connection of the current thread and process.
+        """
+        pid, connection = getattr(self._local, 'connection', (None, None))
+        if pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def query(self, sql, params=()):
+        """
+        Runs a SELECT statement and returns all the rows.
+        """
+        return self.connection().execute(sql, params).fetchall()
+
+    def execute(self, sql, params=()):
+        """
+        Runs a statement on its own transaction.
+        """
+        connection = self.connection()
+        with connection:
+            connection.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        """
+        Runs a statement for every row on a single transaction.
+        """
+        connection = self.connection()
+        with connection:
+            connection.executemany(sql, rows)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Opens a write transaction that blocks the other writers, so a read-modify-write is atomic between
+        processes. It is committed when the block ends, or rolled back if the block raises.
+        """
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
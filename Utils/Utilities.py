@@ -1,7 +1,13 @@
+import configparser
 import csv
+import os
 import re
 import platform
 
+# Columns of the mined commits that are expensive to compute, filled only when requested. The DMM metrics run
+# lizard on every file modified by the commit, and the token count runs it on the workflow file.
+OPTIONAL_METRICS = ("dmm", "token_count", "diff")
+
 
 class Config:
     """
@@ -68,6 +74,28 @@ class Config:
                 repo_url = row[url_column]
                 yield repo_url
 
+    @staticmethod
+    def get_config_directory():
+        """
+        Returns the directory of the GASH settings and caches. The GASH_HOME environment variable overrides ~/.gash.
+        """
+        return os.environ.get('GASH_HOME') or os.path.join(os.path.expanduser("~"), ".gash")
+
+    @classmethod
+    def read_setting(cls, section, key, default=None):
+        """
+        Reads a setting from the config.ini file of the config directory.
+
+            :param section: The section of the setting.
+            :param key: The name of the setting.
+            :param default: The value returned when the setting is not defined.
+
+            :return: The value of the setting as a string, or the default value.
+        """
+        config = configparser.ConfigParser()
+        config.read(os.path.join(cls.get_config_directory(), 'config.ini'))
+        return config.get(section, key, fallback=default)
+
     @staticmethod
     def get_base_directory():
         system = platform.system()